@@ -8,14 +8,62 @@ Exports:
 - token_manager: Singleton instance for accessing and storing tokens.
 - fetch_or_refresh_token: Coroutine to retrieve a new token from the auth server.
 - start_token_refresh_timer: Coroutine that runs in the background to refresh tokens proactively.
+- build_payload: Maps merchant order data to the Kount Orders API payload.
+- PayloadPool: Builds large orders' payloads in a process pool and small ones inline.
+- AdaptiveConcurrencyLimiter: AIMD limiter for outbound Kount calls that honors Retry-After.
+- FairScheduler, Lane, parse_tenant_settings: Per-tenant fair queuing of outbound Kount calls in priority lanes.
+- EndpointPool: Ranks equivalent Kount endpoints by health and EWMA latency for failover.
+- create_transport: Pooled HTTP/1.1 (aiohttp) or HTTP/2 (httpx) transport for Kount API calls.
+- dns_cache: Shared aiohttp resolver that caches Kount hosts and refreshes them in the background.
+- ConnectionWarmer: Opens Kount API connections before startup completes and keeps them alive.
+- retry_budget: Process-wide token bucket capping retries at a fraction of recent requests.
+- LocalRulesEngine: Compiled local decision rules used when the Kount API is unreachable.
+- loop_monitor: Opt-in event-loop lag monitor that captures stacks of blocking callbacks.
+- profiling_router, request_profiler: Token-guarded on-demand CPU, memory and per-request profiling.
+- tracer: Head-sampled request tracing with OpenTelemetry-style spans and a batched NDJSON exporter.
+- traffic_capture: Opt-in sampled, redacted capture of requests and upstream latencies for replay.
+- server_timing: Opt-in Server-Timing header and sampled access log with a per-stage breakdown.
+- K360Client: Embeddable async Kount client bundling the pooled session, token lifecycle, retries and codec.
+- SyncKountClient: Thread-safe blocking client for WSGI/Django code, backed by a background event loop.
+- performance_config, tuning_router: Runtime-tunable timeouts, retry policy, pool sizes, limits and sampling rates.
+- stop_after_configured_attempts, wait_configured_backoff: Tenacity strategies reading the current settings.
+- LatencyRecorder: Bounded latency sample window used for internal stats endpoints.
+- require_stats_token: FastAPI dependency guarding the internal stats endpoints with KOUNT_STATS_TOKEN.
 """
 from .jwt_utils import token_manager, fetch_or_refresh_token, start_token_refresh_timer
 from .lifespan import token_lifespan
 from .pub_key_utils import public_key_manager, fetch_public_key 
+from .metrics import LatencyRecorder, require_stats_token
+from .loop_monitor import loop_monitor
+from .tracing import tracer
+from . import server_timing
+from .capture import traffic_capture
+from .profiling import PROFILING_TOKEN, profiling_router, request_profiler
+from .concurrency import AdaptiveConcurrencyLimiter
+from .fair_queue import FairScheduler, Lane, parse_tenant_settings
+from .endpoints import EndpointPool
+from .transport import create_transport, TransportResponse
+from .warmup import dns_cache, ConnectionWarmer
+from .retry_budget import retry_budget, stop_if_retry_budget_exhausted
+from .payload import build_payload
+from .payload_pool import PayloadPool
+from .tuning import (
+    ADMIN_TOKEN,
+    performance_config,
+    tuning_router,
+    stop_after_configured_attempts,
+    wait_configured_backoff,
+)
+from .local_rules import LocalRulesEngine
+from .client import K360Client
+from .sync_client import SyncKountClient
 from .exceptions import (
     InvalidSignatureError,
     TimestampTooOldError,
     TimestampTooNewError,
     MissingPublicKeyError,
-    PublicKeyExpiredError
+    PublicKeyExpiredError,
+    TransportError,
+    TransportConnectError,
+    TransportStatusError
 )
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Opt-in capture of sampled production traffic for replay in performance tests.
+
+A sampled request's body is redacted and written, with the upstream Kount
+attempts observed while handling it (status and latency), to a gzip NDJSON
+file by a batched background writer. tools/replay_capture.py replays the file
+against a local instance and serves a Kount stand-in that reproduces the
+recorded upstream latencies, so builds can be compared on real order shapes.
+
+- KOUNT_CAPTURE_SAMPLE_RATE: fraction of requests captured (0, the default, disables capture).
+- KOUNT_CAPTURE_FILE: the capture file; new batches are appended as gzip members.
+- KOUNT_CAPTURE_MAX_RECORDS: records written before capture stops, bounding the file size.
+- KOUNT_CAPTURE_HEADERS: request headers kept with each record (default X-Merchant-Id, the tenant).
+
+Redaction replaces every non-null value under a personal-data field (names,
+contact details, addresses, IPs, account and payment identifiers) with a
+pseudonym of the same type, length and character classes, keyed per process;
+letters and digits of any script are replaced. Order
+shapes, sizes and formats survive, but values cannot be recovered, and equal
+values within one capture stay equal.
+
+Usage:
+    @app.post("/process-transaction")
+    @traffic_capture.captured
+    async def process_transaction(request: Request): ...
+
+    # wherever an upstream attempt finishes
+    record = traffic_capture.current()
+    if record is not None:
+        record.upstream(response.status, elapsed_seconds)
+"""
+
+import contextvars
+import functools
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import secrets
+import string
+import time
+from typing import Iterable, Optional
+
+from .tracing import NdjsonSpanExporter
+
+CAPTURE_SAMPLE_RATE = float(os.getenv("KOUNT_CAPTURE_SAMPLE_RATE", "0"))
+"""
+Fraction of requests captured (0 disables capture).
+"""
+
+CAPTURE_FILE = os.getenv("KOUNT_CAPTURE_FILE", "kount_capture.ndjson.gz")
+"""
+Gzip NDJSON file captured requests are appended to.
+"""
+
+CAPTURE_MAX_RECORDS = int(os.getenv("KOUNT_CAPTURE_MAX_RECORDS", "100000"))
+"""
+Records written before capture stops.
+"""
+
+CAPTURE_HEADERS = [name.strip() for name in os.getenv("KOUNT_CAPTURE_HEADERS", "X-Merchant-Id").split(",") if name.strip()]
+"""
+Request headers kept with each captured record.
+"""
+
+REDACTED_FIELDS = frozenset({
+    "device_session_id", "user_ip", "account_id", "username",
+    "first", "family", "middle", "preferred", "prefix", "suffix",
+    "phone", "phone_number", "email", "email_address",
+    "line1", "line2", "city", "postal_code",
+    "tracking_number", "accessUrl", "payment_token", "bin", "last4",
+    "custom_fields",
+})
+"""
+Order fields whose values (and everything nested under them) are pseudonymised.
+"""
+
+_current_record = contextvars.ContextVar("k360_capture_record", default=None)
+
+
+class Redactor:
+    """
+    Replaces values with keyed pseudonyms that keep their length and character classes.
+
+    Digits map to ASCII digits and letters of any script to ASCII letters of the same
+    case; other characters (separators such as '@', '.', '-' and '+') are kept, so
+    formats survive. Numbers and booleans are replaced with pseudonyms of the same type.
+    """
+
+    def __init__(self, fields: Iterable[str] = REDACTED_FIELDS, key: Optional[bytes] = None):
+        self.fields = frozenset(fields)
+        self._key = key or secrets.token_bytes(32)
+
+    def _digest(self, value: str, length: int) -> bytes:
+        digest = hashlib.blake2b(value.encode("utf-8"), key=self._key).digest()
+        while len(digest) < length:
+            digest += hashlib.blake2b(digest, key=self._key).digest()
+        return digest
+
+    def pseudonym(self, value: str, letters: bool = True) -> str:
+        """
+        Returns the pseudonym of a single value.
+
+        Every Unicode digit becomes an ASCII digit and, with `letters`, every other
+        alphanumeric character (accented, CJK, ...) an ASCII letter of the same case
+        (lowercase when the script has none).
+
+        Args:
+            value (str): The value.
+            letters (bool): False to replace digits only, keeping number formats such as '1e-05' parseable.
+        """
+        characters = []
+        for char, byte in zip(value, self._digest(value, len(value))):
+            if char.isdigit():
+                characters.append(string.digits[byte % 10])
+            elif letters and char.isalnum():
+                alphabet = string.ascii_uppercase if char.isupper() else string.ascii_lowercase
+                characters.append(alphabet[byte % 26])
+            else:
+                characters.append(char)
+        return "".join(characters)
+
+    def redact(self, value, redacting: bool = False):
+        """
+        Returns a copy of a decoded JSON value with the redacted fields pseudonymised.
+
+        Args:
+            value: The decoded JSON value.
+            redacting (bool): True once inside a redacted field.
+        """
+        if isinstance(value, dict):
+            return {key: self.redact(item, redacting or key in self.fields) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.redact(item, redacting) for item in value]
+        if not redacting or value is None:
+            return value
+        if isinstance(value, str):
+            return self.pseudonym(value)
+        if isinstance(value, bool):
+            return bool(self._digest(repr(value), 1)[0] & 1)
+        if isinstance(value, int):
+            return int(self.pseudonym(str(value), letters=False))
+        if isinstance(value, float) and math.isfinite(value):
+            return float(self.pseudonym(repr(value), letters=False))
+        # Anything else (non-finite floats, non-JSON types) is replaced outright
+        return self.pseudonym(repr(value))
+
+
+class CaptureRecord:
+    """
+    Upstream attempts observed while one captured request was handled.
+
+    Attributes:
+        attempts (list): [status or None for a failed call, milliseconds] per upstream call.
+    """
+
+    __slots__ = ("attempts", "closed")
+
+    def __init__(self):
+        self.attempts = []
+        self.closed = False
+
+    def upstream(self, status: Optional[int], seconds: float):
+        """
+        Records one upstream call; calls finishing after the response (the background PATCH) are ignored.
+
+        Args:
+            status (Optional[int]): The HTTP status, or None if no response was received.
+            seconds (float): How long the call took.
+        """
+        if not self.closed:
+            self.attempts.append([status, round(seconds * 1000, 3)])
+
+
+class CaptureExporter(NdjsonSpanExporter):
+    """Batched writer appending gzip members of NDJSON records, up to a record limit."""
+
+    def __init__(self, path: str = CAPTURE_FILE, max_records: int = CAPTURE_MAX_RECORDS, **kwargs):
+        super().__init__(path, **kwargs)
+        self.max_records = max_records
+        self._accepted = 0
+
+    def export(self, record: dict):
+        """Queues a captured request unless the record limit has been reached."""
+        if self._accepted >= self.max_records:
+            self.counters["dropped"] += 1
+            return
+        self._accepted += 1
+        super().export(record)
+
+    def _write(self, batch: list):
+        with gzip.open(self.path, "at", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch))
+
+
+class TrafficCapture:
+    """
+    Samples handled requests into a capture file.
+
+    Attributes:
+        sample_rate (float): Fraction of requests captured.
+        exporter (CaptureExporter): Where captured requests go.
+        redactor (Redactor): Pseudonymises personal data before it is queued.
+        headers (tuple): Request headers kept with each record, such as the tenant header.
+    """
+
+    def __init__(self, sample_rate: float = CAPTURE_SAMPLE_RATE, exporter: Optional[CaptureExporter] = None,
+                 redactor: Optional[Redactor] = None, headers: Iterable[str] = CAPTURE_HEADERS):
+        self.sample_rate = sample_rate
+        self.exporter = exporter or CaptureExporter()
+        self.redactor = redactor or Redactor()
+        self.headers = tuple(headers)
+        self.counters = {"captured": 0, "skipped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request can be captured."""
+        return self.sample_rate > 0
+
+    def current(self) -> Optional[CaptureRecord]:
+        """Returns the record of the request being captured, or None."""
+        return _current_record.get()
+
+    def captured(self, handler):
+        """
+        Decorates a request handler so a sample of its requests is captured.
+
+        The handler must take the Starlette request as its `request` argument; the
+        body is read (and cached by Starlette) before the handler runs.
+        """
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get("request")
+            if request is None or not self.enabled or random.random() >= self.sample_rate:
+                return await handler(*args, **kwargs)
+
+            body = await request.body()
+            record = CaptureRecord()
+            token = _current_record.set(record)
+            received = time.time()
+            started = time.perf_counter()
+            status = 500
+            try:
+                result = await handler(*args, **kwargs)
+                status = getattr(result, "status_code", 200)
+                return result
+            except BaseException as e:
+                status = getattr(e, "status_code", 500)
+                raise
+            finally:
+                _current_record.reset(token)
+                record.closed = True
+                self._export(request, body, record, received, time.perf_counter() - started, status)
+
+        return wrapper
+
+    def _export(self, request, body: bytes, record: CaptureRecord, received: float, seconds: float, status: int):
+        try:
+            order = self.redactor.redact(json.loads(body))
+        except ValueError:
+            self.counters["skipped"] += 1
+            return
+        self.counters["captured"] += 1
+        self.exporter.export({
+            "ts": round(received, 6),
+            "method": request.method,
+            "path": request.url.path,
+            "headers": {name: request.headers[name] for name in self.headers if name in request.headers},
+            "body": order,
+            "status": status,
+            "ms": round(seconds * 1000, 3),
+            "upstream": record.attempts,
+        })
+
+    def start(self):
+        """Starts the batched writer when capture is enabled."""
+        if self.enabled:
+            self.exporter.start()
+
+    async def stop(self):
+        """Stops the writer and writes what is left."""
+        await self.exporter.stop()
+
+    def stats(self) -> dict:
+        """
+        Returns the capture and writer counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the capture.
+        """
+        return {"sample_rate": self.sample_rate, **self.counters, "exporter": self.exporter.stats()}
+
+
+def read_capture(path: str):
+    """
+    Reads a capture file in order.
+
+    Args:
+        path (str): The gzip NDJSON capture file.
+
+    Yields:
+        dict: One captured request per record.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+traffic_capture = TrafficCapture()
@@ -0,0 +1,247 @@
+"""
+Embeddable async client for the Kount Orders API.
+
+K360Client bundles what every caller of Kount otherwise rebuilds by hand:
+- one pooled transport for the life of the client (create_transport),
+- the access token lifecycle (initial fetch plus the proactive refresh timer),
+- the retry policy (403/408/429/5xx with jittered exponential backoff, capped
+  by the process-wide retry budget); a 5xx may come after Kount acted on the
+  request, so non-idempotent POST and PATCH calls are retried only on 403/408/429,
+  which reject it unprocessed, and never create an order twice,
+- an optional AdaptiveConcurrencyLimiter shared with other callers,
+- a JSON codec: compact stdlib JSON by default, or any encoder/decoder pair
+  such as msgspec.json.Encoder()/Decoder(),
+- a tracing span per attempt (see k360_jwt_auth.tracing).
+
+Usage:
+    async with K360Client() as client:
+        result = await client.risk_inquiry(order)  # order shaped like a /process-transaction body
+        await client.patch_order(result["order"]["orderId"], {"transactions": [...]})
+        order = await client.get_order(result["order"]["orderId"])
+"""
+
+import asyncio
+import json
+import os
+from typing import Optional
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from .concurrency import AdaptiveConcurrencyLimiter
+from .endpoints import Endpoint
+from .exceptions import TransportStatusError
+from .jwt_utils import TokenManager, token_manager, fetch_or_refresh_token, start_token_refresh_timer
+from .payload import build_payload
+from .retry_budget import retry_budget, stop_if_retry_budget_exhausted
+from .tracing import tracer
+from .transport import TransportResponse, create_transport
+
+KOUNT_API_ENDPOINT = os.getenv("KOUNT_API_ENDPOINT", "https://api-sandbox.kount.com/commerce/v2/orders?riskInquiry=true")
+"""
+The Kount Orders API risk inquiry URL; orders are patched and fetched under the same path.
+"""
+
+RETRYABLE_STATUSES = frozenset({403, 408, 429, 500, 502, 503, 504})
+"""
+Response statuses retried with backoff for idempotent methods, as in the payments API.
+"""
+
+UNPROCESSED_STATUSES = frozenset({403, 408, 429})
+"""
+Retryable statuses returned before the request is acted on, so non-idempotent methods can be retried on them.
+"""
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+"""
+Methods that are safe to repeat after a 5xx.
+"""
+
+
+def _retryable_statuses(method: str) -> frozenset:
+    return RETRYABLE_STATUSES if method.upper() in IDEMPOTENT_METHODS else UNPROCESSED_STATUSES
+
+
+class JsonCodec:
+    """Compact stdlib JSON encoder and decoder."""
+
+    @staticmethod
+    def encode(obj) -> bytes:
+        """Serialises an object to compact UTF-8 JSON."""
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def decode(data: bytes):
+        """Parses JSON bytes."""
+        return json.loads(data)
+
+
+class K360Client:
+    """
+    Async Kount Orders API client owning the pooled transport, token lifecycle and retry policy.
+
+    Attributes:
+        endpoint (Endpoint): The risk inquiry endpoint.
+        timeout (float): Total seconds allowed per request attempt.
+        max_attempts (int): Attempts per call, within the shared retry budget.
+        max_backoff (float): Upper bound of the jittered exponential backoff, in seconds.
+        limiter (Optional[AdaptiveConcurrencyLimiter]): Limits calls in flight, if given.
+    """
+
+    def __init__(self, endpoint: str = KOUNT_API_ENDPOINT, transport: str = "aiohttp", max_connections: int = 100,
+                 timeout: float = 60.0, max_attempts: int = 3, max_backoff: float = 10.0,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None, encoder=JsonCodec, decoder=JsonCodec,
+                 tokens: TokenManager = token_manager):
+        self.endpoint = Endpoint(endpoint)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.limiter = limiter
+        self._encoder = encoder
+        self._decoder = decoder
+        self._tokens = tokens
+        self._transport_name = transport
+        self._max_connections = max_connections
+        self._transport = None
+        self._refresh_task = None
+
+    async def start(self):
+        """Creates the pooled transport, fetches a token if none is held and starts the refresh timer."""
+        if self._transport is not None:
+            return
+        self._transport = create_transport(self._transport_name, self._max_connections, self.timeout)
+        if not self._tokens.get_access_token():
+            await fetch_or_refresh_token(self._tokens)
+        self._refresh_task = asyncio.create_task(start_token_refresh_timer(self._tokens))
+
+    async def close(self):
+        """Stops the token refresh and closes the pooled connections."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def encode_payload(self, payload) -> bytes:
+        """
+        Encodes a Kount payload with the client's encoder.
+
+        Args:
+            payload (dict): A payload from `build_payload`, or a PATCH body.
+
+        Returns:
+            bytes: The request body.
+        """
+        return self._encoder.encode(payload)
+
+    async def _attempt(self, method: str, url: str, body: Optional[bytes]):
+        headers = {"Authorization": f"Bearer {self._tokens.get_access_token()}"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        if self.limiter is None:
+            return await self._transport.request(method, url, body, headers)
+        async with self.limiter.slot() as outcome:
+            response = await self._transport.request(method, url, body, headers)
+            outcome.record(response.status, response.headers.get("Retry-After"))
+            return response
+
+    async def send(self, method: str, url: str, body: Optional[bytes] = None) -> TransportResponse:
+        """
+        Sends a request with the token and retry policy.
+
+        Idempotent methods are retried on any of RETRYABLE_STATUSES; others only on
+        UNPROCESSED_STATUSES, since after a 5xx the request may already have taken effect.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            body (Optional[bytes]): The encoded request body.
+
+        Returns:
+            TransportResponse: The successful response.
+
+        Raises:
+            TransportStatusError: On an error response that was not retried or kept failing; the
+                message holds the start of the response body.
+            TransportError: On timeouts and connection failures.
+            RuntimeError: If the client has not been started.
+        """
+        if self._transport is None:
+            raise RuntimeError("K360Client is not started; use `async with K360Client()` or await start().")
+        statuses = _retryable_statuses(method)
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception(lambda e: isinstance(e, TransportStatusError) and e.status in statuses),
+            stop=stop_after_attempt(self.max_attempts) | stop_if_retry_budget_exhausted(retry_budget),
+            wait=wait_random_exponential(multiplier=1, max=self.max_backoff),
+            before=retry_budget.record_attempt,
+            before_sleep=tracer.record_retry,
+            reraise=True,
+        ):
+            with attempt, tracer.span("kount.attempt", **{"http.request.method": method}) as span:
+                response = await self._attempt(method, url, body)
+                span.set_attribute("http.response.status_code", response.status)
+                if response.status >= 400:
+                    raise TransportStatusError(response.status, url, response.text()[:500] or response.reason)
+                return response
+
+    async def request(self, method: str, url: str, body: Optional[bytes] = None):
+        """
+        Sends a request like `send` and decodes the response body.
+
+        Returns:
+            The decoded response body.
+        """
+        return self._decoder.decode((await self.send(method, url, body)).body)
+
+    async def risk_inquiry(self, order: dict) -> dict:
+        """
+        Creates an order with a risk inquiry.
+
+        Args:
+            order (dict): The order, shaped like a /process-transaction request body.
+
+        Returns:
+            dict: The decoded Kount response.
+
+        Raises:
+            ValueError: If the order cannot be mapped to a Kount payload.
+            TransportStatusError: On an error response that was not retried or kept failing.
+            TransportError: On timeouts and connection failures.
+        """
+        return await self.request("POST", self.endpoint.url, self.encode_payload(build_payload(order)))
+
+    async def patch_order(self, kount_order_id: str, patch: dict) -> dict:
+        """
+        Updates an existing Kount order, e.g. with the authorization result.
+
+        Args:
+            kount_order_id (str): The Kount order ID.
+            patch (dict): The Kount PATCH payload.
+
+        Returns:
+            dict: The decoded Kount response.
+        """
+        return await self.request("PATCH", self.endpoint.url_for(kount_order_id), self.encode_payload(patch))
+
+    async def get_order(self, kount_order_id: str) -> dict:
+        """
+        Fetches an existing Kount order.
+
+        Args:
+            kount_order_id (str): The Kount order ID.
+
+        Returns:
+            dict: The decoded Kount response.
+        """
+        return await self.request("GET", self.endpoint.url_for(kount_order_id))
@@ -0,0 +1,260 @@
+"""
+Adaptive concurrency limiting for outbound Kount API calls.
+
+The limiter follows AIMD (additive increase, multiplicative decrease): every
+healthy response raises the limit by roughly one per round trip, while a
+429/503/504, a timeout or a latency spike cuts it by a constant ratio. A
+`Retry-After` header on a 429 or 503 pauses every caller until the given time,
+capped at KOUNT_MAX_RETRY_AFTER seconds, so the whole process backs off instead
+of only the request that was throttled. Callers wait at most
+KOUNT_LIMITER_ACQUIRE_TIMEOUT seconds for a slot and then get a TimeoutError,
+so a long pause fails calls fast instead of holding them.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from .metrics import LatencyRecorder
+
+OVERLOAD_STATUSES = {429, 503, 504}
+"""
+HTTP statuses that mean the provider is over capacity and the limit should shrink.
+"""
+
+RETRY_AFTER_STATUSES = {429, 503}
+"""
+HTTP statuses whose Retry-After header pauses every caller.
+"""
+
+MAX_RETRY_AFTER = float(os.getenv("KOUNT_MAX_RETRY_AFTER", "30"))
+"""
+Longest pause, in seconds, a Retry-After header can impose.
+"""
+
+ACQUIRE_TIMEOUT = float(os.getenv("KOUNT_LIMITER_ACQUIRE_TIMEOUT", "10"))
+"""
+Seconds a caller waits for a slot before TimeoutError is raised.
+"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header into a number of seconds.
+
+    Args:
+        value (Optional[str]): Delay in seconds or an HTTP-date.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class LimiterOutcome:
+    """
+    Result of a call made under the limiter, filled in by the caller.
+
+    Attributes:
+        status (Optional[int]): The HTTP status, or None if no response was received.
+        retry_after (Optional[float]): Seconds requested by a Retry-After header.
+    """
+
+    __slots__ = ("status", "retry_after")
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def record(self, status: int, retry_after_header: Optional[str] = None):
+        """
+        Records the response status and any Retry-After header.
+
+        Args:
+            status (int): The HTTP status code.
+            retry_after_header (Optional[str]): The raw Retry-After header value.
+        """
+        self.status = status
+        self.retry_after = parse_retry_after(retry_after_header)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter shared by all outbound calls to one provider.
+
+    Attributes:
+        limit (float): The current concurrency limit.
+        in_flight (int): Calls currently holding a slot.
+        baseline_latency (Optional[float]): EWMA of successful call latency, in seconds.
+        blocked_until (float): Monotonic time before which no slot is granted (Retry-After).
+        max_retry_after (float): Longest pause a Retry-After header can impose, in seconds.
+        acquire_timeout (Optional[float]): Seconds `acquire` waits for a slot; None waits indefinitely.
+        counters (dict): Acquired slots, decreases, latency spikes, Retry-After pauses and acquire timeouts.
+        wait_latency (LatencyRecorder): Time callers spent waiting for a slot.
+    """
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 backoff_ratio: float = 0.7, latency_tolerance: float = 2.0, smoothing: float = 0.05,
+                 max_retry_after: float = MAX_RETRY_AFTER, acquire_timeout: Optional[float] = ACQUIRE_TIMEOUT):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.max_retry_after = max_retry_after
+        self.acquire_timeout = acquire_timeout
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.blocked_until = 0.0
+        self.counters = {"acquired": 0, "decreases": 0, "latency_spikes": 0, "retry_after_pauses": 0, "timeouts": 0}
+        self.wait_latency = LatencyRecorder()
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+        self._wake_task = None
+
+    async def acquire(self):
+        """
+        Waits for a free slot and for any Retry-After pause to end.
+
+        Raises:
+            asyncio.TimeoutError: If no slot is granted within `acquire_timeout`; raised at once
+                when a Retry-After pause outlasts it.
+        """
+        started = time.monotonic()
+        deadline = None if self.acquire_timeout is None else started + self.acquire_timeout
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                paused_for = self.blocked_until - now
+                if paused_for <= 0 and self.in_flight < int(self.limit):
+                    break
+                wait = paused_for if paused_for > 0 else None
+                if deadline is not None:
+                    if deadline - now <= 0 or paused_for >= deadline - now:
+                        self.counters["timeouts"] += 1
+                        raise asyncio.TimeoutError("No Kount concurrency slot within the acquire timeout")
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+        self.counters["acquired"] += 1
+        self.wait_latency.record(time.monotonic() - started)
+
+    async def release(self, latency: float, outcome: LimiterOutcome, failed: bool = False):
+        """
+        Frees a slot and adapts the limit to the call's outcome.
+
+        Args:
+            latency (float): Duration of the call, in seconds.
+            outcome (LimiterOutcome): The recorded status and Retry-After.
+            failed (bool): True if the call raised before a response was recorded (timeout, connection error).
+        """
+        now = time.monotonic()
+        async with self._condition:
+            self.in_flight -= 1
+            if outcome.retry_after and outcome.status in RETRY_AFTER_STATUSES:
+                self.blocked_until = max(self.blocked_until, now + min(outcome.retry_after, self.max_retry_after))
+                self.counters["retry_after_pauses"] += 1
+
+            if outcome.status in OVERLOAD_STATUSES or (failed and outcome.status is None):
+                self._decrease(now)
+            elif outcome.status is not None and outcome.status < 400:
+                baseline = self.baseline_latency
+                if baseline is not None and latency > baseline * self.latency_tolerance:
+                    self.counters["latency_spikes"] += 1
+                    self._decrease(now)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                # The baseline follows every success so a lasting shift is not treated as a spike forever
+                self.baseline_latency = latency if baseline is None else baseline + self.smoothing * (latency - baseline)
+            self._condition.notify_all()
+
+    def _decrease(self, now: float):
+        # A burst of overload responses from one round trip only counts once
+        if now - self._last_decrease < (self.baseline_latency or 0.05):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        self.counters["decreases"] += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Holds a slot for the duration of a call.
+
+        Yields:
+            LimiterOutcome: Call `record(status, retry_after_header)` once the response arrives.
+        """
+        await self.acquire()
+        outcome = LimiterOutcome()
+        started = time.monotonic()
+        failed = False
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            await self.release(time.monotonic() - started, outcome, failed)
+
+    def set_bounds(self, min_limit: int, max_limit: int, latency_tolerance: float):
+        """
+        Changes the limit bounds and latency tolerance, clamping the current limit into the new bounds.
+
+        Calls already holding a slot keep it; a lower limit takes effect as they finish, and
+        callers waiting for a slot are woken so a higher limit admits them at once.
+
+        Args:
+            min_limit (int): Lowest concurrency limit.
+            max_limit (int): Highest concurrency limit.
+            latency_tolerance (float): Latency, as a multiple of the baseline, treated as overload.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.limit = min(max_limit, max(min_limit, self.limit))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop, so no caller can be waiting
+        self._wake_task = loop.create_task(self._wake_waiters())
+
+    async def _wake_waiters(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Returns the current limit, usage and counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the limiter metrics.
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "baseline_latency_ms": round(self.baseline_latency * 1000, 3) if self.baseline_latency is not None else None,
+            "paused_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            **self.counters,
+            "wait_latency": self.wait_latency.snapshot(),
+        }
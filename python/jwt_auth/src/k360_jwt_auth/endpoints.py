@@ -0,0 +1,209 @@
+"""
+Latency-aware selection across equivalent Kount API endpoints.
+
+An EndpointPool holds a list of interchangeable base URLs (regions or
+proxies). Callers ask for `candidates()` in preference order, send to the
+first, and report each result with `record()`. The pool keeps an EWMA of
+successful request latency per endpoint, ranks endpoints that just failed
+behind those that did not, and ejects an endpoint for a while after repeated
+failures. A background probe checks every endpoint, including ejected ones,
+so a recovered endpoint comes back without waiting for live traffic. Probe
+latency is kept in its own EWMA, used to rank endpoints that have not served
+a request yet; a cheap probe says little about how long an order takes.
+"""
+
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """
+    One base URL in an EndpointPool.
+
+    Attributes:
+        url (str): The full request URL, including any query string.
+        latency (Optional[float]): EWMA of successful request latency, in seconds.
+        probe_latency (Optional[float]): EWMA of successful probe latency, in seconds.
+        consecutive_failures (int): Failures since the last success.
+        ejected_until (float): Monotonic time before which the endpoint is only used as a last resort.
+        counters (dict): Failures, ejections, probes and failed probes.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        parts = urlsplit(url)
+        self._base = urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip("/"), "", ""))
+        self.origin = urlunsplit((parts.scheme, parts.netloc, "", "", ""))
+        self.latency = None
+        self.probe_latency = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.counters = {"failures": 0, "ejections": 0, "probes": 0, "probe_failures": 0}
+
+    def url_for(self, resource_id: str) -> str:
+        """
+        Returns the URL of a single resource under this endpoint (e.g. an order to PATCH).
+
+        Args:
+            resource_id (str): The resource identifier appended to the path.
+
+        Returns:
+            str: The resource URL, without the endpoint's query string.
+        """
+        return f"{self._base}/{resource_id}"
+
+
+class EndpointPool:
+    """
+    Ranks equivalent endpoints by health and EWMA latency.
+
+    Attributes:
+        endpoints (list): The configured endpoints, in configuration order.
+    """
+
+    def __init__(self, urls: list, smoothing: float = 0.2, failure_threshold: int = 2,
+                 ejection_seconds: float = 30.0):
+        if not urls:
+            raise ValueError("At least one endpoint URL is required.")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.smoothing = smoothing
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+
+    def set_urls(self, urls: list):
+        """
+        Replaces the configured endpoints, keeping the health and latency of URLs that stay.
+
+        Args:
+            urls (list): The endpoint URLs, in configuration order.
+
+        Raises:
+            ValueError: If no URL is given.
+        """
+        if not urls:
+            raise ValueError("At least one endpoint URL is required.")
+        current = {endpoint.url: endpoint for endpoint in self.endpoints}
+        # Swapped in one assignment; requests already iterating the old list finish with it
+        self.endpoints = [current.get(url) or Endpoint(url) for url in urls]
+
+    def candidates(self) -> list:
+        """
+        Returns the endpoints in the order they should be tried.
+
+        Available endpoints come first, those without a recent failure ahead of those
+        with one, each group ordered by EWMA latency (unmeasured endpoints first so they
+        get measured; probe latency stands in until an endpoint has served a request).
+        Ejected endpoints follow, soonest to return first, so a request
+        still has somewhere to go when every endpoint is ejected.
+
+        Returns:
+            list: Endpoints in preference order.
+        """
+        now = time.monotonic()
+        available = []
+        ejected = []
+        for endpoint in self.endpoints:
+            (available if endpoint.ejected_until <= now else ejected).append(endpoint)
+        available.sort(key=lambda e: (e.consecutive_failures > 0,
+                                      (e.latency if e.latency is not None else e.probe_latency) or 0.0))
+        ejected.sort(key=lambda e: e.ejected_until)
+        return available + ejected
+
+    def best(self) -> Endpoint:
+        """Returns the preferred endpoint."""
+        return self.candidates()[0]
+
+    def record(self, endpoint: Endpoint, latency: float, ok: bool, probe: bool = False):
+        """
+        Records the outcome of a request or probe.
+
+        Args:
+            endpoint (Endpoint): The endpoint that was used.
+            latency (float): Time on the wire, in seconds, excluding any wait for a local slot.
+            ok (bool): False for connection errors, timeouts and 5xx responses.
+            probe (bool): True for health probes, whose latency is kept apart from request latency.
+        """
+        if ok:
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+            attribute = "probe_latency" if probe else "latency"
+            previous = getattr(endpoint, attribute)
+            setattr(endpoint, attribute,
+                    latency if previous is None else previous + self.smoothing * (latency - previous))
+            return
+
+        endpoint.counters["failures"] += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.failure_threshold:
+            if endpoint.ejected_until <= time.monotonic():
+                endpoint.counters["ejections"] += 1
+                logger.error("Ejecting Kount endpoint %s after %s failures", endpoint.url,
+                             endpoint.consecutive_failures)
+            endpoint.ejected_until = time.monotonic() + self.ejection_seconds
+
+    async def probe(self, session: aiohttp.ClientSession, path: str = "/", timeout: float = 2.0):
+        """
+        Probes every endpoint once, concurrently.
+
+        Any HTTP response below 500 counts as healthy; the time to receive it updates
+        the endpoint's probe latency.
+
+        Args:
+            session (aiohttp.ClientSession): Session used for the probes.
+            path (str): Path requested on each endpoint's origin.
+            timeout (float): Seconds before a probe counts as failed.
+        """
+        async def probe_one(endpoint: Endpoint):
+            endpoint.counters["probes"] += 1
+            started = time.monotonic()
+            try:
+                async with session.get(endpoint.origin + path,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    ok = response.status < 500
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            if not ok:
+                endpoint.counters["probe_failures"] += 1
+            self.record(endpoint, time.monotonic() - started, ok, probe=True)
+
+        await asyncio.gather(*(probe_one(endpoint) for endpoint in self.endpoints))
+
+    async def probe_forever(self, interval: float = 10.0, path: str = "/", timeout: float = 2.0):
+        """
+        Background coroutine that probes every endpoint every `interval` seconds.
+
+        Args:
+            interval (float): Seconds between probe rounds.
+            path (str): Path requested on each endpoint's origin.
+            timeout (float): Seconds before a probe counts as failed.
+        """
+        async with aiohttp.ClientSession() as session:
+            while True:
+                await self.probe(session, path, timeout)
+                await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """
+        Returns per-endpoint health, latency and counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot keyed by endpoint URL.
+        """
+        now = time.monotonic()
+        return {
+            endpoint.url: {
+                "latency_ms": round(endpoint.latency * 1000, 3) if endpoint.latency is not None else None,
+                "probe_latency_ms": (round(endpoint.probe_latency * 1000, 3)
+                                     if endpoint.probe_latency is not None else None),
+                "consecutive_failures": endpoint.consecutive_failures,
+                "ejected_for_s": round(max(0.0, endpoint.ejected_until - now), 3),
+                **endpoint.counters,
+            }
+            for endpoint in self.endpoints
+        }
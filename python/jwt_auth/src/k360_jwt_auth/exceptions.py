@@ -2,18 +2,42 @@ class InvalidSignatureError(Exception):
     """Raised when the signature is missing, improperly formatted, or does not match."""
     pass
 
+
 class TimestampTooOldError(Exception):
     """Raised when the timestamp is older than the allowed grace period."""
     pass
 
+
 class TimestampTooNewError(Exception):
     """Raised when the timestamp is newer than the allowed grace period."""
     pass
 
+
 class MissingPublicKeyError(Exception):
     """Raised when no public key is available to verify the signature."""
     pass
 
+
 class PublicKeyExpiredError(Exception):
     """Raised when the loaded public key is expired."""
-    pass
\ No newline at end of file
+    pass
+
+
+class TransportError(Exception):
+    """Raised when an outbound request fails without a response (timeout, dropped connection)."""
+    pass
+
+
+class TransportConnectError(TransportError):
+    """Raised when no connection could be made, so the request was never sent."""
+    pass
+
+
+class TransportStatusError(Exception):
+    """Raised by `TransportResponse.raise_for_status` for 4xx and 5xx responses."""
+
+    def __init__(self, status: int, url: str, message: str = ""):
+        super().__init__(f"{status}, message={message!r}, url={url!r}")
+        self.status = status
+        self.url = url
+        self.message = message
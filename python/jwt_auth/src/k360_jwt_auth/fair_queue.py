@@ -0,0 +1,367 @@
+"""
+Per-tenant fair queuing and priority lanes for outbound Kount API calls.
+
+When outbound capacity is exhausted, calls queue per tenant (merchant) and
+are admitted by deficit round-robin: each backlogged tenant receives credit
+in proportion to its weight on every round and spends one credit per call,
+so a tenant flooding the queue only delays itself. Total admissions follow a
+capacity callable (normally the adaptive limiter's current limit), and each
+tenant can be capped to a maximum number of calls in flight.
+
+Calls are also split into priority lanes, such as user-facing pre-auth
+inquiries ahead of background authorization PATCHes. A freed slot goes to
+the highest-priority lane with queued calls, except that a lane below its
+reserved floor is served first so lower lanes are never starved; a lane can
+also be capped to a share of capacity so it leaves headroom for the others.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Sequence
+
+from .metrics import LatencyRecorder
+
+OVERFLOW_TENANT = "_other"
+"""
+Tenant that absorbs calls from tenants seen after `max_tenants` distinct ones.
+"""
+
+
+def parse_tenant_settings(value: Optional[str], cast: Callable = float) -> dict:
+    """
+    Parses a `tenant=value,tenant=value` setting such as KOUNT_TENANT_WEIGHTS.
+
+    Args:
+        value (Optional[str]): The raw setting.
+        cast (Callable): Converts each value, e.g. float or int.
+
+    Returns:
+        dict: Values keyed by tenant.
+
+    Raises:
+        ValueError: If an entry is not of the form `tenant=value`.
+    """
+    settings = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        tenant, separator, setting = entry.partition("=")
+        if not separator or not tenant.strip():
+            raise ValueError(f"Invalid tenant setting {entry!r}; expected tenant=value.")
+        settings[tenant.strip()] = cast(setting.strip())
+    return settings
+
+
+class Lane:
+    """
+    A priority class of calls, with its own per-tenant queues and metrics.
+
+    Attributes:
+        name (str): The lane name passed to `FairScheduler.acquire`.
+        reserved (int): Calls in flight this lane is always allowed, ahead of higher lanes.
+        max_share (float): Largest fraction of capacity this lane may hold beyond `reserved`.
+        in_flight (int): Calls in this lane currently admitted.
+        admitted (int): Calls admitted since startup.
+        wait_latency (LatencyRecorder): Time calls spent queued before admission.
+        latency (LatencyRecorder): Time calls held their admission (the upstream call).
+    """
+
+    def __init__(self, name: str, reserved: int = 0, max_share: float = 1.0):
+        if reserved < 0 or not 0 < max_share <= 1:
+            raise ValueError(f"Lane {name!r} needs reserved >= 0 and 0 < max_share <= 1.")
+        self.name = name
+        self.reserved = reserved
+        self.max_share = max_share
+        self.in_flight = 0
+        self.admitted = 0
+        self.wait_latency = LatencyRecorder()
+        self.latency = LatencyRecorder()
+        self._backlogs = {}
+        self._active = deque()
+        self._head_credited = False
+
+    def has_room(self, capacity: int) -> bool:
+        return self.in_flight < max(self.reserved, int(capacity * self.max_share))
+
+    def queued(self) -> int:
+        return sum(len(backlog.waiters) for backlog in self._active)
+
+
+class _Tenant:
+    """Weight, cap and metrics for one tenant, across lanes."""
+
+    __slots__ = ("name", "weight", "max_in_flight", "in_flight", "admitted", "wait_latency")
+
+    def __init__(self, name: str, weight: float, max_in_flight: Optional[int]):
+        self.name = name
+        self.weight = weight
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.admitted = 0
+        self.wait_latency = LatencyRecorder()
+
+    def has_room(self) -> bool:
+        return self.max_in_flight is None or self.in_flight < self.max_in_flight
+
+
+class _Backlog:
+    """Queued calls and round-robin credit of one tenant in one lane."""
+
+    __slots__ = ("tenant", "lane", "waiters", "deficit")
+
+    def __init__(self, tenant: _Tenant, lane: Lane):
+        self.tenant = tenant
+        self.lane = lane
+        self.waiters = deque()
+        self.deficit = 0.0
+
+
+class FairScheduler:
+    """
+    Deficit round-robin scheduler admitting calls per tenant, in priority lanes.
+
+    Attributes:
+        in_flight (int): Calls currently admitted, across all tenants and lanes.
+        lanes (dict): Lanes by name, in priority order; the first is the default.
+        weights (dict): Weight per tenant; tenants not listed use `default_weight`.
+        limits (dict): Maximum calls in flight per tenant; tenants not listed use `default_limit`.
+    """
+
+    def __init__(self, capacity: Callable[[], int], weights: Optional[dict] = None, default_weight: float = 1.0,
+                 limits: Optional[dict] = None, default_limit: Optional[int] = None, max_tenants: int = 1000,
+                 lanes: Sequence[Lane] = ()):
+        lightest = min([default_weight, *(weights or {}).values()])
+        if lightest <= 0:
+            raise ValueError("Tenant weights must be positive.")
+        self.capacity = capacity
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.max_tenants = max_tenants
+        self.lanes = {lane.name: lane for lane in (lanes or [Lane("default")])}
+        self.in_flight = 0
+        self._tenants = {}
+        # Credit per round is scaled so the lightest tenant earns at least one call
+        self._quantum = 1.0 / lightest
+
+    def _tenant(self, name: str) -> _Tenant:
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            if len(self._tenants) >= self.max_tenants:
+                name = OVERFLOW_TENANT
+                tenant = self._tenants.get(name)
+            if tenant is None:
+                limit = self.limits.get(name, self.default_limit)
+                tenant = _Tenant(name, self.weights.get(name, self.default_weight), limit or None)
+                self._tenants[name] = tenant
+        return tenant
+
+    def _backlog(self, tenant: str, lane: Optional[str]) -> _Backlog:
+        lane = self.lanes[lane] if lane is not None else next(iter(self.lanes.values()))
+        state = self._tenant(tenant)
+        backlog = lane._backlogs.get(state.name)
+        if backlog is None:
+            backlog = lane._backlogs[state.name] = _Backlog(state, lane)
+        return backlog
+
+    def _queued(self) -> bool:
+        return any(lane._active for lane in self.lanes.values())
+
+    def _admit(self, backlog: _Backlog):
+        backlog.tenant.in_flight += 1
+        backlog.tenant.admitted += 1
+        backlog.lane.in_flight += 1
+        backlog.lane.admitted += 1
+        self.in_flight += 1
+
+    def _admit_next(self, lane: Lane) -> bool:
+        # One deficit round-robin step: admit the lane's next call, if any of its tenants has room
+        turns = 0
+        while lane._active and turns <= len(lane._active):
+            backlog = lane._active[0]
+            if backlog.waiters and backlog.tenant.has_room():
+                if not lane._head_credited:
+                    backlog.deficit += backlog.tenant.weight * self._quantum
+                    lane._head_credited = True
+                while backlog.waiters and backlog.deficit >= 1:
+                    waiter = backlog.waiters.popleft()
+                    if waiter.done():
+                        continue
+                    waiter.set_result(None)
+                    backlog.deficit -= 1
+                    self._admit(backlog)
+                    if not backlog.waiters:
+                        self._drop_head(lane)
+                    return True
+            if not backlog.waiters:
+                self._drop_head(lane)
+                continue
+            lane._head_credited = False
+            lane._active.rotate(-1)
+            turns += 1
+        return False
+
+    @staticmethod
+    def _drop_head(lane: Lane):
+        lane._active.popleft().deficit = 0.0
+        lane._head_credited = False
+
+    def _dispatch(self):
+        while True:
+            capacity = self.capacity()
+            if self.in_flight >= capacity:
+                return
+            # Lanes below their reserved floor first, then strict priority within each lane's share
+            if not any(lane.in_flight < lane.reserved and self._admit_next(lane) for lane in self.lanes.values()) and \
+                    not any(lane.has_room(capacity) and self._admit_next(lane) for lane in self.lanes.values()):
+                return
+
+    async def acquire(self, tenant: str, lane: Optional[str] = None) -> _Backlog:
+        """
+        Waits until the tenant's call is admitted.
+
+        Args:
+            tenant (str): The tenant (merchant) making the call.
+            lane (Optional[str]): The priority lane; defaults to the first (highest priority) lane.
+
+        Returns:
+            _Backlog: The tenant's queue in the lane, to pass to `release`.
+
+        Raises:
+            KeyError: If the lane does not exist.
+        """
+        backlog = self._backlog(tenant, lane)
+        capacity = self.capacity()
+        if not self._queued() and backlog.tenant.has_room() and self.in_flight < capacity \
+                and backlog.lane.has_room(capacity):
+            self._admit(backlog)
+            backlog.tenant.wait_latency.record(0.0)
+            backlog.lane.wait_latency.record(0.0)
+            return backlog
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        backlog.waiters.append(waiter)
+        if backlog not in backlog.lane._active:
+            backlog.lane._active.append(backlog)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.cancelled():
+                self.release(backlog)
+            else:
+                # A release may already have popped the cancelled waiter while skipping it
+                if waiter in backlog.waiters:
+                    backlog.waiters.remove(waiter)
+                active = backlog.lane._active
+                if not backlog.waiters and backlog in active:
+                    if backlog is active[0]:
+                        self._drop_head(backlog.lane)
+                    else:
+                        active.remove(backlog)
+                        backlog.deficit = 0.0
+            raise
+        waited = time.monotonic() - started
+        backlog.tenant.wait_latency.record(waited)
+        backlog.lane.wait_latency.record(waited)
+        return backlog
+
+    def release(self, backlog: _Backlog):
+        """
+        Frees an admitted call and admits queued calls in priority and fair order.
+
+        Args:
+            backlog (_Backlog): The value returned by `acquire`.
+        """
+        backlog.tenant.in_flight -= 1
+        backlog.lane.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, lane: Optional[str] = None):
+        """
+        Holds an admission for the duration of a call.
+
+        Args:
+            tenant (str): The tenant (merchant) making the call.
+            lane (Optional[str]): The priority lane; defaults to the first (highest priority) lane.
+        """
+        backlog = await self.acquire(tenant, lane)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            backlog.lane.latency.record(time.monotonic() - started)
+            self.release(backlog)
+
+    def configure(self, default_limit: Optional[int] = None, lanes: Optional[dict] = None):
+        """
+        Changes the default per-tenant cap and lane settings, then admits any calls they now allow.
+
+        Tenants with their own entry in `limits` keep their cap. Calls already admitted
+        are not affected; a lower cap takes effect as they finish.
+
+        Args:
+            default_limit (Optional[int]): Maximum calls in flight per tenant; 0 or None means no cap.
+            lanes (Optional[dict]): (reserved, max_share) pairs keyed by lane name.
+
+        Raises:
+            KeyError: If a lane does not exist.
+            ValueError: If lane settings are out of range; nothing is changed.
+        """
+        lanes = lanes or {}
+        # Checked first, so an unknown lane or a bad value changes nothing
+        for name, (reserved, max_share) in lanes.items():
+            Lane(self.lanes[name].name, reserved, max_share)
+        self.default_limit = default_limit
+        for tenant in self._tenants.values():
+            if tenant.name not in self.limits:
+                tenant.max_in_flight = default_limit or None
+        for name, (reserved, max_share) in lanes.items():
+            self.lanes[name].reserved = reserved
+            self.lanes[name].max_share = max_share
+        self._dispatch()
+
+    def stats(self) -> dict:
+        """
+        Returns admission counts and latency per lane, and queue-wait latency per tenant.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the scheduler metrics.
+        """
+        queued = {}
+        for lane in self.lanes.values():
+            for backlog in lane._active:
+                queued[backlog.tenant.name] = queued.get(backlog.tenant.name, 0) + len(backlog.waiters)
+        return {
+            "capacity": self.capacity(),
+            "in_flight": self.in_flight,
+            "queued": sum(queued.values()),
+            "lanes": {
+                lane.name: {
+                    "reserved": lane.reserved,
+                    "max_share": lane.max_share,
+                    "in_flight": lane.in_flight,
+                    "queued": lane.queued(),
+                    "admitted": lane.admitted,
+                    "queue_wait": lane.wait_latency.snapshot(),
+                    "latency": lane.latency.snapshot(),
+                }
+                for lane in self.lanes.values()
+            },
+            "tenants": {
+                tenant.name: {
+                    "weight": tenant.weight,
+                    "max_in_flight": tenant.max_in_flight,
+                    "in_flight": tenant.in_flight,
+                    "queued": queued.get(tenant.name, 0),
+                    "admitted": tenant.admitted,
+                    "queue_wait": tenant.wait_latency.snapshot(),
+                }
+                for tenant in self._tenants.values()
+            },
+        }
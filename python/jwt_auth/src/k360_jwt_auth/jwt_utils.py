@@ -16,17 +16,20 @@ import jwt as pyjwt
 import aiohttp
 
 from fastapi import HTTPException
-from tenacity import retry, wait_fixed
+from tenacity import retry
 
-# Constants
-REFRESH_TIME_BUFFER = 2 * 60  # 2 minutes before expiry
-"""
-The number of seconds before token expiration to refresh the token.
-"""
+from .retry_budget import retry_budget, stop_if_retry_budget_exhausted
+from .tracing import tracer
+from .tuning import performance_config, wait_configured_fixed
+from .warmup import dns_cache
 
-AUTH_SERVER_URL = "https://login-uat.equifax.com/as/token"
+# Constants
+# The refresh buffer and cooldown, the token request timeout and the retry wait are
+# tunable at runtime (see k360_jwt_auth.tuning).
+AUTH_SERVER_URL = os.getenv("KOUNT_AUTH_SERVER_URL", "https://login-uat.equifax.com/as/token")
 """
 The URL of the OAuth2 token endpoint for Kount authentication.
+Override with KOUNT_AUTH_SERVER_URL, e.g. to point at a local stand-in for load tests.
 """
 
 API_KEY = os.getenv("KOUNT_API_KEY")
@@ -81,12 +84,19 @@ class TokenManager:
         self.access_token = token
 
 
-@retry(wait=wait_fixed(10))
+@tracer.traced("kount.token.fetch")
+@retry(
+    wait=wait_configured_fixed(performance_config, "token_retry_wait"),
+    stop=stop_if_retry_budget_exhausted(retry_budget),
+    before=retry_budget.record_attempt,
+    before_sleep=tracer.record_retry,
+)
 async def fetch_or_refresh_token(token_manager: TokenManager):
     """
     Fetches a new access token from the Kount auth server using client credentials.
 
-    Retries every 10 seconds on failure.
+    Retries every `token_retry_wait` seconds (10 by default) on failure while the
+    shared retry budget allows it.
 
     Args:
         token_manager (TokenManager): The token manager instance to update.
@@ -95,9 +105,9 @@ async def fetch_or_refresh_token(token_manager: TokenManager):
         str: The newly obtained access token.
 
     Raises:
-        HTTPException: If the token request fails.
+        tenacity.RetryError: If the token request fails and the retry budget is exhausted.
     """
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=dns_cache)) as session:
         try:
             params = {"grant_type": "client_credentials", "scope": "k1_integration_api"}
             headers = {
@@ -105,7 +115,7 @@ async def fetch_or_refresh_token(token_manager: TokenManager):
                 "Content-Type": "application/x-www-form-urlencoded",
             }
             async with session.post(
-                AUTH_SERVER_URL, params=params, headers=headers, timeout=10
+                AUTH_SERVER_URL, params=params, headers=headers, timeout=performance_config.current.token_timeout
             ) as response:
                 response.raise_for_status()
                 data = await response.json()
@@ -121,7 +131,9 @@ async def start_token_refresh_timer(token_manager: TokenManager):
     """
     Starts a background loop that automatically refreshes the token before it expires.
 
-    Uses the token's decoded expiration time and refreshes it 2 minutes early.
+    Uses the token's decoded expiration time and refreshes it `token_refresh_buffer`
+    seconds (2 minutes by default) early. If a refresh gives up, the current token
+    stays in use and the refresh is attempted again after `token_refresh_cooldown` seconds.
 
     Args:
         token_manager (TokenManager): The token manager instance to refresh.
@@ -130,13 +142,17 @@ async def start_token_refresh_timer(token_manager: TokenManager):
         current_token = token_manager.get_access_token()
         try:
             decoded = pyjwt.decode(current_token, options={"verify_signature": False})
-            exp_time = decoded["exp"] - REFRESH_TIME_BUFFER
+            exp_time = decoded["exp"] - performance_config.current.token_refresh_buffer
             time_until_refresh = exp_time - int(time.time())
         except pyjwt.DecodeError:
             time_until_refresh = 0
         if time_until_refresh > 0:
             await asyncio.sleep(time_until_refresh)
-        await fetch_or_refresh_token(token_manager)
+        try:
+            await fetch_or_refresh_token(token_manager)
+        except Exception as e:
+            logger.error("Token refresh gave up, keeping current token: %s", e)
+            await asyncio.sleep(performance_config.current.token_refresh_cooldown)
 
 
 # Create a global token manager instance to be reused across the app
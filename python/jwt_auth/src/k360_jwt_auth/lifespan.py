@@ -8,23 +8,29 @@ Kount API access tokens and optionally webhook public key refresh logic.
 Usage:
     app = FastAPI(lifespan=token_lifespan())                 # JWT only
     app = FastAPI(lifespan=token_lifespan(use_public_key=True))  # JWT + Public key
+    app = FastAPI(lifespan=token_lifespan(warmer=ConnectionWarmer(...)))  # JWT + warm Kount connections
 """
 
 import asyncio
 from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 
-from .jwt_utils import token_manager, fetch_or_refresh_token, start_token_refresh_timer
-from .pub_key_utils import fetch_public_key, start_public_key_refresh_timer
+from .jwt_utils import AUTH_SERVER_URL, token_manager, fetch_or_refresh_token, start_token_refresh_timer
+from .pub_key_utils import PUBLIC_KEY_URL_TEMPLATE, fetch_public_key, start_public_key_refresh_timer
+from .warmup import ConnectionWarmer, dns_cache
 
 
-def token_lifespan(use_public_key: bool = False):
+def token_lifespan(use_public_key: bool = False, warmer: Optional[ConnectionWarmer] = None):
     """
     Creates a FastAPI lifespan context manager that manages the lifecycle of
     the Kount JWT token and optionally a webhook public key.
 
     Args:
         use_public_key (bool): If True, also fetches and refreshes the public key.
+        warmer (Optional[ConnectionWarmer]): If given, pre-resolves and opens its connections
+            before startup completes, and keeps them alive until shutdown.
 
     Returns:
         Callable: An async context manager function for FastAPI's lifespan hook.
@@ -35,17 +41,21 @@ def token_lifespan(use_public_key: bool = False):
         The actual async context manager used by FastAPI to handle startup and shutdown.
 
         On startup:
+            - Pre-resolves the auth (and public key) hosts into the shared DNS cache.
             - Fetches and schedules refresh of JWT access token.
             - Optionally fetches and schedules refresh of public key.
+            - Optionally warms pooled connections to the Kount API.
 
         On shutdown:
-            - Cancels background refresh tasks gracefully.
+            - Cancels background refresh and keep-alive tasks gracefully.
 
         Args:
             app (FastAPI): The FastAPI application instance.
         """
         print("🚀 Starting token lifespan manager")
         try:
+            await dns_cache.preresolve([AUTH_SERVER_URL] + ([PUBLIC_KEY_URL_TEMPLATE] if use_public_key else []))
+
             # JWT is always required
             await fetch_or_refresh_token(token_manager)
             app.state.refresh_task = asyncio.create_task(start_token_refresh_timer(token_manager))
@@ -56,11 +66,17 @@ def token_lifespan(use_public_key: bool = False):
                 await fetch_public_key()
                 app.state.public_key_task = asyncio.create_task(start_public_key_refresh_timer())
 
+            # Readiness is reported only after this returns, so warm-up happens before traffic
+            if warmer:
+                await warmer.start()
+
             print("✅ Lifespan initialization complete")
             yield
 
         finally:
             print("🛑 Shutting down refresh tasks")
+            if warmer:
+                await warmer.stop()
             app.state.refresh_task.cancel()
             try:
                 await app.state.refresh_task
@@ -0,0 +1,316 @@
+"""
+Local decision rules used when the Kount API cannot be reached.
+
+The rules are read from a JSON file and compiled once into closures, so the
+fail-open path only extracts a few facts from the order and runs a list of
+predicates over them. The first rule that matches decides; otherwise the
+configured default decision applies.
+
+Config format:
+    {
+        "default_decision": "APPROVE",
+        "rules": [
+            {"name": "blocked-bins", "type": "bin_in", "bins": ["411111"], "decision": "DECLINE"},
+            {"name": "large-order", "type": "amount_above", "amount": 100000, "decision": "REVIEW"},
+            {"name": "ship-bill-mismatch", "type": "country_mismatch", "decision": "REVIEW"},
+            {"name": "digital-goods", "type": "digital_goods", "amount": 5000, "decision": "REVIEW"},
+            {"name": "new-account", "type": "account_age_below", "days": 7, "decision": "REVIEW"}
+        ]
+    }
+
+Amounts are compared in the order's own units (the sum of transaction `order_total`).
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DECISIONS = {"APPROVE", "REVIEW", "DECLINE"}
+
+
+class OrderFacts(NamedTuple):
+    """The order attributes the rules look at, extracted once per evaluation."""
+    amount: float
+    bins: frozenset
+    billing_countries: frozenset
+    shipping_countries: frozenset
+    has_digital: bool
+    account_age_days: Optional[float]
+
+
+class CompiledRule(NamedTuple):
+    """A rule compiled into a predicate over OrderFacts."""
+    name: str
+    decision: str
+    predicate: Callable[[OrderFacts], bool]
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def extract_facts(order: dict) -> OrderFacts:
+    """
+    Extracts the facts the rules need from incoming merchant order data.
+
+    Args:
+        order (dict): The raw order as received by /process-transaction.
+
+    Returns:
+        OrderFacts: The extracted facts.
+    """
+    amount = 0.0
+    bins = set()
+    billing_countries = set()
+    for transaction in order.get("transactions") or ():
+        if not isinstance(transaction, dict):
+            continue
+        amount += _to_float(transaction.get("order_total"))
+        payment = transaction.get("payment")
+        if isinstance(payment, dict) and payment.get("bin"):
+            bins.add(str(payment["bin"]))
+        billing = transaction.get("billingPerson")
+        if isinstance(billing, dict) and isinstance(billing.get("address"), dict):
+            country = billing["address"].get("country_code")
+            if country:
+                billing_countries.add(country)
+
+    shipping_countries = set()
+    for fulfillment in order.get("fulfillment") or ():
+        recipient = fulfillment.get("recipient") if isinstance(fulfillment, dict) else None
+        if isinstance(recipient, dict) and isinstance(recipient.get("address"), dict):
+            country = recipient["address"].get("country_code")
+            if country:
+                shipping_countries.add(country)
+
+    has_digital = any(isinstance(item, dict) and item.get("is_digital") for item in order.get("items") or ())
+
+    account_age_days = None
+    account_created = _parse_datetime(order.get("account_creation_datetime"))
+    if account_created:
+        order_created = _parse_datetime(order.get("creation_datetime")) or datetime.now(timezone.utc)
+        account_age_days = (order_created - account_created).total_seconds() / 86400
+
+    return OrderFacts(amount, frozenset(bins), frozenset(billing_countries), frozenset(shipping_countries),
+                      has_digital, account_age_days)
+
+
+# ---------------------------
+# Rule Compilers
+# ---------------------------
+
+def _amount_above(spec: dict):
+    threshold = float(spec["amount"])
+    return lambda facts: facts.amount > threshold
+
+
+def _bin_in(spec: dict):
+    bins = frozenset(str(value) for value in spec["bins"])
+    return lambda facts: not bins.isdisjoint(facts.bins)
+
+
+def _country_mismatch(spec: dict):
+    return lambda facts: bool(facts.billing_countries and facts.shipping_countries
+                              and not facts.shipping_countries <= facts.billing_countries)
+
+
+def _country_in(spec: dict):
+    countries = frozenset(spec["countries"])
+    return lambda facts: not countries.isdisjoint(facts.billing_countries | facts.shipping_countries)
+
+
+def _digital_goods(spec: dict):
+    threshold = float(spec.get("amount", 0))
+    return lambda facts: facts.has_digital and facts.amount >= threshold
+
+
+def _account_age_below(spec: dict):
+    days = float(spec["days"])
+    return lambda facts: facts.account_age_days is not None and facts.account_age_days < days
+
+
+RULE_COMPILERS = {
+    "amount_above": _amount_above,
+    "bin_in": _bin_in,
+    "country_mismatch": _country_mismatch,
+    "country_in": _country_in,
+    "digital_goods": _digital_goods,
+    "account_age_below": _account_age_below,
+}
+"""
+Rule `type` to a function compiling its config into a predicate over OrderFacts.
+"""
+
+
+def compile_rules(config: dict):
+    """
+    Compiles a rules config into predicates.
+
+    Args:
+        config (dict): The parsed config (see module docstring).
+
+    Returns:
+        tuple: (list of CompiledRule, default decision).
+
+    Raises:
+        ValueError: If the config or a rule is not an object, or a rule has an unknown type,
+            a missing parameter or an invalid decision.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("The local rules config must be an object.")
+    default_decision = config.get("default_decision", "APPROVE")
+    if default_decision not in DECISIONS:
+        raise ValueError(f"Invalid default_decision: {default_decision}")
+
+    specs = config.get("rules", [])
+    if not isinstance(specs, list):
+        raise ValueError("The local rules config's rules must be a list.")
+    rules = []
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Rule rule-{index} must be an object.")
+        name = spec.get("name", f"rule-{index}")
+        compiler = RULE_COMPILERS.get(spec.get("type"))
+        if compiler is None:
+            raise ValueError(f"Rule {name}: unknown type {spec.get('type')!r}")
+        if spec.get("decision") not in DECISIONS:
+            raise ValueError(f"Rule {name}: invalid decision {spec.get('decision')!r}")
+        try:
+            predicate = compiler(spec)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Rule {name}: invalid parameters: {e}") from e
+        rules.append(CompiledRule(name, spec["decision"], predicate))
+    return rules, default_decision
+
+
+class LocalRulesEngine:
+    """
+    Evaluates compiled local rules and reloads them when the config file changes.
+
+    Attributes:
+        path (Optional[str]): The JSON config file, or None to always return the default decision.
+        rules (list): The compiled rules, in evaluation order.
+        default_decision (str): Decision used when no rule matches.
+        counters (dict): Evaluations, orders too malformed to evaluate, reloads and failed reloads.
+        matches (dict): Matches per rule name.
+    """
+
+    def __init__(self, path: Optional[str] = None, default_decision: str = "APPROVE"):
+        self.path = path
+        self.rules = []
+        self.default_decision = default_decision
+        self.counters = {"evaluations": 0, "evaluation_errors": 0, "reloads": 0, "reload_errors": 0}
+        self.matches = {}
+        self._mtime = None
+        if path:
+            self.load()
+
+    def load(self):
+        """
+        Reads and compiles the config file, replacing the current rules.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not valid JSON or a rule is invalid.
+        """
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r", encoding="utf-8") as handle:
+            config = json.load(handle)
+        # Compiled in full before replacing anything, so an invalid config leaves the old rules in place
+        self.rules, self.default_decision = compile_rules(config)
+        self._mtime = mtime
+        self.matches = {rule.name: self.matches.get(rule.name, 0) for rule in self.rules}
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the rules if the config file's modification time changed.
+
+        A config that fails to load is logged and the previous rules stay in effect.
+
+        Returns:
+            bool: True if new rules were loaded.
+        """
+        if not self.path:
+            return False
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return False
+            self.load()
+        except (OSError, ValueError) as e:
+            self.counters["reload_errors"] += 1
+            logger.error("Keeping previous local rules, reload of %s failed: %s", self.path, e)
+            return False
+        self.counters["reloads"] += 1
+        return True
+
+    async def watch(self, interval: float = 5.0):
+        """
+        Background coroutine that checks the config file for changes every `interval` seconds.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
+
+    def evaluate(self, order: dict):
+        """
+        Decides an order locally.
+
+        Args:
+            order (dict): The raw order as received by /process-transaction.
+
+        Returns:
+            tuple: (decision, name of the matching rule or None for the default decision); an order
+                too malformed to extract facts from gets the default decision.
+        """
+        self.counters["evaluations"] += 1
+        rules = self.rules
+        if not rules:
+            return self.default_decision, None
+        try:
+            facts = extract_facts(order)
+        except Exception as e:
+            # This runs on the fail-open path, which must answer for any order it is given
+            self.counters["evaluation_errors"] += 1
+            logger.error("Cannot evaluate local rules for a malformed order, using the default decision: %s", e)
+            return self.default_decision, None
+        for rule in rules:
+            if rule.predicate(facts):
+                self.matches[rule.name] = self.matches.get(rule.name, 0) + 1
+                return rule.decision, rule.name
+        return self.default_decision, None
+
+    def stats(self) -> dict:
+        """
+        Returns the loaded rule count and counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the engine.
+        """
+        return {
+            "path": self.path,
+            "rules": len(self.rules),
+            "default_decision": self.default_decision,
+            **self.counters,
+            "matches": dict(self.matches),
+        }
@@ -0,0 +1,165 @@
+"""
+Event-loop lag monitor and blocking-call detector for the Kount FastAPI apps.
+
+Anything synchronous on the event loop (file logging, RSA signature checks,
+`json.dumps` of a big payload, `build_payload` on a huge order) delays every
+other request in the process. The monitor makes that visible:
+
+- A heartbeat coroutine sleeps for `interval` and records how late it woke up
+  as loop lag, reported as percentiles.
+- A watchdog thread notices when the heartbeat has not run for longer than
+  `block_threshold`, i.e. while the loop is still blocked, and captures the
+  event-loop thread's stack at that moment. That stack names the blocking
+  callback; it is logged and kept with the stall's final duration.
+
+The monitor is opt-in (KOUNT_LOOP_MONITOR=true) and costs one wake-up per
+interval on the loop plus one in the watchdog thread.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from .metrics import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.getenv("KOUNT_LOOP_MONITOR", "false").lower() == "true"
+"""
+Whether `loop_monitor.start()` starts monitoring.
+"""
+
+LOOP_MONITOR_INTERVAL = float(os.getenv("KOUNT_LOOP_MONITOR_INTERVAL", "0.05"))
+"""
+Seconds between heartbeats, i.e. the lag sampling period.
+"""
+
+LOOP_BLOCK_THRESHOLD = float(os.getenv("KOUNT_LOOP_BLOCK_THRESHOLD", "0.1"))
+"""
+Seconds the loop may go without a heartbeat before a stack trace is captured.
+"""
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag and captures stacks of callbacks that block the loop.
+
+    Attributes:
+        enabled (bool): Whether `start()` starts monitoring.
+        interval (float): Seconds between heartbeats.
+        block_threshold (float): Lag, in seconds, that counts as a blocking call.
+        lag (LatencyRecorder): Recent lag samples.
+        stalls (deque): The most recent blocking calls, newest last.
+        counters (dict): Blocking calls detected since startup.
+    """
+
+    def __init__(self, enabled: bool = LOOP_MONITOR_ENABLED, interval: float = LOOP_MONITOR_INTERVAL,
+                 block_threshold: float = LOOP_BLOCK_THRESHOLD, max_stalls: int = 20):
+        self.enabled = enabled
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.lag = LatencyRecorder()
+        self.stalls = deque(maxlen=max_stalls)
+        self.counters = {"stalls": 0}
+        self._last_beat = 0.0
+        self._pending_stall = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.lag.record(lag)
+            stall = self._pending_stall
+            if stall is not None:
+                self._pending_stall = None
+                stall["duration_ms"] = round(lag * 1000, 3)
+                if lag >= self.block_threshold:
+                    logger.error("Event loop was blocked for %.1f ms at:\n%s", lag * 1000, stall["stack"])
+
+    def _watch(self):
+        # Runs in its own thread, so it still wakes up while the loop is blocked
+        poll = min(self.interval, self.block_threshold) / 2
+        reported_beat = None
+        while not self._stopping.wait(poll):
+            beat = self._last_beat
+            if beat == reported_beat or time.monotonic() - beat < self.interval + self.block_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            stall = {
+                "detected_at": time.time(),
+                "duration_ms": None,
+                "stack": "".join(traceback.format_stack(frame)),
+            }
+            self.counters["stalls"] += 1
+            self.stalls.append(stall)
+            self._pending_stall = stall
+
+    async def start(self):
+        """Starts the heartbeat and the watchdog thread, if enabled."""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        """Stops the heartbeat and the watchdog thread."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join()
+        self._watchdog = None
+
+    def stats(self, stacks: bool = True) -> Optional[dict]:
+        """
+        Returns lag percentiles and the most recent blocking calls.
+
+        Args:
+            stacks (bool): Whether to include the captured stack of each blocking call.
+
+        Returns:
+            Optional[dict]: A JSON-serialisable snapshot, or None when the monitor is disabled.
+        """
+        if not self.enabled:
+            return None
+        return {
+            "interval_ms": self.interval * 1000,
+            "block_threshold_ms": self.block_threshold * 1000,
+            "lag": self.lag.snapshot(),
+            **self.counters,
+            "recent_stalls": [
+                stall if stacks else {k: v for k, v in stall.items() if k != "stack"}
+                for stall in list(self.stalls)
+            ],
+        }
+
+
+loop_monitor = LoopLagMonitor()
+"""
+The process-wide monitor started by each app's lifespan (opt-in via KOUNT_LOOP_MONITOR).
+"""
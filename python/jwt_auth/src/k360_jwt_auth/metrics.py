@@ -0,0 +1,100 @@
+"""
+Lightweight in-process metrics helpers for the Kount FastAPI apps.
+
+Values are kept in memory and returned as plain dicts so each app can
+publish them on its own internal stats endpoint. Those endpoints depend on
+`require_stats_token`: they are disabled unless KOUNT_STATS_TOKEN is set and
+then require it in the X-Stats-Token header.
+"""
+
+import hmac
+import math
+import os
+from collections import deque
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+STATS_TOKEN = os.getenv("KOUNT_STATS_TOKEN")
+"""
+Shared secret required by the internal stats endpoints; they are disabled when unset.
+"""
+
+
+def _nearest_rank(ordered: list, pct: float) -> float:
+    """Returns the nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class LatencyRecorder:
+    """
+    Keeps a bounded window of recent latency samples and reports percentiles.
+
+    Attributes:
+        count (int): Total number of samples recorded since startup.
+        total (float): Sum of all recorded samples, in seconds.
+        max (float): Largest sample recorded since startup, in seconds.
+    """
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """
+        Records a single latency sample.
+
+        Args:
+            seconds (float): The observed latency, in seconds.
+        """
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """
+        Returns the given percentile over the current sample window.
+
+        Args:
+            pct (float): Percentile between 0 and 100.
+
+        Returns:
+            float: The latency at that percentile in seconds, or 0.0 if no samples exist.
+        """
+        return _nearest_rank(sorted(self._samples), pct)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a summary of the recorded latencies in milliseconds.
+
+        Returns:
+            dict: Sample count, mean, p50/p95/p99 over the window and the overall max.
+        """
+        ordered = sorted(self._samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(_nearest_rank(ordered, 50) * 1000, 3),
+            "p95_ms": round(_nearest_rank(ordered, 95) * 1000, 3),
+            "p99_ms": round(_nearest_rank(ordered, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+def require_stats_token(x_stats_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency that guards the internal stats endpoints.
+
+    Raises:
+        HTTPException: 404 when the stats endpoints are disabled, 403 when the token does not match.
+    """
+    if not STATS_TOKEN:
+        raise HTTPException(status_code=404)
+    if not x_stats_token or not hmac.compare_digest(x_stats_token, STATS_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid stats token")
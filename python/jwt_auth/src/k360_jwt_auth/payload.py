@@ -0,0 +1,200 @@
+"""
+Payload mapping from merchant order data to the Kount Orders API format.
+
+Kept free of app and auth state so the FastAPI apps, the command-line
+tools and embedded clients all build identical payloads.
+
+Every object is compacted as it is built: None values, empty lists and
+empty objects are dropped on the way up, so nested objects whose fields are
+all missing disappear from the payload without a second pass over it.
+"""
+
+_EMPTY_DICT = {}
+_CONTAINER_TYPES = (list, dict)
+
+PHYSICAL_ATTRIBUTE_FIELDS = ("color", "size", "weight", "height", "width", "depth")
+
+
+def _compact(fields: dict):
+    """
+    Drops None values, empty lists and empty objects from a freshly built object.
+
+    Args:
+        fields (dict): The object being built.
+
+    Returns:
+        dict or None: The compacted object, or None if nothing is left.
+    """
+    # Pruned in place; truthy values short-circuit and falsy scalars such as False, 0 and "" are kept
+    for key in [key for key, value in fields.items()
+                if value is None or (not value and type(value) in _CONTAINER_TYPES)]:
+        del fields[key]
+    return fields or None
+
+
+def _compact_list(values) -> list:
+    """Drops None entries from a list of compacted objects."""
+    return [value for value in values if value is not None]
+
+
+def _build_item(item: dict):
+    return _compact({
+        "price": str(item.get("price", "0")),
+        "description": item.get("description"),
+        "name": item.get("name"),
+        "quantity": item.get("quantity", 1),
+        "category": item.get("category"),
+        "subCategory": item.get("sub_category"),
+        "isDigital": item.get("is_digital"),
+        "sku": item.get("sku"),
+        "upc": item.get("upc"),
+        "brand": item.get("brand"),
+        "url": item.get("url"),
+        "imageUrl": item.get("image_url"),
+        "physicalAttributes": _compact({field: item.get(field) for field in PHYSICAL_ATTRIBUTE_FIELDS}),
+        "descriptors": item.get("descriptors"),
+        "id": item.get("item_id"),
+        "isService": item.get("is_service"),
+    })
+
+
+def _build_fulfillment(fulfillment: dict):
+    shipping = fulfillment.get("shipping", _EMPTY_DICT)
+    recipient = fulfillment.get("recipient")
+    return _compact({
+        "type": fulfillment["type"],
+        "shipping": _compact({
+            "amount": str(shipping.get("amount", "0")),
+            "provider": shipping.get("provider"),
+            "trackingNumber": shipping.get("tracking_number"),
+            "method": shipping.get("method"),
+        }),
+        "recipientPerson": _compact({
+            "name": _compact({
+                "first": recipient["first"],
+                "family": recipient["family"],
+            }),
+            "phoneNumber": recipient.get("phone_number"),
+            "emailAddress": recipient.get("email_address"),
+            "address": recipient.get("address"),
+        }) if recipient is not None else None,
+        "merchantFulfillmentId": fulfillment.get("merchant_fulfillment_id"),
+        "digitalDownloaded": fulfillment.get("digital_downloaded"),
+    })
+
+
+def _build_billed_person(billing_person):
+    if not isinstance(billing_person, dict):
+        return None
+    name = billing_person.get("name")
+    address = billing_person.get("address")
+    return _compact({
+        "name": _compact({
+            "first": name.get("first"),
+            "preferred": name.get("preferred"),
+            "family": name.get("family"),
+            "middle": name.get("middle"),
+            "prefix": name.get("prefix"),
+            "suffix": name.get("suffix"),
+        }) if isinstance(name, dict) else None,
+        "phoneNumber": billing_person.get("phone"),
+        "emailAddress": billing_person.get("email"),
+        "address": address if isinstance(address, dict) else None,
+    })
+
+
+def _build_authorization_status(authorization_status):
+    if not isinstance(authorization_status, dict):
+        return None
+    verification = authorization_status.get("verificationResponse")
+    return _compact({
+        "authResult": authorization_status.get("authResult"),
+        "dateTime": authorization_status.get("dateTime"),
+        "verificationResponse": _compact({
+            "cvvStatus": verification.get("cvvStatus"),
+            "avsStatus": verification.get("avsStatus"),
+        }) if isinstance(verification, dict) else None,
+    })
+
+
+def _build_transaction(transaction: dict):
+    payment = transaction.get("payment", _EMPTY_DICT)
+    tax = transaction.get("tax", _EMPTY_DICT)
+    return _compact({
+        "processor": transaction.get("processor"),
+        "processorMerchantId": transaction.get("processor_merchant_id"),
+        "payment": _compact({
+            "type": payment.get("type"),
+            "paymentToken": payment.get("payment_token"),
+            "bin": payment.get("bin"),
+            "last4": payment.get("last4"),
+        }),
+        "subtotal": str(transaction.get("subtotal", "0")),
+        "orderTotal": str(transaction.get("order_total", "0")),
+        "currency": transaction.get("currency"),
+        "tax": _compact({
+            "isTaxable": tax.get("is_taxable"),
+            "taxableCountryCode": tax.get("taxable_country_code"),
+            "taxAmount": str(tax.get("tax_amount", "0")),
+            "outOfStateTaxAmount": str(tax.get("out_of_state_tax_amount", "0")),
+        }),
+        "billedPerson": _build_billed_person(transaction.get("billingPerson")),
+        "transactionStatus": transaction.get("transaction_status"),
+        "authorizationStatus": _build_authorization_status(transaction.get("authorizationStatus")),
+        "merchantTransactionId": transaction.get("merchant_transaction_id"),
+        "items": [
+            _compact({
+                "id": item.get("id"),
+                "quantity": item.get("quantity", 1),
+            })
+            for item in transaction.get("items", []) if isinstance(item, dict)
+        ],
+    })
+
+
+def build_payload(incoming_data: dict, patch = False) -> dict:
+    """
+    Map incoming website data to the Kount API's required payload format.
+
+    None values, empty lists and empty objects are left out at every level.
+
+    Args:
+        incoming_data (dict): The raw data from the website.
+
+    Returns:
+        dict: A payload formatted for the Kount API.
+
+    Raises:
+        ValueError: If the required field `merchantOrderId` is missing.
+    """
+    merchant_order_id = incoming_data.get("order_id")
+    if not merchant_order_id and not patch:
+        raise ValueError("Missing required field: merchantOrderId")
+
+    payload = _compact({
+        "merchantOrderId": merchant_order_id,
+        "channel": incoming_data.get("channel"),
+        "deviceSessionId": incoming_data.get("device_session_id"),
+        "creationDateTime": incoming_data.get("creation_datetime"),
+        "userIp": incoming_data.get("user_ip"),
+        "account": _compact({
+            "id": incoming_data.get("account_id"),
+            "type": incoming_data.get("account_type"),
+            "creationDateTime": incoming_data.get("account_creation_datetime"),
+            "username": incoming_data.get("username"),
+            "accountIsActive": incoming_data.get("account_is_active"),
+        }) if isinstance(incoming_data.get("account_id"), (str, int)) else None,
+        "items": _compact_list(
+            _build_item(item) for item in incoming_data.get("items", []) if isinstance(item, dict)
+        ) if "items" in incoming_data else None,
+        "fulfillment": _compact_list(
+            _build_fulfillment(fulfillment) for fulfillment in incoming_data.get("fulfillment", [])
+        ) if "fulfillment" in incoming_data else None,
+        "transactions": _compact_list(
+            _build_transaction(transaction)
+            for transaction in incoming_data.get("transactions", []) if isinstance(transaction, dict)
+        ) if "transactions" in incoming_data else None,
+        "customFields": incoming_data.get("custom_fields"),
+    })
+
+    return payload or {}
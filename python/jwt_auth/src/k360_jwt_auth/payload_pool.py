@@ -0,0 +1,229 @@
+"""
+Size-adaptive offload of Kount payload construction to a process pool.
+
+Building and encoding a typical order takes well under a millisecond, but a
+large B2B order with thousands of line items can hold the event loop for tens
+of milliseconds, stalling every other request on the worker. Orders above a
+size threshold (line items, fulfillments and transactions) are therefore
+built in a small process pool; smaller orders stay inline, where the hop to
+another process would cost more than it saves.
+
+Workers receive the request body bytes as received and return the encoded
+Kount body, so neither direction pickles a nested dict.
+
+The threshold and pool size are the `offload_threshold` and `offload_workers`
+performance settings (KOUNT_OFFLOAD_THRESHOLD and KOUNT_OFFLOAD_WORKERS, see
+k360_jwt_auth.tuning); this module only holds their defaults.
+
+tools/bench_payload_offload.py measures inline and offloaded latency and the
+event-loop stall across order sizes to calibrate the threshold.
+
+Usage:
+    payload_pool = PayloadPool(compress_min_bytes=16384)
+    await payload_pool.start()
+    body, gzipped = await payload_pool.encode(order, raw_body)
+    ...
+    await payload_pool.stop()
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from typing import Optional
+
+from .metrics import LatencyRecorder
+from .payload import build_payload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OFFLOAD_THRESHOLD = 1000
+"""
+Default order size (line items + fulfillments + transactions) at which payloads are built in the pool.
+"""
+
+DEFAULT_OFFLOAD_WORKERS = 2
+"""
+Default number of processes in the payload pool.
+"""
+
+
+def order_size(order: dict) -> int:
+    """
+    Estimates the cost of building an order's payload from its repeated sections.
+
+    Args:
+        order (dict): The decoded merchant order.
+
+    Returns:
+        int: Line items, fulfillments and transactions in the order.
+    """
+    size = 0
+    for section in ("items", "fulfillment", "transactions"):
+        values = order.get(section)
+        if isinstance(values, list):
+            size += len(values)
+    return size
+
+
+def encode_payload(payload: dict, compress_min_bytes: Optional[int] = None) -> tuple:
+    """
+    Serialises a Kount payload as compact JSON, gzip-compressing it when large enough.
+
+    Args:
+        payload (dict): The Kount payload.
+        compress_min_bytes (Optional[int]): Size from which bodies are compressed; None never compresses.
+
+    Returns:
+        tuple: (body bytes, whether the body is gzip-compressed).
+    """
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    if compress_min_bytes is not None and len(body) >= compress_min_bytes:
+        return gzip.compress(body, compresslevel=6), True
+    return body, False
+
+
+def encode_order(raw_body: bytes, compress_min_bytes: Optional[int] = None) -> tuple:
+    """
+    Decodes a merchant order and returns its encoded Kount payload; runs in the pool workers.
+
+    Args:
+        raw_body (bytes): The request body as received.
+        compress_min_bytes (Optional[int]): Size from which bodies are compressed; None never compresses.
+
+    Returns:
+        tuple: (body bytes, whether the body is gzip-compressed).
+
+    Raises:
+        ValueError: If the body is not JSON or the order has no order_id.
+    """
+    return encode_payload(build_payload(json.loads(raw_body)), compress_min_bytes)
+
+
+def _warm():
+    return os.getpid()
+
+
+class PayloadPool:
+    """
+    Builds small orders' payloads inline and large orders' payloads in worker processes.
+
+    Attributes:
+        threshold (int): Order size at which payloads are offloaded; 0 disables offload.
+        workers (int): Processes in the pool.
+        compress_min_bytes (Optional[int]): Size from which bodies are gzip-compressed; None never compresses.
+        inline_latency (LatencyRecorder): Build and encode time of inline orders (all on the event loop).
+        offload_latency (LatencyRecorder): Round trip of offloaded orders, including the hop to the worker.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_OFFLOAD_THRESHOLD, workers: int = DEFAULT_OFFLOAD_WORKERS,
+                 compress_min_bytes: Optional[int] = None):
+        self.threshold = threshold
+        self.workers = workers
+        self.compress_min_bytes = compress_min_bytes
+        self.inline_latency = LatencyRecorder()
+        self.offload_latency = LatencyRecorder()
+        self.counters = {"inline": 0, "offloaded": 0, "offload_errors": 0}
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether large orders are offloaded."""
+        return self.threshold > 0 and self.workers > 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # forkserver children do not inherit the event loop, open sockets or threads of the app
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    async def start(self):
+        """Starts the worker processes so the first large order does not pay for them."""
+        if self.enabled:
+            loop = asyncio.get_running_loop()
+            pool = self._pool()
+            # Spawning the workers takes a while; wait for them without holding the event loop
+            await asyncio.gather(*(loop.run_in_executor(pool, _warm) for _ in range(self.workers)))
+
+    async def stop(self, wait: bool = True):
+        """
+        Shuts the worker processes down.
+
+        Args:
+            wait (bool): Whether to wait for the workers to exit (off the event loop).
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=wait, cancel_futures=True)
+
+    def resize(self, workers: int):
+        """
+        Changes the number of worker processes.
+
+        Builds already submitted finish in the old pool; the next large order starts the new one.
+
+        Args:
+            workers (int): Processes in the pool; 0 builds every payload inline.
+        """
+        if workers == self.workers:
+            return
+        self.workers = workers
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def encode(self, order: dict, raw_body: bytes) -> tuple:
+        """
+        Builds and encodes the Kount payload for an order, in the pool when the order is large.
+
+        Args:
+            order (dict): The decoded merchant order, used to size it and to build it inline.
+            raw_body (bytes): The request body the order was decoded from, sent to the pool instead of the dict.
+
+        Returns:
+            tuple: (body bytes, whether the body is gzip-compressed).
+
+        Raises:
+            ValueError: If the order has no order_id.
+        """
+        started = time.perf_counter()
+        if self.enabled and order_size(order) >= self.threshold:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), encode_order, raw_body, self.compress_min_bytes)
+            except BrokenExecutor as e:
+                # A killed worker must not fail the request; build it here and start a new pool next time
+                logger.error("Payload pool broke, building inline: %s", e)
+                self.counters["offload_errors"] += 1
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+            else:
+                self.counters["offloaded"] += 1
+                self.offload_latency.record(time.perf_counter() - started)
+                return result
+        result = encode_payload(build_payload(order), self.compress_min_bytes)
+        self.counters["inline"] += 1
+        self.inline_latency.record(time.perf_counter() - started)
+        return result
+
+    def stats(self) -> dict:
+        """
+        Returns inline and offloaded counts and latencies.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the pool.
+        """
+        return {
+            "threshold": self.threshold,
+            "workers": self.workers if self.enabled else 0,
+            **self.counters,
+            "inline_latency": self.inline_latency.snapshot(),
+            "offload_latency": self.offload_latency.snapshot(),
+        }
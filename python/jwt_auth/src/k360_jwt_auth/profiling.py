@@ -0,0 +1,321 @@
+"""
+On-demand CPU and memory profiling for the Kount FastAPI apps.
+
+Three profilers, each idle until an operator arms it through `profiling_router`:
+
+- `cpu_profiler` samples the stacks of every thread for N seconds and writes
+  them in the folded format read by flamegraph.pl and speedscope.
+- `memory_profiler` starts tracemalloc on the first call and, on each later
+  call, returns the allocation growth since the previous snapshot.
+- `request_profiler` runs cProfile around every Nth call of a decorated
+  handler until M requests have been profiled, then writes the merged stats
+  as a .pstats file (open with `python -m pstats` or snakeviz).
+
+The router is only meant to be mounted when KOUNT_PROFILING_TOKEN is set, and
+every route requires that token in the X-Profiling-Token header. When nothing
+is armed the only cost is one attribute check per decorated request.
+
+Usage:
+    if PROFILING_TOKEN:
+        app.include_router(profiling_router)
+
+    @app.post("/process-transaction")
+    @request_profiler.profiled
+    async def process_transaction(request: Request): ...
+"""
+
+import asyncio
+import cProfile
+import functools
+import hmac
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+PROFILING_TOKEN = os.getenv("KOUNT_PROFILING_TOKEN")
+"""
+Shared secret required by the profiling endpoints; profiling is disabled when unset.
+"""
+
+PROFILE_DIR = os.getenv("KOUNT_PROFILE_DIR") or tempfile.gettempdir()
+"""
+Directory that CPU and request profiles are written to.
+"""
+
+
+def _profile_path(kind: str, extension: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{kind}-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.{extension}")
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler that samples every thread's stack from a background thread.
+
+    Sampling does not slow the profiled code down beyond holding the GIL briefly
+    once per interval, so it is safe to run against production traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether a profile is being taken."""
+        return self._lock.locked()
+
+    def sample(self, seconds: float, interval: float = 0.005) -> Counter:
+        """
+        Samples all threads other than the calling one for `seconds`.
+
+        Args:
+            seconds (float): How long to sample.
+            interval (float): Seconds between samples.
+
+        Returns:
+            Counter: Sample counts keyed by folded stack ("outer;...;inner").
+        """
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+        return stacks
+
+    def profile(self, seconds: float, interval: float = 0.005) -> dict:
+        """
+        Samples for `seconds` and writes the folded stacks to PROFILE_DIR.
+
+        Args:
+            seconds (float): How long to sample.
+            interval (float): Seconds between samples.
+
+        Returns:
+            dict: The written file and the number of samples.
+
+        Raises:
+            RuntimeError: If a profile is already being taken.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A CPU profile is already running.")
+        try:
+            stacks = self.sample(seconds, interval)
+        finally:
+            self._lock.release()
+        path = _profile_path("cpu", "folded")
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        return {"file": path, "samples": sum(stacks.values()), "stacks": len(stacks)}
+
+
+class MemoryProfiler:
+    """
+    Diffs tracemalloc snapshots taken on demand.
+
+    tracemalloc slows allocation-heavy code down noticeably, so it only runs between
+    the first `snapshot()` and `stop()`.
+    """
+
+    def __init__(self):
+        self._previous = None
+
+    def snapshot(self, top: int = 20, frames: int = 10) -> dict:
+        """
+        Starts tracing on the first call; later calls diff against the previous snapshot.
+
+        Args:
+            top (int): Number of allocation sites to return.
+            frames (int): Stack depth recorded per allocation when tracing starts.
+
+        Returns:
+            dict: Traced memory totals and the largest growth by allocation site.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._previous = tracemalloc.take_snapshot()
+            return {"tracing": True, "started": True}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        diff = snapshot.compare_to(self._previous, "lineno")
+        self._previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "started": False,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [str(stat) for stat in diff[:top]],
+        }
+
+    def stop(self) -> dict:
+        """Stops tracing and drops the stored snapshot."""
+        was_tracing = tracemalloc.is_tracing()
+        tracemalloc.stop()
+        self._previous = None
+        return {"tracing": False, "stopped": was_tracing}
+
+
+class RequestProfiler:
+    """
+    Runs cProfile around every Nth request of the handlers it decorates.
+
+    cProfile follows the thread, not the task, so time spent in other tasks while a
+    profiled request awaits is included. Only one request is profiled at a time.
+
+    Attributes:
+        every (int): Profile one request out of this many.
+        remaining (int): Requests left to profile; 0 means disarmed.
+        last_file (Optional[str]): The most recently written .pstats file.
+    """
+
+    def __init__(self):
+        self.every = 1
+        self.remaining = 0
+        self.last_file = None
+        self._seen = 0
+        self._active = False
+        self._stats = None
+
+    def arm(self, every: int, count: int):
+        """
+        Profiles one request out of `every` until `count` requests have been profiled.
+
+        Args:
+            every (int): Profile one request out of this many.
+            count (int): Number of requests to profile.
+        """
+        self.every = max(1, every)
+        self.remaining = max(0, count)
+        self._seen = 0
+        self._stats = None
+
+    def profiled(self, handler):
+        """Decorates an async request handler so it can be profiled while armed."""
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            if not self.remaining:
+                return await handler(*args, **kwargs)
+            return await self._maybe_profile(handler, args, kwargs)
+
+        return wrapper
+
+    async def _maybe_profile(self, handler, args, kwargs):
+        # Requests that overlap a profiled one are not counted, so under load the
+        # next request after it finishes gets profiled instead of being skipped
+        if self._active:
+            return await handler(*args, **kwargs)
+        self._seen += 1
+        if self._seen % self.every:
+            return await handler(*args, **kwargs)
+
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._active = False
+            self._record(profile)
+
+    def _record(self, profile: cProfile.Profile):
+        if not self.remaining:
+            return
+        if self._stats is None:
+            self._stats = pstats.Stats(profile)
+        else:
+            self._stats.add(profile)
+        self.remaining -= 1
+        if not self.remaining:
+            self.last_file = _profile_path("requests", "pstats")
+            self._stats.dump_stats(self.last_file)
+            self._stats = None
+
+    def stats(self) -> dict:
+        """
+        Returns whether the profiler is armed and where the last profile was written.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the profiler.
+        """
+        return {"every": self.every, "remaining": self.remaining, "last_file": self.last_file}
+
+
+cpu_profiler = SamplingProfiler()
+memory_profiler = MemoryProfiler()
+request_profiler = RequestProfiler()
+
+
+def require_profiling_token(x_profiling_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency that guards the profiling endpoints.
+
+    Raises:
+        HTTPException: 404 when profiling is disabled, 403 when the token does not match.
+    """
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404)
+    if not x_profiling_token or not hmac.compare_digest(x_profiling_token, PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+profiling_router = APIRouter(prefix="/internal/profile", dependencies=[Depends(require_profiling_token)])
+
+
+@profiling_router.post("/cpu")
+async def profile_cpu(seconds: float = 10.0, interval_ms: float = Query(5.0, ge=1)):
+    """Samples CPU stacks for `seconds` and writes a flamegraph-compatible folded file."""
+    if not 0 < seconds <= 300:
+        raise HTTPException(status_code=400, detail="seconds must be between 0 and 300")
+    try:
+        return await asyncio.to_thread(cpu_profiler.profile, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@profiling_router.get("/memory")
+async def profile_memory(top: int = 20):
+    """Starts tracemalloc, or returns the allocation growth since the previous call."""
+    return memory_profiler.snapshot(top)
+
+
+@profiling_router.delete("/memory")
+async def stop_memory_profile():
+    """Stops tracemalloc."""
+    return memory_profiler.stop()
+
+
+@profiling_router.post("/requests")
+async def profile_requests(every: int = 100, count: int = 10):
+    """Profiles one request out of `every` until `count` have been profiled."""
+    request_profiler.arm(every, count)
+    return request_profiler.stats()
+
+
+@profiling_router.get("/requests")
+async def request_profile_status():
+    """Returns the request profiler's progress and last written file."""
+    return request_profiler.stats()
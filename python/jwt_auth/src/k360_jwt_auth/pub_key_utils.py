@@ -25,6 +25,9 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.exceptions import InvalidSignature
 
 from .jwt_utils import token_manager, fetch_or_refresh_token
+from .retry_budget import retry_budget, stop_if_retry_budget_exhausted
+from .tracing import tracer
+from .warmup import dns_cache
 
 from .exceptions import (
     InvalidSignatureError,
@@ -37,10 +40,11 @@ from .exceptions import (
 
 logger = logging.getLogger(__name__)
 
-# Default to sandbox. Override with env var if needed.
+# Default to sandbox. Override with env var if needed; KOUNT_PUBLIC_KEY_URL_TEMPLATE
+# replaces the URL entirely (e.g. a local stand-in for load tests).
 KOUNT_USE_SANDBOX = os.getenv("KOUNT_USE_SANDBOX", "true").lower() == "true"
 
-PUBLIC_KEY_URL_TEMPLATE = (
+PUBLIC_KEY_URL_TEMPLATE = os.getenv("KOUNT_PUBLIC_KEY_URL_TEMPLATE") or (
     "https://app-sandbox.kount.com/api/developer/ens/client/{}/public-key"
     if KOUNT_USE_SANDBOX else
     "https://app.kount.com/api/developer/ens/client/{}/public-key"
@@ -100,15 +104,23 @@ public_key_manager = PublicKeyManager()
 # Fetch Public Key
 # ---------------------------
 
-@retry(wait=wait_fixed(10))
+@tracer.traced("kount.public_key.fetch")
+@retry(
+    wait=wait_fixed(10),
+    stop=stop_if_retry_budget_exhausted(retry_budget),
+    before=retry_budget.record_attempt,
+    before_sleep=tracer.record_retry,
+)
 async def fetch_public_key():
     """
     Fetches the current webhook public key from the Kount ENS API and stores it in the PublicKeyManager.
 
     If a 403 or 418 is returned, falls back to using the KOUNT_PUBLIC_KEY environment variable.
+    Retries every 10 seconds on failure while the shared retry budget allows it.
 
     Raises:
-        HTTPException: If public key cannot be fetched or fallback is missing.
+        tenacity.RetryError: If the public key cannot be fetched, the fallback is missing
+            and the retry budget is exhausted.
     """
     kount_client_id = os.getenv("KOUNT_CLIENT_ID")
     if not kount_client_id:
@@ -122,7 +134,7 @@ async def fetch_public_key():
         "Content-Type": "application/json"
     }
 
-    async with aiohttp.ClientSession() as session:
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=dns_cache)) as session:
         try:
             async with session.get(url, headers=headers, timeout=10) as response:
                 if response.status in (403, 418):
@@ -256,11 +268,16 @@ async def start_public_key_refresh_timer():
     """
     Starts an asynchronous background task to refresh the public key when near expiry.
 
-    Waits until 2 minutes before expiration, then refreshes the key.
+    Waits until 2 minutes before expiration, then refreshes the key. If a refresh
+    gives up, the current key stays in use and the refresh is attempted again later.
     """
     while True:
         current_time = int(time.time())
         time_until_refresh = public_key_manager.valid_until - current_time - 120  # 2 minutes buffer
         if time_until_refresh > 0:
             await asyncio.sleep(time_until_refresh)
-        await fetch_public_key()
+        try:
+            await fetch_public_key()
+        except Exception as e:
+            logger.error("Public key refresh gave up, keeping current key: %s", e)
+            await asyncio.sleep(10)
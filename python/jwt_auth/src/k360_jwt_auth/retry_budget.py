@@ -0,0 +1,123 @@
+"""
+Process-wide retry budget shared by every outbound call that retries.
+
+Each call site retries on its own (`stop_after_attempt(3)` and friends), so a
+degraded provider would otherwise see traffic multiply exactly when it can
+least absorb it. The budget is a token bucket: every first attempt deposits
+a fraction of a token, a small time-based refill keeps retries possible at
+low traffic, and every retry must withdraw a whole token. When the bucket is
+empty the retry is skipped and the caller's fail-open path runs instead.
+
+Usage:
+    @retry(
+        retry=retry_if_exception(is_retryable_error),
+        stop=stop_after_attempt(3) | stop_if_retry_budget_exhausted(retry_budget),
+        before=retry_budget.record_attempt,
+    )
+"""
+
+import os
+import time
+
+from tenacity.stop import stop_base
+
+RETRY_BUDGET_RATIO = float(os.getenv("KOUNT_RETRY_BUDGET_RATIO", "0.1"))
+"""
+Retries allowed per first attempt (0.1 = retries capped at 10% of recent requests).
+"""
+
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("KOUNT_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+"""
+Retries per second that are always allowed, so low-traffic callers can still retry.
+"""
+
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("KOUNT_RETRY_BUDGET_MAX_TOKENS", "10"))
+"""
+Maximum number of retries that can be saved up for a burst.
+"""
+
+
+class RetryBudget:
+    """
+    Token bucket that caps retries at a fraction of recent requests.
+
+    Attributes:
+        tokens (float): Retries currently available.
+        counters (dict): First attempts, retries allowed and retries denied (exhausted).
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+                 max_tokens: float = RETRY_BUDGET_MAX_TOKENS):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.counters = {"requests": 0, "retries": 0, "exhausted": 0}
+        self._last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self):
+        """Deposits the retry allowance earned by one first attempt."""
+        self.counters["requests"] += 1
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """
+        Withdraws one retry from the budget.
+
+        Returns:
+            bool: True if the retry may proceed, False if the budget is exhausted.
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.counters["retries"] += 1
+            return True
+        self.counters["exhausted"] += 1
+        return False
+
+    def record_attempt(self, retry_state):
+        """
+        Tenacity `before` hook that counts first attempts as requests.
+
+        Args:
+            retry_state (tenacity.RetryCallState): The current retry state.
+        """
+        if retry_state.attempt_number == 1:
+            self.record_request()
+
+    def stats(self) -> dict:
+        """
+        Returns the available tokens and counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the budget.
+        """
+        self._refill()
+        return {"tokens": round(self.tokens, 2), **self.counters}
+
+
+class stop_if_retry_budget_exhausted(stop_base):
+    """
+    Tenacity stop condition that ends retrying when the shared budget is empty.
+
+    Combine it after the call site's own stop condition so a token is only
+    withdrawn for a retry that would otherwise happen.
+    """
+
+    def __init__(self, budget: RetryBudget):
+        self.budget = budget
+
+    def __call__(self, retry_state) -> bool:
+        return not self.budget.try_spend()
+
+
+retry_budget = RetryBudget()
+"""
+The process-wide retry budget shared by all outbound Kount and auth calls.
+"""
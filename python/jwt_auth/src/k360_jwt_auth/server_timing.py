@@ -0,0 +1,169 @@
+"""
+Per-stage request timing for the `Server-Timing` response header and a sampled access log.
+
+Checkout frontends and the API gateway can read the header to attribute latency
+without access to our tracing backend. Stages are the spans the handlers already
+open with `tracer.span(...)`; while a request is being timed each span's duration
+is also added to the request's StageTimings, whether or not the trace is sampled.
+Timing uses `time.perf_counter()` only.
+
+- KOUNT_SERVER_TIMING=true adds the header to every decorated handler's response.
+- KOUNT_ACCESS_LOG_SAMPLE_RATE logs the same breakdown for a fraction of requests
+  as one JSON line on the `k360_jwt_auth.access` logger (INFO, so it is emitted
+  even when the app's root logger is at ERROR).
+
+Usage:
+    @app.post("/process-transaction")
+    @server_timing.timed
+    async def process_transaction(request: Request): ...
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.responses import Response
+
+SERVER_TIMING_ENABLED = os.getenv("KOUNT_SERVER_TIMING", "false").lower() == "true"
+"""
+Whether decorated handlers add a Server-Timing header.
+"""
+
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("KOUNT_ACCESS_LOG_SAMPLE_RATE", "0"))
+"""
+Fraction of requests written to the structured access log (0 disables it).
+"""
+
+STAGE_METRICS = {
+    "parse": "parse",
+    "build_payload": "build_payload",
+    "kount.attempt": "upstream",
+    "fallback": "fallback",
+    "render": "serialize",
+    "verify_signature": "verify",
+    "decode": "decode",
+}
+"""
+Span names reported as stages, mapped to their Server-Timing metric names.
+"""
+
+access_logger = logging.getLogger("k360_jwt_auth.access")
+access_logger.setLevel(logging.INFO)
+
+_current_timings = contextvars.ContextVar("k360_stage_timings", default=None)
+
+
+class StageTimings:
+    """
+    Stage durations collected for one request.
+
+    Attributes:
+        stages (list): (metric name, seconds) in completion order; retried stages repeat.
+    """
+
+    __slots__ = ("stages", "started", "closed")
+
+    def __init__(self):
+        self.stages = []
+        self.started = time.perf_counter()
+        self.closed = False
+
+    def add(self, span_name: str, seconds: float):
+        """Records a finished span if it is a reported stage and the response is not yet sent."""
+        metric = STAGE_METRICS.get(span_name)
+        if metric is not None and not self.closed:
+            self.stages.append((metric, seconds))
+
+    def breakdown(self) -> list:
+        """
+        Returns the stages in milliseconds, numbering repeated ones.
+
+        Returns:
+            list: (metric name, description or None, milliseconds) tuples.
+        """
+        totals = {}
+        for metric, _ in self.stages:
+            totals[metric] = totals.get(metric, 0) + 1
+        seen = {}
+        entries = []
+        for metric, seconds in self.stages:
+            seen[metric] = seen.get(metric, 0) + 1
+            description = f"attempt {seen[metric]}" if totals[metric] > 1 or metric == "upstream" else None
+            entries.append((metric, description, round(seconds * 1000, 3)))
+        return entries
+
+    def header(self, total_seconds: float) -> str:
+        """
+        Formats the stages and the total as a Server-Timing header value.
+
+        Args:
+            total_seconds (float): Time spent in the handler.
+
+        Returns:
+            str: e.g. 'parse;dur=0.1, upstream;desc="attempt 1";dur=42.0, total;dur=43.2'.
+        """
+        parts = [f'{metric};desc="{description}";dur={ms}' if description else f"{metric};dur={ms}"
+                 for metric, description, ms in self.breakdown()]
+        parts.append(f"total;dur={round(total_seconds * 1000, 3)}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[StageTimings]:
+    """Returns the timings of the request being handled, or None when it is not being timed."""
+    return _current_timings.get()
+
+
+def _finish(handler_name: str, timings: StageTimings, token, status: int, log_this: bool) -> str:
+    _current_timings.reset(token)
+    timings.closed = True
+    total = time.perf_counter() - timings.started
+    if log_this:
+        access_logger.info(json.dumps({
+            "handler": handler_name,
+            "status": status,
+            "total_ms": round(total * 1000, 3),
+            "stages": [{"name": metric, "desc": description, "ms": ms}
+                       for metric, description, ms in timings.breakdown()],
+        }, separators=(",", ":")))
+    return timings.header(total)
+
+
+def timed(handler):
+    """
+    Decorates a request handler so its stages are timed while either output is enabled.
+
+    Adds the Server-Timing header to returned Response objects and to raised
+    HTTPExceptions, and writes the sampled access-log line.
+    """
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        log_this = ACCESS_LOG_SAMPLE_RATE > 0 and random.random() < ACCESS_LOG_SAMPLE_RATE
+        if not (SERVER_TIMING_ENABLED or log_this):
+            return await handler(*args, **kwargs)
+
+        timings = StageTimings()
+        token = _current_timings.set(timings)
+        try:
+            result = await handler(*args, **kwargs)
+        except HTTPException as e:
+            header = _finish(name, timings, token, e.status_code, log_this)
+            if SERVER_TIMING_ENABLED:
+                e.headers = {**(e.headers or {}), "Server-Timing": header}
+            raise
+        except BaseException:
+            _finish(name, timings, token, 500, log_this)
+            raise
+        header = _finish(name, timings, token, result.status_code if isinstance(result, Response) else 200, log_this)
+        if SERVER_TIMING_ENABLED and isinstance(result, Response):
+            result.headers["Server-Timing"] = header
+        return result
+
+    return wrapper
@@ -0,0 +1,143 @@
+"""
+Blocking Kount client for code that cannot await (WSGI, Django, Celery, scripts).
+
+Running the async helpers with `asyncio.run` per call builds a new event loop,
+HTTP session and token on every call. SyncKountClient instead starts one
+background thread running a long-lived event loop that owns the token refresh
+timer and pooled transport of a K360Client; blocking calls hand a coroutine to
+that loop and wait for its result. The payload is built and encoded in the
+calling thread, so the loop only does I/O and many threads can share one client.
+
+Usage:
+    client = SyncKountClient()          # once per process, after any fork
+    result = client.risk_inquiry(order) # order shaped like a /process-transaction body
+    client.patch_order(result["order"]["orderId"], {"transactions": [...]})
+    client.close()
+"""
+
+import asyncio
+import threading
+from typing import Optional
+
+from .client import KOUNT_API_ENDPOINT, K360Client
+from .payload import build_payload
+
+
+class SyncKountClient:
+    """
+    Thread-safe blocking client backed by a persistent background event loop.
+
+    Attributes:
+        endpoint (Endpoint): The risk inquiry endpoint.
+        timeout (float): Default seconds a call may block, including retries.
+    """
+
+    def __init__(self, endpoint: str = KOUNT_API_ENDPOINT, transport: str = "aiohttp", max_connections: int = 100,
+                 timeout: float = 60.0, max_attempts: int = 3, max_backoff: float = 10.0):
+        self.timeout = timeout
+        self._client = K360Client(endpoint, transport, max_connections, timeout, max_attempts, max_backoff)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="kount-client-loop", daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._client.start(), timeout)
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    @property
+    def endpoint(self):
+        """The risk inquiry endpoint."""
+        return self._client.endpoint
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coroutine, timeout: Optional[float]):
+        if self._loop.is_closed():
+            coroutine.close()
+            raise RuntimeError("SyncKountClient is closed.")
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("SyncKountClient cannot be called from its own event loop; await the coroutine instead.")
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def risk_inquiry(self, order: dict, timeout: Optional[float] = None) -> dict:
+        """
+        Creates an order with a risk inquiry and returns Kount's response.
+
+        Args:
+            order (dict): The order, shaped like a /process-transaction request body.
+            timeout (Optional[float]): Seconds to block, including retries; defaults to `self.timeout`.
+
+        Returns:
+            dict: The parsed Kount response.
+
+        Raises:
+            ValueError: If the order cannot be mapped to a Kount payload.
+            TransportStatusError: On an error response that was not retried or kept failing.
+            TransportError: On timeouts and connection failures.
+            TimeoutError: If the call did not finish within `timeout`.
+        """
+        body = self._client.encode_payload(build_payload(order))
+        return self._call(self._client.request("POST", self.endpoint.url, body), timeout)
+
+    def patch_order(self, kount_order_id: str, patch: dict, timeout: Optional[float] = None) -> dict:
+        """
+        Updates an existing Kount order, e.g. with the authorization result.
+
+        Args:
+            kount_order_id (str): The Kount order ID returned by `risk_inquiry`.
+            patch (dict): The Kount PATCH payload.
+            timeout (Optional[float]): Seconds to block, including retries; defaults to `self.timeout`.
+
+        Returns:
+            dict: The parsed Kount response.
+
+        Raises:
+            TransportStatusError: On an error response that was not retried or kept failing.
+            TransportError: On timeouts and connection failures.
+            TimeoutError: If the call did not finish within `timeout`.
+        """
+        body = self._client.encode_payload(patch)
+        return self._call(self._client.request("PATCH", self.endpoint.url_for(kount_order_id), body), timeout)
+
+    def get_order(self, kount_order_id: str, timeout: Optional[float] = None) -> dict:
+        """
+        Fetches an existing Kount order.
+
+        Args:
+            kount_order_id (str): The Kount order ID returned by `risk_inquiry`.
+            timeout (Optional[float]): Seconds to block, including retries; defaults to `self.timeout`.
+
+        Returns:
+            dict: The parsed Kount response.
+
+        Raises:
+            TransportStatusError: On an error response that was not retried or kept failing.
+            TransportError: On timeouts and connection failures.
+            TimeoutError: If the call did not finish within `timeout`.
+        """
+        return self._call(self._client.get_order(kount_order_id), timeout)
+
+    def close(self):
+        """Stops the token refresh, closes the pooled connections and stops the loop thread."""
+        if self._loop.is_closed():
+            return
+        try:
+            self._call(self._client.close(), self.timeout)
+        finally:
+            self._stop_loop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
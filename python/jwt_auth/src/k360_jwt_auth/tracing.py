@@ -0,0 +1,424 @@
+"""
+Lightweight request tracing with a batched NDJSON file exporter.
+
+Spans carry OpenTelemetry identifiers and field names (traceId, spanId,
+parentSpanId, startTimeUnixNano, ...) so the file can be converted to OTLP or
+loaded next to real OpenTelemetry data; attributes are a flat JSON object.
+
+- The current span lives in a context variable, so tasks created while a span
+  is open (the fire-and-forget PATCH, an on-demand token fetch) become its
+  children without any plumbing.
+- Sampling is decided once per trace, at the root span, from
+  KOUNT_TRACE_SAMPLE_RATE. An incoming W3C `traceparent` header continues the
+  caller's trace and its unsampled flag is always honoured, but its sampled
+  flag is subject to the local rate unless KOUNT_TRACE_TRUST_PARENT is set
+  (only for callers behind a trusted proxy). Spans of unsampled traces are
+  never created, so the cost under full load is bounded by the sample rate;
+  with the default rate of 0 tracing is off.
+- Finished spans are buffered in memory and appended to KOUNT_TRACE_FILE in
+  batches by a background task, off the event loop. When the buffer is full new
+  spans are dropped and counted rather than slowing requests down.
+
+Usage:
+    @tracer.traced("POST /process-transaction")
+    async def process_transaction(request: Request):
+        with tracer.span("build_payload"):
+            ...
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import aiohttp
+
+from . import server_timing
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("KOUNT_TRACE_SAMPLE_RATE", "0"))
+"""
+Fraction of new traces that are recorded (0 disables tracing, 1 records every request).
+"""
+
+TRACE_TRUST_PARENT = os.getenv("KOUNT_TRACE_TRUST_PARENT", "false").lower() == "true"
+"""
+Whether an incoming traceparent's sampled flag bypasses the sample rate; leave off unless every caller is trusted.
+"""
+
+TRACE_FILE = os.getenv("KOUNT_TRACE_FILE", "kount_traces.ndjson")
+"""
+File finished spans are appended to, one JSON object per line.
+"""
+
+TRACE_FLUSH_INTERVAL = float(os.getenv("KOUNT_TRACE_FLUSH_INTERVAL", "1"))
+"""
+Seconds between batched writes.
+"""
+
+TRACE_BUFFER_SIZE = int(os.getenv("KOUNT_TRACE_BUFFER_SIZE", "10000"))
+"""
+Finished spans held in memory between writes before new ones are dropped.
+"""
+
+_current_span = contextvars.ContextVar("k360_current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation within a trace.
+
+    Attributes:
+        trace_id (str): 32 hex characters shared by every span of the trace.
+        span_id (str): 16 hex characters identifying this span.
+        parent_span_id (Optional[str]): The enclosing span, if any.
+        name (str): The operation name.
+        attributes (dict): Flat key/value attributes.
+        events (list): Timestamped events such as retries and connection waits.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "attributes", "events",
+                 "start_ns", "_started", "error")
+
+    sampled = True
+
+    def __init__(self, trace_id: str, parent_span_id: Optional[str], name: str, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.attributes = attributes
+        self.events = []
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        """Sets an attribute on the span."""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        """Records a timestamped event on the span."""
+        self.events.append({"timeUnixNano": time.time_ns(), "name": name, "attributes": attributes})
+
+    def traceparent(self) -> str:
+        """Returns the W3C traceparent header value that continues this trace."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def _finish(self, service_name: str) -> dict:
+        record = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "service": service_name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.start_ns + time.perf_counter_ns() - self._started,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+        if self.events:
+            record["events"] = self.events
+        return record
+
+
+class _UnsampledSpan:
+    """Stands in for a span of an unsampled trace; every method is a no-op."""
+
+    __slots__ = ()
+
+    sampled = False
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def add_event(self, name: str, **attributes):
+        pass
+
+
+UNSAMPLED = _UnsampledSpan()
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Parses a W3C traceparent header.
+
+    Args:
+        header (Optional[str]): The header value, e.g. "00-<trace id>-<span id>-01".
+
+    Returns:
+        Optional[tuple]: (trace id, parent span id, sampled), or None if absent or malformed.
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class NdjsonSpanExporter:
+    """
+    Buffers finished spans and appends them to a file in batches.
+
+    Attributes:
+        path (str): The NDJSON file spans are appended to.
+        counters (dict): Spans exported, dropped (buffer full) and failed writes.
+    """
+
+    def __init__(self, path: str = TRACE_FILE, flush_interval: float = TRACE_FLUSH_INTERVAL,
+                 buffer_size: int = TRACE_BUFFER_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.counters = {"exported": 0, "dropped": 0, "write_failures": 0}
+        self._buffer = []
+        self._task = None
+
+    def export(self, record: dict):
+        """Queues a finished span for the next write."""
+        if len(self._buffer) >= self.buffer_size:
+            self.counters["dropped"] += 1
+            return
+        self._buffer.append(record)
+
+    def _write(self, batch: list):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(record, separators=(",", ":"), default=str) + "\n" for record in batch))
+
+    async def flush(self):
+        """Writes the buffered spans in a worker thread."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.counters["exported"] += len(batch)
+        except OSError as e:
+            self.counters["write_failures"] += 1
+            logger.error("Writing %s spans to %s failed: %s", len(batch), self.path, e)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Starts the periodic writer."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_forever())
+
+    async def stop(self):
+        """Stops the periodic writer and writes what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """
+        Returns the exporter counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the exporter.
+        """
+        return {"path": self.path, "buffered": len(self._buffer), **self.counters}
+
+
+class Tracer:
+    """
+    Creates spans, makes the head-based sampling decision and hands finished spans to the exporter.
+
+    Attributes:
+        sample_rate (float): Fraction of new traces that are recorded.
+        trust_parent (bool): Whether an incoming traceparent's sampled flag bypasses `sample_rate`.
+        exporter (NdjsonSpanExporter): Where finished spans go.
+        service_name (str): Recorded on every span; set by `start()`.
+    """
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, exporter: Optional[NdjsonSpanExporter] = None,
+                 trust_parent: bool = TRACE_TRUST_PARENT):
+        self.sample_rate = sample_rate
+        self.trust_parent = trust_parent
+        self.exporter = exporter or NdjsonSpanExporter()
+        self.service_name = "k360"
+        self.counters = {"traces_sampled": 0, "traces_unsampled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any trace can be sampled."""
+        return self.sample_rate > 0
+
+    def current(self):
+        """Returns the current span, UNSAMPLED inside an unsampled trace, or None outside any trace."""
+        return _current_span.get()
+
+    def _start_span(self, name: str, traceparent: Optional[str], attributes: dict):
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(parent.trace_id, parent.span_id, name, attributes) if parent.sampled else UNSAMPLED
+        if not self.enabled:
+            return UNSAMPLED
+
+        remote = parse_traceparent(traceparent)
+        if remote is not None:
+            trace_id, parent_span_id, sampled = remote
+            # Any client can send the sampled flag, so it only bypasses the rate from trusted callers
+            sampled = sampled and (self.trust_parent or random.random() < self.sample_rate)
+        else:
+            trace_id, parent_span_id = None, None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            self.counters["traces_unsampled"] += 1
+            return UNSAMPLED
+        self.counters["traces_sampled"] += 1
+        return Span(trace_id or f"{random.getrandbits(128):032x}", parent_span_id, name, attributes)
+
+    @contextmanager
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes):
+        """
+        Opens a span for the duration of the `with` block.
+
+        While the request is being timed for Server-Timing (see server_timing), the
+        block's duration is also recorded there, even if the trace is not sampled.
+
+        A span opened outside any trace starts a new one, continuing the caller's trace
+        when a valid `traceparent` is given. A traceparent marked unsampled is not
+        recorded; one marked sampled is recorded at `sample_rate` unless `trust_parent`
+        is set. While tracing is disabled no trace is started, whatever the traceparent says.
+
+        Args:
+            name (str): The operation name.
+            traceparent (Optional[str]): Incoming W3C traceparent header, used by root spans only.
+            **attributes: Initial span attributes.
+
+        Yields:
+            Span: The span, or UNSAMPLED when the trace is not recorded.
+        """
+        span = self._start_span(name, traceparent, attributes)
+        timings = server_timing.current()
+        started = time.perf_counter() if timings is not None else 0.0
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if span.sampled:
+                span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            if timings is not None:
+                timings.add(name, time.perf_counter() - started)
+            if span.sampled:
+                self.exporter.export(span._finish(self.service_name))
+
+    def traced(self, name: str):
+        """
+        Decorates a coroutine function so each call runs in its own span.
+
+        A `request` keyword argument with headers (as FastAPI passes it) supplies the
+        incoming traceparent. Under a tenacity `@retry`, each attempt gets its own span.
+
+        Args:
+            name (str): The span name.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                traceparent = request.headers.get("traceparent") if request is not None else None
+                with self.span(name, traceparent):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record_retry(self, retry_state):
+        """tenacity `before_sleep` hook that records each retry and its backoff on the current span."""
+        span = _current_span.get()
+        if span is not None and span.sampled:
+            outcome = retry_state.outcome
+            span.add_event(
+                "retry",
+                attempt=retry_state.attempt_number,
+                backoff_ms=round(retry_state.next_action.sleep * 1000, 3) if retry_state.next_action else None,
+                error=str(outcome.exception()) if outcome is not None and outcome.failed else None,
+            )
+
+    def aiohttp_trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Returns an aiohttp TraceConfig that records connection-pool waits and new
+        connections as events on the current span.
+        """
+        async def on_queued_start(session, ctx, params):
+            ctx.queued = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            span = _current_span.get()
+            if span is not None:
+                span.add_event("connection.pool_wait", wait_ms=round((time.perf_counter() - ctx.queued) * 1000, 3))
+
+        async def on_create_start(session, ctx, params):
+            ctx.connecting = time.perf_counter()
+
+        async def on_create_end(session, ctx, params):
+            span = _current_span.get()
+            if span is not None:
+                span.add_event("connection.created", connect_ms=round((time.perf_counter() - ctx.connecting) * 1000, 3))
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_start.append(on_create_start)
+        trace_config.on_connection_create_end.append(on_create_end)
+        return trace_config
+
+    def start(self, service_name: str):
+        """
+        Starts the exporter, if tracing is enabled.
+
+        Args:
+            service_name (str): Recorded on every span, e.g. "api_processor".
+        """
+        self.service_name = service_name
+        if self.enabled:
+            self.exporter.start()
+
+    async def stop(self):
+        """Stops the exporter and writes the remaining spans."""
+        await self.exporter.stop()
+
+    def stats(self) -> Optional[dict]:
+        """
+        Returns sampling and exporter counters.
+
+        Returns:
+            Optional[dict]: A JSON-serialisable snapshot, or None when tracing is disabled.
+        """
+        if not self.enabled:
+            return None
+        return {"sample_rate": self.sample_rate, **self.counters, "exporter": self.exporter.stats()}
+
+
+tracer = Tracer()
+"""
+The process-wide tracer shared by both apps and the token and public key helpers.
+"""
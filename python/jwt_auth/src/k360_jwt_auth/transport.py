@@ -0,0 +1,338 @@
+"""
+Pluggable HTTP transports for outbound Kount API calls.
+
+Both transports keep one pooled client for the life of the process and return
+a fully read TransportResponse, so callers do not depend on the client library:
+
+- AiohttpTransport: HTTP/1.1 over a shared aiohttp connection pool. One
+  connection per request in flight.
+- HttpxH2Transport: HTTP/2 via httpx, multiplexing many requests over a few
+  connections. Requires the optional `httpx[http2]` dependency.
+
+Failures are reported as TransportConnectError when no connection could be
+made (the request was never sent, so another endpoint may be tried) and as
+TransportError for timeouts and dropped connections.
+"""
+
+import asyncio
+import json
+import ssl
+from typing import Optional
+
+import aiohttp
+
+from .exceptions import TransportConnectError, TransportError, TransportStatusError
+from .tracing import tracer
+from .warmup import dns_cache
+
+TRANSPORTS = ("aiohttp", "httpx-h2")
+"""
+Names accepted by `create_transport`.
+"""
+
+
+class TransportResponse:
+    """
+    A fully read HTTP response.
+
+    Attributes:
+        status (int): The HTTP status code.
+        reason (str): The reason phrase, if any.
+        headers (Mapping): Case-insensitive response headers.
+        body (bytes): The response body.
+        url (str): The requested URL.
+    """
+
+    __slots__ = ("status", "reason", "headers", "body", "url")
+
+    def __init__(self, status: int, reason: str, headers, body: bytes, url: str):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def text(self) -> str:
+        """Returns the body decoded as UTF-8."""
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        """Returns the body parsed as JSON."""
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        """
+        Raises:
+            TransportStatusError: If the status is 400 or above.
+        """
+        if self.status >= 400:
+            raise TransportStatusError(self.status, self.url, self.reason)
+
+
+def _retire(retired: dict, close, grace: float):
+    # Closed after `grace` seconds, when no request started on it can still be running
+    async def close_later():
+        await asyncio.sleep(grace)
+        del retired[task]
+        await close()
+
+    task = asyncio.get_running_loop().create_task(close_later())
+    retired[task] = close
+
+
+def _read_pool(read):
+    # Pool sizes come from client internals that can change between releases;
+    # report them as unknown instead of failing the stats endpoint
+    try:
+        return read()
+    except (AttributeError, TypeError):
+        return None
+
+
+async def _close_retired(retired: dict):
+    for task, close in list(retired.items()):
+        task.cancel()
+        await close()
+    retired.clear()
+
+
+class AiohttpTransport:
+    """
+    HTTP/1.1 transport over one shared aiohttp session.
+
+    The session is created on first use, inside the running event loop, and resolves
+    hosts through the shared `dns_cache`. With tracing enabled, connection-pool waits
+    and new connections are recorded on the current span.
+    """
+
+    name = "aiohttp"
+
+    def __init__(self, max_connections: int = 100, timeout: float = 300.0, ca_file: Optional[str] = None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.ca_file = ca_file
+        self.in_flight = 0
+        self._session = None
+        self._retired = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            ssl_context = ssl.create_default_context(cafile=self.ca_file) if self.ca_file else None
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ssl=ssl_context if ssl_context else True,
+                                             resolver=dns_cache)
+            trace_configs = [tracer.aiohttp_trace_config()] if tracer.enabled else None
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                  trace_configs=trace_configs)
+        return self._session
+
+    async def request(self, method: str, url: str, body: Optional[bytes] = None,
+                      headers: Optional[dict] = None) -> TransportResponse:
+        """
+        Sends a request and reads the whole response.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            body (Optional[bytes]): The encoded request body.
+            headers (Optional[dict]): The request headers.
+
+        Returns:
+            TransportResponse: The response.
+
+        Raises:
+            TransportConnectError: If no connection could be made.
+            TransportError: On timeouts and dropped connections.
+        """
+        self.in_flight += 1
+        try:
+            async with self._get_session().request(method, url, data=body, headers=headers) as response:
+                return TransportResponse(response.status, response.reason or "", response.headers,
+                                         await response.read(), url)
+        except aiohttp.ClientConnectorError as e:
+            raise TransportConnectError(str(e)) from e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransportError(str(e) or type(e).__name__) from e
+        finally:
+            self.in_flight -= 1
+
+    def reconfigure(self, max_connections: int, timeout: float):
+        """
+        Applies a new pool size and timeout to requests started from now on.
+
+        The next request opens a new session; requests already running finish on the
+        old one, which is closed once its timeout has passed.
+
+        Args:
+            max_connections (int): Maximum open connections.
+            timeout (float): Total seconds allowed per request.
+        """
+        if (max_connections, timeout) == (self.max_connections, self.timeout):
+            return
+        if self._session is not None:
+            _retire(self._retired, self._session.close, self.timeout)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+    async def close(self):
+        """Closes the pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        await _close_retired(self._retired)
+
+    def stats(self) -> dict:
+        """
+        Returns the pool size and open connections.
+
+        Each request in flight holds one connection, so active connections are counted
+        here; idle connections are read from the aiohttp pool and are None if it cannot be read.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the transport.
+        """
+        connector = self._session.connector if self._session is not None and not self._session.closed else None
+        idle = _read_pool(lambda: sum(len(conns) for conns in connector._conns.values())) if connector else 0
+        return {
+            "transport": self.name,
+            "max_connections": self.max_connections,
+            "idle_connections": idle,
+            "active_connections": self.in_flight,
+        }
+
+
+class HttpxH2Transport:
+    """
+    HTTP/2 transport over one shared httpx client.
+
+    Many concurrent requests share each connection as separate streams, so a few
+    connections carry the load that needs one connection per request over HTTP/1.1.
+    HTTP/2 is negotiated via ALPN on https:// URLs, falling back to HTTP/1.1 when
+    the server does not offer it.
+    Requests in flight when the server sends GOAWAY are not retried by httpx and
+    surface as TransportError.
+    """
+
+    name = "httpx-h2"
+
+    def __init__(self, max_connections: int = 10, timeout: float = 300.0, ca_file: Optional[str] = None):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("The httpx-h2 transport requires httpx[http2]: pip install 'httpx[http2]'") from e
+        self._httpx = httpx
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.ca_file = ca_file
+        self.in_flight = 0
+        self._client = None
+        self._retired = {}
+
+    def _get_client(self):
+        if self._client is None:
+            httpx = self._httpx
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout),
+                verify=ssl.create_default_context(cafile=self.ca_file) if self.ca_file else True,
+            )
+        return self._client
+
+    async def request(self, method: str, url: str, body: Optional[bytes] = None,
+                      headers: Optional[dict] = None) -> TransportResponse:
+        """
+        Sends a request and reads the whole response.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            body (Optional[bytes]): The encoded request body.
+            headers (Optional[dict]): The request headers.
+
+        Returns:
+            TransportResponse: The response.
+
+        Raises:
+            TransportConnectError: If no connection could be made.
+            TransportError: On timeouts and dropped connections.
+        """
+        httpx = self._httpx
+        self.in_flight += 1
+        try:
+            response = await self._get_client().request(method, url, content=body, headers=headers)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            raise TransportConnectError(str(e)) from e
+        except httpx.TransportError as e:
+            raise TransportError(str(e) or type(e).__name__) from e
+        finally:
+            self.in_flight -= 1
+        return TransportResponse(response.status_code, response.reason_phrase, response.headers,
+                                 response.content, url)
+
+    def reconfigure(self, max_connections: int, timeout: float):
+        """
+        Applies a new connection limit and timeout to requests started from now on.
+
+        The next request opens a new client; requests already running finish on the
+        old one, which is closed once its timeout has passed.
+
+        Args:
+            max_connections (int): Maximum open connections.
+            timeout (float): Total seconds allowed per request.
+        """
+        if (max_connections, timeout) == (self.max_connections, self.timeout):
+            return
+        if self._client is not None:
+            _retire(self._retired, self._client.aclose, self.timeout)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+
+    async def close(self):
+        """Closes the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await _close_retired(self._retired)
+
+    def stats(self) -> dict:
+        """
+        Returns the connection limit, requests in flight and open connections.
+
+        Open connections are read from the httpx pool and are None if it cannot be read.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the transport.
+        """
+        client = self._client
+        return {
+            "transport": self.name,
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "open_connections": _read_pool(lambda: len(client._transport._pool.connections)) if client is not None else 0,
+        }
+
+
+def create_transport(name: str, max_connections: int, timeout: float = 300.0, ca_file: Optional[str] = None):
+    """
+    Creates a transport by name.
+
+    Args:
+        name (str): One of TRANSPORTS.
+        max_connections (int): Maximum open connections.
+        timeout (float): Total seconds allowed per request.
+        ca_file (Optional[str]): CA bundle to trust instead of the system store (e.g. for a local stand-in).
+
+    Returns:
+        AiohttpTransport or HttpxH2Transport: The transport.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name == "aiohttp":
+        return AiohttpTransport(max_connections, timeout, ca_file)
+    if name == "httpx-h2":
+        return HttpxH2Transport(max_connections, timeout, ca_file)
+    raise ValueError(f"Unknown transport {name!r}; expected one of {TRANSPORTS}")
@@ -0,0 +1,450 @@
+"""
+Runtime-tunable performance parameters for the Kount FastAPI apps.
+
+Timeouts, the retry policy, pool sizes, concurrency limits, the DNS cache TTL
+and log sampling rates live in one immutable PerformanceSettings snapshot
+instead of module constants and decorator arguments. Each value starts from
+its KOUNT_<NAME> environment variable (the names the apps already use, e.g.
+KOUNT_REQUEST_TIMEOUT or KOUNT_LIMIT_MAX), then from the optional JSON file
+KOUNT_TUNING_FILE, and can be changed while the app runs. Importing the package
+never reads the file: the app calls `performance_config.load()` in its lifespan,
+so a bad file fails startup with its error instead of every import.
+
+Changes are picked up two ways:
+
+- the file is re-read when its modification time changes (`watch`), and
+- `tuning_router` accepts changes over HTTP; it is only meant to be mounted
+  when KOUNT_ADMIN_TOKEN is set, and every route requires that token in the
+  X-Admin-Token header.
+
+A change builds and validates a whole new snapshot, then replaces
+`performance_config.current` with a single assignment, so the request path
+reads settings without locks and never sees half an update. Listeners
+registered with `subscribe` push the new values into long-lived objects such
+as the concurrency limiter or the transport; if one fails, the previous
+settings are restored and pushed again, so a change applies everywhere or
+nowhere. A changed file replaces earlier changes made over HTTP.
+
+Config format (any subset of the fields):
+    {
+        "request_timeout": 20,
+        "max_attempts": 2,
+        "retryable_statuses": [408, 429, 503],
+        "limit_max": 100,
+        "trace_sample_rate": 0.01
+    }
+
+Usage:
+    if ADMIN_TOKEN:
+        app.include_router(tuning_router)
+
+    performance_config.subscribe(lambda settings: limiter.set_bounds(settings.limit_min, settings.limit_max))
+    performance_config.load()  # in the lifespan, when KOUNT_TUNING_FILE is set
+
+    @retry(stop=stop_after_configured_attempts(performance_config), wait=wait_configured_backoff(performance_config))
+    async def call_kount(): ...
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+from tenacity import wait_fixed, wait_random_exponential
+from tenacity.stop import stop_base
+from tenacity.wait import wait_base
+
+from .capture import CAPTURE_SAMPLE_RATE
+from .concurrency import ACQUIRE_TIMEOUT, MAX_RETRY_AFTER
+from .payload_pool import DEFAULT_OFFLOAD_THRESHOLD, DEFAULT_OFFLOAD_WORKERS
+from .retry_budget import RETRY_BUDGET_RATIO
+from .server_timing import ACCESS_LOG_SAMPLE_RATE
+from .tracing import TRACE_SAMPLE_RATE
+from .warmup import DNS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+TUNING_FILE = os.getenv("KOUNT_TUNING_FILE")
+"""
+Optional JSON file of performance settings, re-read when it changes.
+"""
+
+TUNING_RELOAD_INTERVAL = float(os.getenv("KOUNT_TUNING_RELOAD_INTERVAL", "5"))
+"""
+Seconds between checks of the tuning file for changes.
+"""
+
+ADMIN_TOKEN = os.getenv("KOUNT_ADMIN_TOKEN")
+"""
+Shared secret required by the tuning endpoints; they are disabled when unset.
+"""
+
+DEFAULT_API_ENDPOINT = "https://api-sandbox.kount.com/commerce/v2/orders?riskInquiry=true"
+"""
+The Kount risk inquiry endpoint used when KOUNT_API_ENDPOINTS is not set.
+"""
+
+
+class PerformanceSettings(NamedTuple):
+    """
+    One consistent set of performance parameters.
+
+    Each field is read from the environment variable KOUNT_ plus its upper-cased
+    name, e.g. KOUNT_MAX_ATTEMPTS.
+    """
+
+    # Timeouts, in seconds
+    request_timeout: float = 300.0
+    token_timeout: float = 10.0
+    # Retry policy
+    max_attempts: int = 3
+    max_backoff: float = 10.0
+    retryable_statuses: frozenset = frozenset({403, 408, 429, 500, 502, 503, 504})
+    retry_budget_ratio: float = RETRY_BUDGET_RATIO
+    token_retry_wait: float = 10.0
+    token_refresh_buffer: float = 120.0
+    token_refresh_cooldown: float = 10.0
+    # Endpoints
+    api_endpoints: tuple = (DEFAULT_API_ENDPOINT,)
+    endpoint_ejection_seconds: float = 30.0
+    # Pool sizes
+    transport_max_connections: int = 100
+    offload_threshold: int = DEFAULT_OFFLOAD_THRESHOLD
+    offload_workers: int = DEFAULT_OFFLOAD_WORKERS
+    # Concurrency limits
+    limit_min: int = 1
+    limit_max: int = 200
+    limit_latency_tolerance: float = 2.0
+    tenant_max_concurrency: int = 0
+    background_reserved: int = 1
+    background_max_share: float = 0.5
+    limiter_acquire_timeout: float = ACQUIRE_TIMEOUT
+    max_retry_after: float = MAX_RETRY_AFTER
+    # Caches
+    dns_cache_ttl: float = DNS_CACHE_TTL
+    # Log sampling
+    access_log_sample_rate: float = ACCESS_LOG_SAMPLE_RATE
+    trace_sample_rate: float = TRACE_SAMPLE_RATE
+    capture_sample_rate: float = CAPTURE_SAMPLE_RATE
+
+    @classmethod
+    def from_env(cls) -> "PerformanceSettings":
+        """
+        Returns the defaults overridden by any KOUNT_<NAME> environment variables.
+
+        Raises:
+            ValueError: If a variable cannot be converted or the result is invalid.
+        """
+        overrides = {}
+        for name in cls._fields:
+            value = os.getenv(f"KOUNT_{name.upper()}")
+            if value is not None and value.strip():
+                overrides[name] = value
+        return cls().replace(overrides)
+
+    def replace(self, overrides: dict) -> "PerformanceSettings":
+        """
+        Returns a validated copy with some fields changed.
+
+        Args:
+            overrides (dict): New values by field name, as strings (comma-separated for
+                collections) or JSON values.
+
+        Returns:
+            PerformanceSettings: The new snapshot.
+
+        Raises:
+            ValueError: If a field is unknown, a value cannot be converted or the result is invalid.
+        """
+        unknown = set(overrides) - set(self._fields)
+        if unknown:
+            raise ValueError(f"Unknown performance settings: {sorted(unknown)}")
+        settings = self._replace(**{name: _convert(name, value) for name, value in overrides.items()})
+        settings.validate()
+        return settings
+
+    def validate(self):
+        """
+        Checks that the settings are usable together.
+
+        Raises:
+            ValueError: If a value is out of range.
+        """
+        for name in ("request_timeout", "token_timeout", "max_backoff", "token_retry_wait", "dns_cache_ttl",
+                     "limit_latency_tolerance"):
+            if getattr(self, name) <= 0:
+                raise ValueError(f"{name} must be positive.")
+        for name in ("retry_budget_ratio", "token_refresh_buffer", "token_refresh_cooldown",
+                     "endpoint_ejection_seconds", "offload_threshold", "offload_workers", "tenant_max_concurrency",
+                     "background_reserved", "limiter_acquire_timeout", "max_retry_after"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must not be negative.")
+        for name in ("access_log_sample_rate", "trace_sample_rate", "capture_sample_rate"):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be between 0 and 1.")
+        if self.max_attempts < 1 or self.transport_max_connections < 1:
+            raise ValueError("max_attempts and transport_max_connections must be at least 1.")
+        if not 1 <= self.limit_min <= self.limit_max:
+            raise ValueError("limit_min must be at least 1 and no more than limit_max.")
+        if not 0 < self.background_max_share <= 1:
+            raise ValueError("background_max_share must be above 0 and at most 1.")
+        if not self.api_endpoints:
+            raise ValueError("api_endpoints needs at least one URL.")
+        for url in self.api_endpoints:
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.netloc:
+                raise ValueError(f"api_endpoints entry {url!r} is not an http(s) URL.")
+
+    def to_dict(self) -> dict:
+        """Returns the settings as JSON-serialisable values."""
+        return {name: _json_value(value) for name, value in self._asdict().items()}
+
+
+def _json_value(value):
+    if isinstance(value, frozenset):
+        return sorted(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def _convert(name: str, value):
+    kind = type(PerformanceSettings._field_defaults[name])
+    try:
+        if kind in (frozenset, tuple):
+            items = [item.strip() for item in value.split(",")] if isinstance(value, str) else list(value)
+            if kind is frozenset:
+                return frozenset(int(item) for item in items if item != "")
+            return tuple(str(item) for item in items if item != "")
+        if isinstance(value, bool) or (kind is int and isinstance(value, float) and not value.is_integer()):
+            raise TypeError(f"expected {kind.__name__}")
+        return kind(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value for {name}: {value!r} ({e})") from e
+
+
+class PerformanceConfig:
+    """
+    Holds the current PerformanceSettings and applies changes from the tuning file or an admin.
+
+    The tuning file is only read by `load`, not when the config is created.
+
+    Attributes:
+        current (PerformanceSettings): The settings in effect; read it, never mutate it.
+        base (PerformanceSettings): The settings from the environment, before the file.
+        path (Optional[str]): The JSON tuning file, or None.
+        counters (dict): Applied changes, file reloads and failed reloads or changes.
+    """
+
+    def __init__(self, path: Optional[str] = TUNING_FILE, base: Optional[PerformanceSettings] = None):
+        self.path = path
+        self.base = base or PerformanceSettings.from_env()
+        self.current = self.base
+        self.counters = {"updates": 0, "reloads": 0, "errors": 0}
+        self.last_change = {}
+        self._listeners = []
+        self._mtime = None
+
+    def subscribe(self, listener: Callable[[PerformanceSettings], None]):
+        """
+        Registers a callable run with the new settings after every change.
+
+        Args:
+            listener (Callable): Pushes settings into a long-lived object; it should not block,
+                and it must also accept the previous settings again if a later listener fails.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, settings: PerformanceSettings):
+        for listener in self._listeners:
+            listener(settings)
+
+    def _apply(self, settings: PerformanceSettings) -> dict:
+        changed = {name: value for name, value in settings._asdict().items() if getattr(self.current, name) != value}
+        previous = self.current
+        # One assignment, so readers see either the old or the new snapshot
+        self.current = settings
+        try:
+            self._notify(settings)
+        except Exception as e:
+            # Put every object back on the previous settings rather than leave some of them updated
+            self.counters["errors"] += 1
+            self.current = previous
+            try:
+                self._notify(previous)
+            except Exception as restore_error:
+                logger.error("Restoring the previous performance settings failed: %s", restore_error)
+            raise ValueError(f"Applying performance settings failed, previous settings restored: {e}") from e
+        if changed:
+            self.last_change = {name: _json_value(value) for name, value in changed.items()}
+        return changed
+
+    def update(self, overrides: dict) -> dict:
+        """
+        Changes some settings on top of the current ones.
+
+        Args:
+            overrides (dict): New values by field name.
+
+        Returns:
+            dict: The fields whose values changed.
+
+        Raises:
+            ValueError: If a field is unknown, a value is invalid or a listener cannot apply it;
+                nothing is changed.
+        """
+        changed = self._apply(self.current.replace(overrides))
+        self.counters["updates"] += 1
+        return changed
+
+    def load(self) -> dict:
+        """
+        Reads the tuning file and applies it on top of the environment settings.
+
+        Returns:
+            dict: The fields whose values changed.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a valid JSON object of settings or a listener cannot
+                apply them; the current settings stay in effect.
+        """
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r", encoding="utf-8") as handle:
+            overrides = json.load(handle)
+        if not isinstance(overrides, dict):
+            raise ValueError("The tuning file must hold a JSON object.")
+        # Validated in full before anything is replaced, so a bad file leaves the current settings in place
+        settings = self.base.replace(overrides)
+        changed = self._apply(settings)
+        self._mtime = mtime
+        return changed
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the tuning file if its modification time changed.
+
+        A file that fails to load is logged and the current settings stay in effect.
+
+        Returns:
+            bool: True if the file was applied.
+        """
+        if not self.path:
+            return False
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return False
+            self.load()
+        except (OSError, ValueError) as e:
+            self.counters["errors"] += 1
+            logger.error("Keeping current performance settings, reload of %s failed: %s", self.path, e)
+            return False
+        self.counters["reloads"] += 1
+        return True
+
+    async def watch(self, interval: float = TUNING_RELOAD_INTERVAL):
+        """
+        Background coroutine that checks the tuning file for changes every `interval` seconds.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
+
+    def stats(self) -> dict:
+        """
+        Returns the settings in effect, the last change and the counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the config.
+        """
+        return {"path": self.path, "settings": self.current.to_dict(), "last_change": self.last_change,
+                **self.counters}
+
+
+class stop_after_configured_attempts(stop_base):
+    """Tenacity stop condition reading the attempt limit from the current settings."""
+
+    def __init__(self, config: PerformanceConfig):
+        self.config = config
+
+    def __call__(self, retry_state) -> bool:
+        return retry_state.attempt_number >= self.config.current.max_attempts
+
+
+class wait_configured_backoff(wait_base):
+    """Tenacity wait: jittered exponential backoff capped by the current `max_backoff`."""
+
+    def __init__(self, config: PerformanceConfig):
+        self.config = config
+
+    def __call__(self, retry_state) -> float:
+        return wait_random_exponential(multiplier=1, max=self.config.current.max_backoff)(retry_state)
+
+
+class wait_configured_fixed(wait_base):
+    """Tenacity wait: a fixed delay read from a settings field, e.g. `token_retry_wait`."""
+
+    def __init__(self, config: PerformanceConfig, field: str):
+        self.config = config
+        self.field = field
+
+    def __call__(self, retry_state) -> float:
+        return wait_fixed(getattr(self.config.current, self.field))(retry_state)
+
+
+performance_config = PerformanceConfig()
+"""
+The process-wide performance settings.
+"""
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency that guards the tuning endpoints.
+
+    Raises:
+        HTTPException: 404 when tuning over HTTP is disabled, 403 when the token does not match.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404)
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+tuning_router = APIRouter(prefix="/internal/tuning", dependencies=[Depends(require_admin_token)])
+
+
+@tuning_router.get("")
+async def get_tuning():
+    """Returns the performance settings in effect."""
+    return performance_config.stats()
+
+
+@tuning_router.patch("")
+async def update_tuning(overrides: dict = Body(...)):
+    """Changes some performance settings; the whole change is rejected if any value is invalid."""
+    try:
+        changed = performance_config.update(overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"changed": sorted(changed), "settings": performance_config.current.to_dict()}
+
+
+@tuning_router.post("/reload")
+async def reload_tuning():
+    """Re-reads the tuning file now."""
+    if not performance_config.path:
+        raise HTTPException(status_code=404, detail="KOUNT_TUNING_FILE is not set")
+    try:
+        changed = performance_config.load()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    performance_config.counters["reloads"] += 1
+    return {"changed": sorted(changed), "settings": performance_config.current.to_dict()}
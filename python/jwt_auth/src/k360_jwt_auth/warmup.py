@@ -0,0 +1,223 @@
+"""
+DNS pre-resolution and connection pre-warming for outbound Kount calls.
+
+The first requests after a deploy otherwise pay for a DNS lookup and a TCP/TLS
+handshake to every host they touch, which shows up in p99 after each rollout.
+
+- `dns_cache` is an aiohttp resolver shared by the auth, public key and Kount
+  API sessions. Hosts are resolved at startup; once an entry expires it keeps
+  being served while a background lookup refreshes it, so requests never wait
+  on DNS for a known host (and survive a resolver outage with the last answer).
+- `ConnectionWarmer` opens a number of connections through a Kount transport
+  before the app reports ready, and keeps them alive with periodic lightweight
+  requests so idle timeouts do not close them between bursts. Each of these
+  requests gives up after KOUNT_WARMUP_TIMEOUT seconds, so an unresponsive host
+  delays startup by seconds rather than by the full request timeout.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from urllib.parse import urlsplit
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+logger = logging.getLogger(__name__)
+
+DNS_CACHE_TTL = float(os.getenv("KOUNT_DNS_CACHE_TTL", "300"))
+"""
+Seconds a resolved address is used before it is refreshed in the background.
+"""
+
+WARMUP_TIMEOUT = float(os.getenv("KOUNT_WARMUP_TIMEOUT", "5"))
+"""
+Seconds a warm-up or keep-alive request may take, independent of the transport's request timeout.
+"""
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class CachingResolver(AbstractResolver):
+    """
+    aiohttp resolver that serves cached addresses and refreshes them in the background.
+
+    Attributes:
+        ttl (float): Seconds before an entry is refreshed.
+        counters (dict): Cache hits, misses (lookups on the request path), stale hits and refresh failures.
+    """
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self.counters = {"hits": 0, "misses": 0, "stale_hits": 0, "refresh_failures": 0}
+        self._entries = {}
+        self._refreshing = {}
+        self._resolver = None
+        self._resolver_loop = None
+
+    def _get_resolver(self):
+        # aiohttp resolvers bind to the running loop, so the real one is created per loop on first use
+        loop = asyncio.get_running_loop()
+        if self._resolver is None or self._resolver_loop is not loop:
+            self._resolver = DefaultResolver()
+            self._resolver_loop = loop
+        return self._resolver
+
+    async def _lookup(self, key):
+        host, port, family = key
+        addresses = await self._get_resolver().resolve(host, port, family)
+        self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    async def _refresh(self, key):
+        try:
+            await self._lookup(key)
+        except OSError as e:
+            self.counters["refresh_failures"] += 1
+            logger.error("DNS refresh for %s failed, keeping previous addresses: %s", key[0], e)
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_UNSPEC) -> list:
+        """
+        Returns the addresses for a host, from the cache when possible.
+
+        Args:
+            host (str): The host name.
+            port (int): The port.
+            family (socket.AddressFamily): The address family.
+
+        Returns:
+            list: aiohttp ResolveResult dicts.
+        """
+        key = (host, port, family)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return await self._lookup(key)
+        expires, addresses = entry
+        if expires > time.monotonic():
+            self.counters["hits"] += 1
+        else:
+            self.counters["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.create_task(self._refresh(key))
+        return addresses
+
+    async def preresolve(self, urls) -> int:
+        """
+        Resolves the hosts of the given URLs concurrently and caches them.
+
+        Args:
+            urls (Iterable[str]): URLs whose hosts will be contacted.
+
+        Returns:
+            int: The number of hosts resolved.
+        """
+        keys = set()
+        for url in urls:
+            parts = urlsplit(url)
+            if parts.hostname:
+                # AF_UNSPEC is what aiohttp's TCPConnector asks for by default
+                keys.add((parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme, 443), socket.AF_UNSPEC))
+        results = await asyncio.gather(*(self._lookup(key) for key in keys), return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.error("DNS pre-resolution of %s failed: %s", key[0], result)
+        return sum(not isinstance(result, Exception) for result in results)
+
+    async def close(self):
+        """Cancels background refreshes and closes the underlying resolver."""
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+            self._resolver_loop = None
+
+    def stats(self) -> dict:
+        """
+        Returns the cached hosts and counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the cache.
+        """
+        return {"hosts": sorted({key[0] for key in self._entries}), **self.counters}
+
+
+dns_cache = CachingResolver()
+"""
+The process-wide resolver used by every aiohttp session that talks to Kount.
+"""
+
+
+class ConnectionWarmer:
+    """
+    Opens and keeps alive pooled connections to the Kount API hosts.
+
+    Attributes:
+        transport: The Kount transport whose pool is warmed (see k360_jwt_auth.transport).
+        urls (list): Lightweight URLs to request on each host, e.g. an origin's probe path.
+        connections (int): Concurrent requests per URL, i.e. connections opened over HTTP/1.1.
+        keepalive_interval (float): Seconds between keep-alive rounds; 0 disables them.
+        timeout (float): Seconds each warm-up request may take.
+        counters (dict): Warm-up rounds, successful and failed requests.
+    """
+
+    def __init__(self, transport, urls: list, connections: int = 4, keepalive_interval: float = 10.0,
+                 timeout: float = WARMUP_TIMEOUT):
+        self.transport = transport
+        self.urls = list(urls)
+        self.connections = connections
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self.counters = {"rounds": 0, "ok": 0, "failed": 0}
+        self._task = None
+
+    async def warm(self):
+        """Sends `connections` concurrent requests to every URL; any HTTP response within `timeout` counts."""
+        async def touch(url):
+            try:
+                await asyncio.wait_for(self.transport.request("GET", url), self.timeout)
+                self.counters["ok"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                logger.error("Connection warm-up request to %s failed: %s", url, str(e) or type(e).__name__)
+
+        self.counters["rounds"] += 1
+        await asyncio.gather(*(touch(url) for url in self.urls for _ in range(self.connections)))
+
+    async def _keep_alive(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            await self.warm()
+
+    async def start(self):
+        """Pre-resolves the hosts, opens the connections and starts the keep-alive loop."""
+        if self.connections <= 0 or not self.urls:
+            return
+        await dns_cache.preresolve(self.urls)
+        await self.warm()
+        if self.keepalive_interval > 0:
+            self._task = asyncio.create_task(self._keep_alive())
+
+    async def stop(self):
+        """Stops the keep-alive loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+        Returns the warm-up counters.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the warmer.
+        """
+        return {"urls": self.urls, "connections": self.connections, **self.counters}
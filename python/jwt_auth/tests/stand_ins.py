@@ -0,0 +1,65 @@
+"""
+Local HTTP stand-ins and fixtures shared by the client, transport and warm-up tests.
+"""
+
+import time
+
+import jwt as pyjwt
+import pytest
+from aiohttp import web
+
+from k360_jwt_auth.jwt_utils import token_manager
+
+ORDER = {
+    "order_id": "A1",
+    "items": [{"price": "10", "item_id": "i1"}],
+    "transactions": [{"subtotal": "10", "payment": {"type": "CARD", "bin": "411111"}}],
+}
+
+@pytest.fixture
+def long_lived_token():
+    previous = token_manager.get_access_token()
+    token_manager.set_access_token(pyjwt.encode({"exp": int(time.time()) + 3600}, "stand-in-signing-key-of-32-bytes!", algorithm="HS256"))
+    yield
+    token_manager.set_access_token(previous)
+
+async def start_stand_in(routes):
+    """
+    Serves `routes`, (method, path, handler) tuples, on a free local port.
+
+    Returns:
+        tuple: (the AppRunner to clean up, the base URL).
+    """
+    app = web.Application()
+    for method, path, handler in routes:
+        app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+def kount_orders_routes(requests, failures=0, status=429):
+    """Kount Orders API routes that record (method, path, body) and fail the first `failures` requests with `status`."""
+    async def create(request):
+        requests.append(("POST", request.path_qs, await request.json()))
+        if len(requests) <= failures:
+            return web.Response(status=status)
+        return web.json_response({"order": {"orderId": "K1", "riskInquiry": {"decision": "APPROVE"}}})
+
+    async def order(request):
+        body = await request.json() if request.can_read_body else None
+        requests.append((request.method, request.path_qs, body))
+        if len(requests) <= failures:
+            return web.Response(status=status)
+        return web.json_response({"order": {"orderId": request.match_info["order_id"]}})
+
+    async def bad_request(request):
+        return web.Response(status=400, text="bad payload")
+
+    return [
+        ("POST", "/commerce/v2/orders", create),
+        ("PATCH", "/commerce/v2/orders/{order_id}", order),
+        ("GET", "/commerce/v2/orders/{order_id}", order),
+        ("POST", "/invalid", bad_request),
+    ]
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from k360_jwt_auth.capture import CaptureExporter, Redactor, TrafficCapture, read_capture
+
+ORDER = {
+    "order_id": "A1",
+    "user_ip": "192.168.1.1",
+    "items": [{"price": "10", "item_id": "i1", "quantity": 2}],
+    "fulfillment": [{"recipient": {"first": "John", "email_address": "john.doe@example.com"}}],
+    "transactions": [{"subtotal": "10", "payment": {"type": "CARD", "bin": "411111", "last4": 1111}}],
+    "custom_fields": {"giftWrap": True, "note": "Leave at the door"},
+}
+
+def make_request(body: bytes, headers=()):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/process-transaction",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "query_string": b"",
+    }
+    return Request(scope, receive)
+
+# ------------------------
+# Redactor tests
+# ------------------------
+
+def test_redaction_keeps_shape_and_formats():
+    redacted = Redactor(key=b"k" * 32).redact(ORDER)
+    assert redacted["order_id"] == "A1"
+    assert redacted["items"] == ORDER["items"]
+    assert redacted["user_ip"] != ORDER["user_ip"]
+    assert [len(part) for part in redacted["user_ip"].split(".")] == [3, 3, 1, 1]
+    email = redacted["fulfillment"][0]["recipient"]["email_address"]
+    assert email != "john.doe@example.com" and email.count("@") == 1 and len(email) == 20
+    payment = redacted["transactions"][0]["payment"]
+    assert payment["type"] == "CARD"
+    assert payment["bin"].isdigit() and len(payment["bin"]) == 6 and payment["bin"] != "411111"
+    assert isinstance(payment["last4"], int)
+    assert isinstance(redacted["custom_fields"]["giftWrap"], bool)
+    assert redacted["custom_fields"]["note"] != "Leave at the door"
+
+def test_redaction_replaces_non_ascii_and_numeric_values():
+    redactor = Redactor(key=b"k" * 32)
+    redacted = redactor.redact({
+        "first": "山田", "family": "Müller", "email": "josé@ex.com", "middle": "Ｚ٣",
+        "account_id": 12345, "user_ip": 1.5e-05, "bin": -4111.25, "phone": False,
+    })
+    assert not any(ord(char) > 127 for value in redacted.values() if isinstance(value, str) for char in value)
+    assert len(redacted["first"]) == 2 and redacted["first"].islower()
+    assert len(redacted["family"]) == 6 and redacted["family"][0].isupper() and "ü" not in redacted["family"]
+    assert redacted["email"].count("@") == 1 and redacted["email"][3] != "é"
+    assert redacted["middle"][1].isdigit()
+    assert isinstance(redacted["account_id"], int) and redacted["account_id"] != 12345
+    assert isinstance(redacted["user_ip"], float) and redacted["user_ip"] != 1.5e-05
+    assert isinstance(redacted["bin"], float) and redacted["bin"] < 0 and redacted["bin"] != -4111.25
+    assert redactor.redact({"phone": False}) == {"phone": redacted["phone"]}
+
+def test_pseudonyms_are_stable_per_key():
+    redactor = Redactor(key=b"k" * 32)
+    assert redactor.pseudonym("john.doe@example.com") == redactor.pseudonym("john.doe@example.com")
+    assert Redactor(key=b"j" * 32).pseudonym("john.doe@example.com") != redactor.pseudonym("john.doe@example.com")
+
+# ------------------------
+# TrafficCapture tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_sampled_requests_are_written_with_upstream_attempts(tmp_path):
+    path = str(tmp_path / "capture.ndjson.gz")
+    capture = TrafficCapture(1.0, CaptureExporter(path), headers=["X-Merchant-Id"])
+
+    @capture.captured
+    async def handler(request):
+        order = await request.json()
+        capture.current().upstream(503, 0.2)
+        capture.current().upstream(200, 0.05)
+        return {"order_id": order["order_id"]}
+
+    assert await handler(request=make_request(json.dumps(ORDER).encode(), [("X-Merchant-Id", "m1")])) == {"order_id": "A1"}
+    assert capture.current() is None
+    await capture.stop()
+
+    (record,) = read_capture(path)
+    assert record["path"] == "/process-transaction"
+    assert record["headers"] == {"X-Merchant-Id": "m1"}
+    assert record["status"] == 200
+    assert record["upstream"] == [[503, 200.0], [200, 50.0]]
+    assert record["body"]["order_id"] == "A1"
+    assert record["body"]["user_ip"] != ORDER["user_ip"]
+
+@pytest.mark.asyncio
+async def test_errors_are_recorded_and_invalid_bodies_skipped(tmp_path):
+    path = str(tmp_path / "capture.ndjson.gz")
+    capture = TrafficCapture(1.0, CaptureExporter(path, max_records=1))
+
+    @capture.captured
+    async def handler(request):
+        raise HTTPException(status_code=400)
+
+    for body in (b"{bad", json.dumps(ORDER).encode(), json.dumps(ORDER).encode()):
+        with pytest.raises(HTTPException):
+            await handler(request=make_request(body))
+    await capture.stop()
+
+    assert [record["status"] for record in read_capture(path)] == [400]
+    assert capture.stats()["skipped"] == 1
+    assert capture.stats()["exporter"]["dropped"] == 1
+
+@pytest.mark.asyncio
+async def test_disabled_capture_does_not_read_the_body():
+    capture = TrafficCapture(0.0, CaptureExporter("unused.ndjson.gz"))
+
+    @capture.captured
+    async def handler(request):
+        return capture.current()
+
+    assert await handler(request=make_request(b"{}")) is None
+    assert capture.stats()["captured"] == 0
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from k360_jwt_auth.client import K360Client
+from k360_jwt_auth.exceptions import TransportStatusError
+
+from .stand_ins import ORDER, kount_orders_routes, long_lived_token, start_stand_in
+
+class CountingCodec:
+    """JSON codec that counts how often it is used."""
+    def __init__(self):
+        self.encoded = 0
+        self.decoded = 0
+
+    def encode(self, obj):
+        self.encoded += 1
+        return json.dumps(obj).encode("utf-8")
+
+    def decode(self, data):
+        self.decoded += 1
+        return json.loads(data)
+
+# ------------------------
+# K360Client tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_risk_inquiry_patch_and_get_share_one_client(long_lived_token):
+    requests = []
+    runner, base_url = await start_stand_in(kount_orders_routes(requests))
+    codec = CountingCodec()
+    try:
+        async with K360Client(base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5, encoder=codec, decoder=codec) as client:
+            result = await client.risk_inquiry(ORDER)
+            assert result["order"]["riskInquiry"]["decision"] == "APPROVE"
+            assert await client.patch_order("K1", {"transactions": []}) == {"order": {"orderId": "K1"}}
+            assert await client.get_order("K1") == {"order": {"orderId": "K1"}}
+    finally:
+        await runner.cleanup()
+
+    assert [request[:2] for request in requests] == [
+        ("POST", "/commerce/v2/orders?riskInquiry=true"),
+        ("PATCH", "/commerce/v2/orders/K1"),
+        ("GET", "/commerce/v2/orders/K1"),
+    ]
+    assert requests[0][2]["merchantOrderId"] == "A1"
+    assert (codec.encoded, codec.decoded) == (2, 3)
+
+@pytest.mark.asyncio
+async def test_retryable_errors_are_retried_and_others_raised_with_the_body(long_lived_token):
+    requests = []
+    runner, base_url = await start_stand_in(kount_orders_routes(requests, failures=1))
+    try:
+        async with K360Client(base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5, max_backoff=0.01) as client:
+            assert (await client.risk_inquiry(ORDER))["order"]["orderId"] == "K1"
+            assert len(requests) == 2
+
+            with pytest.raises(TransportStatusError) as exc_info:
+                await client.request("POST", base_url + "/invalid", b"{}")
+            assert exc_info.value.status == 400
+            assert exc_info.value.message == "bad payload"
+    finally:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried_only_for_idempotent_methods(long_lived_token):
+    requests = []
+    runner, base_url = await start_stand_in(kount_orders_routes(requests, failures=1, status=503))
+    try:
+        async with K360Client(base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5, max_backoff=0.01) as client:
+            with pytest.raises(TransportStatusError) as exc_info:
+                await client.risk_inquiry(ORDER)
+            assert exc_info.value.status == 503
+            assert len(requests) == 1
+
+            requests.clear()
+            assert await client.get_order("K1") == {"order": {"orderId": "K1"}}
+            assert [request[0] for request in requests] == ["GET", "GET"]
+    finally:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_unstarted_client_rejects_calls():
+    client = K360Client("http://127.0.0.1:9/commerce/v2/orders")
+    with pytest.raises(RuntimeError):
+        await client.get_order("K1")
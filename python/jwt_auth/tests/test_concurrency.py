@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+
+from k360_jwt_auth.concurrency import AdaptiveConcurrencyLimiter, LimiterOutcome, parse_retry_after
+
+# ------------------------
+# parse_retry_after tests
+# ------------------------
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("3", 3.0), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+def test_parse_retry_after_http_date_in_past():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+# ------------------------
+# AdaptiveConcurrencyLimiter tests
+# ------------------------
+
+def outcome(status, retry_after=None):
+    result = LimiterOutcome()
+    result.record(status, retry_after)
+    return result
+
+@pytest.mark.asyncio
+async def test_limiter_increases_on_success():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+    for _ in range(4):
+        await limiter.acquire()
+        await limiter.release(0.01, outcome(200))
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_on_429():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff_ratio=0.5)
+    await limiter.acquire()
+    await limiter.release(0.01, outcome(429))
+    assert limiter.limit == 5.0
+    assert limiter.counters["decreases"] == 1
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_on_latency_spike():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff_ratio=0.5, latency_tolerance=2.0)
+    await limiter.acquire()
+    await limiter.release(0.01, outcome(200))
+    await limiter.acquire()
+    await limiter.release(0.5, outcome(200))
+    assert limiter.counters["latency_spikes"] == 1
+    assert limiter.limit < 10
+
+@pytest.mark.asyncio
+async def test_limiter_blocks_beyond_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    await limiter.release(0.01, outcome(200))
+    await asyncio.wait_for(waiter, timeout=1)
+    assert limiter.in_flight == 1
+
+@pytest.mark.asyncio
+async def test_limiter_honors_retry_after():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=5)
+    limiter_outcome = LimiterOutcome()
+    limiter_outcome.status = 429
+    limiter_outcome.retry_after = 0.2
+    await limiter.acquire()
+    await limiter.release(0.01, limiter_outcome)
+
+    started = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+@pytest.mark.asyncio
+async def test_limiter_caps_retry_after_and_ignores_it_on_success():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=5, max_retry_after=0.1, acquire_timeout=None)
+    await limiter.acquire()
+    await limiter.release(0.01, outcome(200, "3600"))
+    assert limiter.blocked_until == 0.0
+
+    await limiter.acquire()
+    await limiter.release(0.01, outcome(503, "3600"))
+    assert limiter.blocked_until - time.monotonic() <= 0.1
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+@pytest.mark.asyncio
+async def test_limiter_acquire_times_out():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, acquire_timeout=0.05)
+    await limiter.acquire()
+    with pytest.raises(asyncio.TimeoutError):
+        await limiter.acquire()
+
+    # A pause longer than the timeout fails at once instead of waiting it out
+    await limiter.release(0.01, outcome(429, "5"))
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await limiter.acquire()
+    assert time.monotonic() - started < 0.05
+    assert limiter.counters["timeouts"] == 2
+
+@pytest.mark.asyncio
+async def test_raising_the_bounds_admits_waiting_callers():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, acquire_timeout=None)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    limiter.set_bounds(2, 10, 2.0)
+    await asyncio.wait_for(waiter, timeout=1)
+    assert limiter.in_flight == 2
+
+@pytest.mark.asyncio
+async def test_limiter_slot_counts_exceptions_as_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff_ratio=0.5)
+    with pytest.raises(asyncio.TimeoutError):
+        async with limiter.slot():
+            raise asyncio.TimeoutError()
+    assert limiter.limit == 5.0
+    assert limiter.in_flight == 0
@@ -0,0 +1,106 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from k360_jwt_auth.endpoints import Endpoint, EndpointPool
+
+from .stand_ins import start_stand_in
+
+async def start_delayed_stand_in(delay: float, status: int = 200):
+    """Starts a local stand-in that answers every request after `delay` seconds."""
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return web.json_response({"ok": True}, status=status)
+
+    runner, base_url = await start_stand_in([("*", "/{tail:.*}", handler)])
+    return runner, base_url + "/commerce/v2/orders?riskInquiry=true"
+
+# ------------------------
+# Endpoint tests
+# ------------------------
+
+def test_endpoint_url_for_drops_query():
+    endpoint = Endpoint("https://api.example.com/commerce/v2/orders?riskInquiry=true")
+
+    assert endpoint.origin == "https://api.example.com"
+    assert endpoint.url_for("K123") == "https://api.example.com/commerce/v2/orders/K123"
+
+# ------------------------
+# EndpointPool tests
+# ------------------------
+
+def test_pool_prefers_lower_latency_and_skips_failures():
+    pool = EndpointPool(["http://a/", "http://b/", "http://c/"])
+    a, b, c = pool.endpoints
+    pool.record(a, 0.050, True)
+    pool.record(b, 0.010, True)
+    pool.record(c, 0.001, True)
+    pool.record(c, 0.001, False)
+
+    assert pool.candidates() == [b, a, c]
+
+def test_request_latency_outranks_probe_latency():
+    pool = EndpointPool(["http://a/", "http://b/"])
+    a, b = pool.endpoints
+    pool.record(a, 0.001, True, probe=True)
+    pool.record(b, 0.005, True, probe=True)
+    assert pool.candidates() == [a, b]
+
+    pool.record(a, 0.200, True)
+    pool.record(a, 0.001, True, probe=True)
+    assert (a.latency, pool.candidates()) == (0.200, [b, a])
+
+def test_set_urls_keeps_state_of_remaining_endpoints():
+    pool = EndpointPool(["https://a.example/orders", "https://b.example/orders"])
+    pool.record(pool.endpoints[0], 0.05, True)
+    pool.set_urls(["https://c.example/orders", "https://a.example/orders"])
+    assert [e.url for e in pool.endpoints] == ["https://c.example/orders", "https://a.example/orders"]
+    assert pool.endpoints[1].latency == 0.05
+    with pytest.raises(ValueError):
+        pool.set_urls([])
+
+def test_pool_ejects_after_repeated_failures_and_recovers_on_success():
+    pool = EndpointPool(["http://a/", "http://b/"], failure_threshold=2, ejection_seconds=60)
+    a, b = pool.endpoints
+    pool.record(a, 0.001, True)
+    pool.record(b, 0.100, False)
+    pool.record(b, 0.100, False)
+    pool.record(a, 0.001, False)
+    pool.record(a, 0.001, False)
+
+    assert a.counters["ejections"] == 1
+    assert pool.candidates() == [b, a]  # all ejected: soonest to return first
+
+    pool.record(a, 0.002, True)
+    assert pool.best() is a
+    assert a.ejected_until == 0.0
+
+@pytest.mark.asyncio
+async def test_pool_probe_ranks_stand_ins_by_latency():
+    slow_runner, slow_url = await start_delayed_stand_in(0.1)
+    fast_runner, fast_url = await start_delayed_stand_in(0.0)
+    failing_runner, failing_url = await start_delayed_stand_in(0.0, status=503)
+    try:
+        pool = EndpointPool([slow_url, failing_url, fast_url], failure_threshold=1)
+        async with aiohttp.ClientSession() as session:
+            await pool.probe(session)
+
+        assert [endpoint.url for endpoint in pool.candidates()] == [fast_url, slow_url, failing_url]
+        assert pool.endpoints[1].counters["probe_failures"] == 1
+        assert pool.endpoints[0].latency is None and pool.endpoints[0].probe_latency >= 0.1
+    finally:
+        for runner in (slow_runner, fast_runner, failing_runner):
+            await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_pool_probe_marks_unreachable_endpoint():
+    runner, url = await start_delayed_stand_in(0.0)
+    await runner.cleanup()  # nothing listens on the port any more
+    pool = EndpointPool([url], failure_threshold=1)
+    async with aiohttp.ClientSession() as session:
+        await pool.probe(session, timeout=1.0)
+
+    assert pool.endpoints[0].consecutive_failures == 1
+    assert pool.endpoints[0].ejected_until > 0
@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+
+from k360_jwt_auth.fair_queue import OVERFLOW_TENANT, FairScheduler, Lane, parse_tenant_settings
+
+# ------------------------
+# parse_tenant_settings tests
+# ------------------------
+
+def test_parse_tenant_settings():
+    assert parse_tenant_settings(None) == {}
+    assert parse_tenant_settings(" big=1, small = 2.5 ,") == {"big": 1.0, "small": 2.5}
+    assert parse_tenant_settings("big=4", int) == {"big": 4}
+
+def test_parse_tenant_settings_rejects_bad_entries():
+    with pytest.raises(ValueError):
+        parse_tenant_settings("big")
+
+# ------------------------
+# FairScheduler tests
+# ------------------------
+
+async def drain(scheduler, backlog):
+    """Queues `backlog` calls per tenant behind one held slot and returns the admission order."""
+    order = []
+
+    async def call(tenant):
+        async with scheduler.slot(tenant):
+            order.append(tenant)
+            await asyncio.sleep(0)
+
+    blocker = await scheduler.acquire("blocker")
+    tasks = [asyncio.create_task(call(tenant)) for tenant, count in backlog.items() for _ in range(count)]
+    await asyncio.sleep(0)
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+@pytest.mark.asyncio
+async def test_flooding_tenant_does_not_starve_others():
+    scheduler = FairScheduler(lambda: 1)
+    order = await drain(scheduler, {"big": 20, "small": 2})
+    assert order.index("small") <= 1
+    assert order[:4].count("small") == 2
+    assert scheduler.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_weights_share_admissions_proportionally():
+    scheduler = FairScheduler(lambda: 1, weights={"gold": 3, "basic": 1})
+    order = await drain(scheduler, {"gold": 30, "basic": 30})
+    assert order[:20].count("gold") == 15
+
+@pytest.mark.asyncio
+async def test_fractional_weights_still_make_progress():
+    scheduler = FairScheduler(lambda: 1, weights={"slow": 0.25})
+    order = await drain(scheduler, {"slow": 3})
+    assert order == ["slow"] * 3
+
+@pytest.mark.asyncio
+async def test_per_tenant_cap_leaves_room_for_others():
+    scheduler = FairScheduler(lambda: 10, limits={"big": 2})
+    held = [await scheduler.acquire("big") for _ in range(2)]
+    waiter = asyncio.create_task(scheduler.acquire("big"))
+    other = await asyncio.wait_for(scheduler.acquire("small"), 1)
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    scheduler.release(held[0])
+    await asyncio.wait_for(waiter, 1)
+    stats = scheduler.stats()["tenants"]
+    assert stats["big"]["max_in_flight"] == 2
+    assert stats["big"]["admitted"] == 3
+    scheduler.release(other)
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = FairScheduler(lambda: 1)
+    held = await scheduler.acquire("a")
+    waiter = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.stats()["queued"] == 0
+    scheduler.release(held)
+    assert scheduler.in_flight == 0
+    await asyncio.wait_for(scheduler.acquire("c"), 1)
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_before_a_release_raises_cancelled_error():
+    scheduler = FairScheduler(lambda: 1)
+    held = await scheduler.acquire("a")
+    waiter = asyncio.create_task(scheduler.acquire("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    scheduler.release(held)  # skips and pops the cancelled waiter before its task resumes
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.in_flight == 0
+    await asyncio.wait_for(scheduler.acquire("c"), 1)
+
+@pytest.mark.asyncio
+async def test_unknown_tenants_beyond_the_limit_share_one_queue():
+    scheduler = FairScheduler(lambda: 10, max_tenants=2)
+    for tenant in ("a", "b", "c", "d"):
+        scheduler.release(await scheduler.acquire(tenant))
+    assert set(scheduler.stats()["tenants"]) == {"a", "b", OVERFLOW_TENANT}
+    assert scheduler.stats()["tenants"][OVERFLOW_TENANT]["admitted"] == 2
+
+def test_weights_must_be_positive():
+    with pytest.raises(ValueError):
+        FairScheduler(lambda: 1, weights={"a": 0})
+
+# ------------------------
+# Priority lane tests
+# ------------------------
+
+def lanes(reserved=0, max_share=1.0):
+    return [Lane("interactive"), Lane("background", reserved=reserved, max_share=max_share)]
+
+async def drain_lanes(scheduler, backlog):
+    """Queues `backlog` calls per lane behind one held slot and returns the admission order by lane."""
+    order = []
+
+    async def call(lane):
+        async with scheduler.slot("merchant", lane):
+            order.append(lane)
+            await asyncio.sleep(0)
+
+    blocker = await scheduler.acquire("blocker", "interactive")
+    tasks = [asyncio.create_task(call(lane)) for lane, count in backlog.items() for _ in range(count)]
+    await asyncio.sleep(0)
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+@pytest.mark.asyncio
+async def test_higher_lane_goes_first():
+    scheduler = FairScheduler(lambda: 1, lanes=lanes())
+    order = await drain_lanes(scheduler, {"background": 3, "interactive": 3})
+    assert order == ["interactive"] * 3 + ["background"] * 3
+
+@pytest.mark.asyncio
+async def test_reserved_floor_keeps_background_moving():
+    scheduler = FairScheduler(lambda: 2, lanes=lanes(reserved=1))
+    order = await drain_lanes(scheduler, {"background": 2, "interactive": 6})
+    assert order.index("background") <= 1
+
+@pytest.mark.asyncio
+async def test_lane_share_leaves_headroom():
+    scheduler = FairScheduler(lambda: 4, lanes=lanes(max_share=0.5))
+    held = [await scheduler.acquire("merchant", "background") for _ in range(2)]
+    waiter = asyncio.create_task(scheduler.acquire("merchant", "background"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    scheduler.release(await asyncio.wait_for(scheduler.acquire("merchant", "interactive"), 1))
+    scheduler.release(held[0])
+    await asyncio.wait_for(waiter, 1)
+    stats = scheduler.stats()["lanes"]
+    assert stats["background"]["admitted"] == 3
+    assert stats["interactive"]["latency"]["count"] == 0
+
+@pytest.mark.asyncio
+async def test_lane_latency_is_recorded():
+    scheduler = FairScheduler(lambda: 4, lanes=lanes())
+    async with scheduler.slot("merchant", "background"):
+        await asyncio.sleep(0.01)
+    assert scheduler.stats()["lanes"]["background"]["latency"]["count"] == 1
+
+@pytest.mark.asyncio
+async def test_unknown_lane_and_bad_lane_settings_are_rejected():
+    with pytest.raises(ValueError):
+        Lane("background", max_share=0)
+    with pytest.raises(KeyError):
+        await FairScheduler(lambda: 1).acquire("merchant", "missing")
+
+@pytest.mark.asyncio
+async def test_configure_changes_caps_and_lanes_at_runtime():
+    scheduler = FairScheduler(lambda: 4, default_limit=1, lanes=lanes(max_share=0.25))
+    held = await scheduler.acquire("merchant", "background")
+    waiter = asyncio.create_task(scheduler.acquire("merchant", "background"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    with pytest.raises(ValueError):
+        scheduler.configure(default_limit=0, lanes={"background": (0, 2.0)})
+    scheduler.configure(default_limit=0, lanes={"background": (1, 0.5)})
+    scheduler.release(await asyncio.wait_for(waiter, 1))
+    scheduler.release(held)
+    assert scheduler.stats()["lanes"]["background"]["max_share"] == 0.5
@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from k360_jwt_auth.local_rules import LocalRulesEngine, compile_rules, extract_facts
+
+ORDER = {
+    "creation_datetime": "2025-02-12T15:45:30.123Z",
+    "account_creation_datetime": "2025-02-10T15:45:30.123Z",
+    "items": [{"price": "5000", "is_digital": True}],
+    "fulfillment": [{"type": "SHIPPED", "recipient": {"address": {"country_code": "CA"}}}],
+    "transactions": [{
+        "order_total": "5100",
+        "payment": {"bin": "411111"},
+        "billingPerson": {"address": {"country_code": "US"}},
+    }],
+}
+
+def write_rules(path, rules, default_decision="APPROVE"):
+    path.write_text(json.dumps({"default_decision": default_decision, "rules": rules}))
+    return str(path)
+
+# ------------------------
+# extract_facts / compile_rules tests
+# ------------------------
+
+def test_extract_facts():
+    facts = extract_facts(ORDER)
+
+    assert facts.amount == 5100
+    assert facts.bins == {"411111"}
+    assert facts.billing_countries == {"US"}
+    assert facts.shipping_countries == {"CA"}
+    assert facts.has_digital is True
+    assert facts.account_age_days == pytest.approx(2)
+
+def test_compile_rules_rejects_unknown_type_and_bad_parameters():
+    with pytest.raises(ValueError, match="unknown type"):
+        compile_rules({"rules": [{"type": "nope", "decision": "REVIEW"}]})
+    with pytest.raises(ValueError, match="invalid parameters"):
+        compile_rules({"rules": [{"type": "amount_above", "decision": "REVIEW"}]})
+    with pytest.raises(ValueError, match="invalid decision"):
+        compile_rules({"rules": [{"type": "country_mismatch", "decision": "MAYBE"}]})
+
+@pytest.mark.parametrize("config", [[], {"rules": ["oops"]}, {"rules": {"type": "amount_above"}}])
+def test_compile_rules_rejects_configs_that_are_not_objects(config):
+    with pytest.raises(ValueError, match="must be"):
+        compile_rules(config)
+
+# ------------------------
+# LocalRulesEngine tests
+# ------------------------
+
+@pytest.mark.parametrize("rule, matches", [
+    ({"type": "amount_above", "amount": 5000}, True),
+    ({"type": "amount_above", "amount": 5100}, False),
+    ({"type": "bin_in", "bins": ["411111"]}, True),
+    ({"type": "bin_in", "bins": ["550000"]}, False),
+    ({"type": "country_mismatch"}, True),
+    ({"type": "country_in", "countries": ["CA"]}, True),
+    ({"type": "digital_goods", "amount": 10000}, False),
+    ({"type": "account_age_below", "days": 3}, True),
+    ({"type": "account_age_below", "days": 1}, False),
+])
+def test_engine_rule_types(tmp_path, rule, matches):
+    engine = LocalRulesEngine(write_rules(tmp_path / "rules.json", [{"name": "r", "decision": "REVIEW", **rule}]))
+
+    assert engine.evaluate(ORDER) == (("REVIEW", "r") if matches else ("APPROVE", None))
+
+def test_engine_first_match_wins(tmp_path):
+    engine = LocalRulesEngine(write_rules(tmp_path / "rules.json", [
+        {"name": "decline-bin", "type": "bin_in", "bins": ["411111"], "decision": "DECLINE"},
+        {"name": "mismatch", "type": "country_mismatch", "decision": "REVIEW"},
+    ]))
+
+    assert engine.evaluate(ORDER) == ("DECLINE", "decline-bin")
+    assert engine.matches == {"decline-bin": 1, "mismatch": 0}
+
+def test_engine_returns_default_for_malformed_orders(tmp_path):
+    engine = LocalRulesEngine(write_rules(tmp_path / "rules.json", [{"name": "r", "type": "country_mismatch",
+                                                                     "decision": "REVIEW"}]))
+    for order in ({**ORDER, "transactions": 5}, {**ORDER, "fulfillment": [{"recipient": {"address": {"country_code": ["US"]}}}]}):
+        assert engine.evaluate(order) == ("APPROVE", None)
+    assert engine.counters["evaluation_errors"] == 2
+
+def test_engine_without_file_returns_default():
+    assert LocalRulesEngine().evaluate(ORDER) == ("APPROVE", None)
+
+def test_engine_reload_keeps_previous_rules_on_invalid_config(tmp_path):
+    path = tmp_path / "rules.json"
+    engine = LocalRulesEngine(write_rules(path, [{"name": "r", "type": "country_mismatch", "decision": "REVIEW"}]))
+
+    path.write_text("{not json")
+    os.utime(path, ns=(1, 1))
+    assert engine.reload_if_changed() is False
+    assert engine.counters["reload_errors"] == 1
+    assert engine.evaluate(ORDER) == ("REVIEW", "r")
+
+    path.write_text(json.dumps({"rules": ["oops"]}))
+    os.utime(path, ns=(3, 3))
+    assert engine.reload_if_changed() is False
+    assert engine.counters["reload_errors"] == 2
+    assert engine.evaluate(ORDER) == ("REVIEW", "r")
+
+    write_rules(path, [], default_decision="REVIEW")
+    os.utime(path, ns=(4, 4))
+    assert engine.reload_if_changed() is True
+    assert engine.evaluate(ORDER) == ("REVIEW", None)
+    assert engine.reload_if_changed() is False
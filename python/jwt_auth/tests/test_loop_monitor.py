@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+
+from k360_jwt_auth.loop_monitor import LoopLagMonitor
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+# ------------------------
+# LoopLagMonitor tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_captured_with_its_stack():
+    monitor = LoopLagMonitor(enabled=True, interval=0.01, block_threshold=0.05)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.2)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    stall = stats["recent_stalls"][0]
+    assert "block_the_loop" in stall["stack"]
+    assert stall["duration_ms"] >= 150
+    assert stats["lag"]["max_ms"] >= 150
+
+@pytest.mark.asyncio
+async def test_idle_loop_records_lag_without_stalls():
+    monitor = LoopLagMonitor(enabled=True, interval=0.01, block_threshold=0.1)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats(stacks=False)
+    assert stats["lag"]["count"] > 0
+    assert stats["stalls"] == 0
+    assert stats["recent_stalls"] == []
+
+@pytest.mark.asyncio
+async def test_disabled_monitor_does_nothing():
+    monitor = LoopLagMonitor(enabled=False)
+    await monitor.start()
+    await monitor.stop()
+    assert monitor.stats() is None
@@ -0,0 +1,29 @@
+from k360_jwt_auth.metrics import LatencyRecorder
+
+# ------------------------
+# LatencyRecorder tests
+# ------------------------
+
+def test_latency_recorder_empty_snapshot():
+    snapshot = LatencyRecorder().snapshot()
+    assert snapshot["count"] == 0
+    assert snapshot["p99_ms"] == 0.0
+
+def test_latency_recorder_percentiles():
+    recorder = LatencyRecorder()
+    for ms in range(1, 101):
+        recorder.record(ms / 1000)
+
+    snapshot = recorder.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["p50_ms"] == 50.0
+    assert snapshot["p99_ms"] == 99.0
+    assert snapshot["max_ms"] == 100.0
+
+def test_latency_recorder_window_is_bounded():
+    recorder = LatencyRecorder(window=10)
+    for ms in range(100):
+        recorder.record(ms / 1000)
+
+    assert recorder.count == 100
+    assert recorder.percentile(0) == 0.09
@@ -0,0 +1,70 @@
+import pytest
+
+from k360_jwt_auth.payload import build_payload
+
+# ------------------------
+# build_payload tests
+# ------------------------
+
+def test_build_payload_maps_top_level_fields():
+    payload = build_payload({
+        "order_id": "123",
+        "channel": "WEB",
+        "device_session_id": "abc123",
+        "user_ip": "127.0.0.1",
+        "account_id": "user123",
+    })
+
+    assert payload["merchantOrderId"] == "123"
+    assert payload["channel"] == "WEB"
+    assert payload["deviceSessionId"] == "abc123"
+    assert payload["userIp"] == "127.0.0.1"
+    assert payload["account"]["id"] == "user123"
+
+def test_build_payload_missing_order_id():
+    with pytest.raises(ValueError, match="Missing required field"):
+        build_payload({"channel": "WEB"})
+
+def test_build_payload_patch_allows_missing_order_id():
+    payload = build_payload({"transactions": [{"authorizationStatus": {"authResult": "APPROVED"}}]}, True)
+    assert payload["transactions"][0]["authorizationStatus"]["authResult"] == "APPROVED"
+
+def test_build_payload_stringifies_amounts():
+    payload = build_payload({
+        "order_id": "123",
+        "items": [{"price": 1000, "quantity": 2}],
+        "transactions": [{"subtotal": 6000, "order_total": 6150}],
+    })
+
+    assert payload["items"][0]["price"] == "1000"
+    assert payload["transactions"][0]["subtotal"] == "6000"
+    assert payload["transactions"][0]["orderTotal"] == "6150"
+
+def test_build_payload_prunes_empty_nested_objects():
+    payload = build_payload({
+        "order_id": "123",
+        "items": [{"price": "10", "color": None, "descriptors": []}],
+        "transactions": [{
+            "payment": {},
+            "authorizationStatus": {"authResult": None, "verificationResponse": {"cvvStatus": None}},
+            "items": [],
+        }],
+        "custom_fields": {},
+    })
+
+    assert "physicalAttributes" not in payload["items"][0]
+    assert "descriptors" not in payload["items"][0]
+    transaction = payload["transactions"][0]
+    assert "payment" not in transaction
+    assert "authorizationStatus" not in transaction
+    assert "items" not in transaction
+    assert "customFields" not in payload
+
+def test_build_payload_keeps_falsy_scalars():
+    payload = build_payload({
+        "order_id": "123",
+        "items": [{"price": "0", "is_digital": False, "quantity": 0}],
+    })
+
+    assert payload["items"][0]["isDigital"] is False
+    assert payload["items"][0]["quantity"] == 0
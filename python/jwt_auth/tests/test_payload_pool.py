@@ -0,0 +1,88 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from k360_jwt_auth.payload import build_payload
+from k360_jwt_auth.payload_pool import PayloadPool, encode_order, order_size
+
+ORDER = {
+    "order_id": "A1",
+    "items": [{"price": "10", "item_id": f"i{i}"} for i in range(5)],
+    "fulfillment": [{"type": "SHIPPED"}],
+    "transactions": [{"subtotal": "50", "payment": {"type": "CARD", "bin": "411111"}}],
+}
+RAW_ORDER = json.dumps(ORDER).encode("utf-8")
+
+# ------------------------
+# Sizing and encoding tests
+# ------------------------
+
+def test_order_size_counts_repeated_sections():
+    assert order_size(ORDER) == 7
+    assert order_size({"order_id": "A1", "items": "not a list"}) == 0
+
+def test_encode_order_matches_inline_build_and_compresses_large_bodies():
+    body, gzipped = encode_order(RAW_ORDER)
+    assert not gzipped
+    assert json.loads(body) == build_payload(ORDER)
+
+    body, gzipped = encode_order(RAW_ORDER, compress_min_bytes=1)
+    assert gzipped
+    assert json.loads(gzip.decompress(body)) == build_payload(ORDER)
+
+# ------------------------
+# PayloadPool tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_small_orders_stay_inline_and_large_orders_are_offloaded():
+    pool = PayloadPool(threshold=7, workers=1)
+    try:
+        small = {**ORDER, "items": ORDER["items"][:1]}
+        inline_body, _ = await pool.encode(small, json.dumps(small).encode("utf-8"))
+        offloaded_body, _ = await pool.encode(ORDER, RAW_ORDER)
+    finally:
+        await pool.stop()
+    assert json.loads(inline_body) == build_payload(small)
+    assert json.loads(offloaded_body) == build_payload(ORDER)
+    stats = pool.stats()
+    assert (stats["inline"], stats["offloaded"]) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_offloaded_validation_errors_reach_the_caller():
+    pool = PayloadPool(threshold=1, workers=1)
+    order = {key: value for key, value in ORDER.items() if key != "order_id"}
+    try:
+        with pytest.raises(ValueError):
+            await pool.encode(order, json.dumps(order).encode("utf-8"))
+    finally:
+        await pool.stop()
+
+@pytest.mark.asyncio
+async def test_disabled_pool_builds_everything_inline():
+    pool = PayloadPool(threshold=0)
+    body, gzipped = await pool.encode(ORDER, RAW_ORDER)
+    assert json.loads(body) == build_payload(ORDER) and not gzipped
+    assert pool.stats()["workers"] == 0
+
+@pytest.mark.asyncio
+async def test_start_and_stop_keep_the_event_loop_running():
+    pool = PayloadPool(threshold=1, workers=1)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker = asyncio.create_task(tick())
+    try:
+        await pool.start()
+        await pool.stop()
+    finally:
+        ticker.cancel()
+    assert ticks > 1
+    assert pool.stats()["workers"] == 1 and pool._executor is None
@@ -0,0 +1,101 @@
+import pstats
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from k360_jwt_auth import profiling
+from k360_jwt_auth.profiling import MemoryProfiler, RequestProfiler, SamplingProfiler, profiling_router
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def make_client():
+    app = FastAPI()
+    app.include_router(profiling_router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+# ------------------------
+# Guard tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_routes_are_hidden_without_a_configured_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", None)
+    async with make_client() as client:
+        response = await client.get("/internal/profile/requests", headers={"X-Profiling-Token": "anything"})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_routes_require_the_configured_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    async with make_client() as client:
+        assert (await client.get("/internal/profile/requests")).status_code == 403
+        assert (await client.get("/internal/profile/requests", headers={"X-Profiling-Token": "wrong"})).status_code == 403
+        response = await client.get("/internal/profile/requests", headers={"X-Profiling-Token": "secret"})
+    assert response.status_code == 200
+    assert "remaining" in response.json()
+
+@pytest.mark.asyncio
+async def test_cpu_profile_rejects_sampling_intervals_below_one_ms(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    async with make_client() as client:
+        for interval_ms in (0, -5):
+            response = await client.post("/internal/profile/cpu", params={"seconds": 1, "interval_ms": interval_ms},
+                                         headers={"X-Profiling-Token": "secret"})
+            assert response.status_code == 422
+
+# ------------------------
+# Profiler tests
+# ------------------------
+
+def test_cpu_profile_is_written_as_folded_stacks(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        result = SamplingProfiler().profile(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result["samples"] > 0
+    lines = open(result["file"], encoding="utf-8").read().splitlines()
+    assert any(line.startswith("busy;") and "busy_worker (test_profiling.py" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+@pytest.mark.asyncio
+async def test_request_profiler_profiles_every_nth_request(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    profiler = RequestProfiler()
+    calls = []
+
+    @profiler.profiled
+    async def handler(value):
+        calls.append(value)
+        return value * 2
+
+    assert await handler(1) == 2
+    profiler.arm(every=2, count=2)
+    for value in range(5):
+        await handler(value)
+
+    assert profiler.remaining == 0
+    assert profiler.last_file.startswith(str(tmp_path))
+    assert pstats.Stats(profiler.last_file).total_calls > 0
+    assert len(calls) == 6
+
+def test_memory_profiler_reports_growth_between_snapshots():
+    profiler = MemoryProfiler()
+    try:
+        assert profiler.snapshot()["started"] is True
+        retained = [bytearray(1024) for _ in range(1000)]
+        report = profiler.snapshot(top=5)
+        assert report["traced_bytes"] >= 1024 * 1000
+        assert any("test_profiling.py" in line for line in report["top"])
+        del retained
+    finally:
+        assert profiler.stop()["stopped"] is True
@@ -0,0 +1,59 @@
+import pytest
+from tenacity import RetryError, retry, retry_if_exception_type, stop_after_attempt
+
+from k360_jwt_auth.retry_budget import RetryBudget, stop_if_retry_budget_exhausted
+
+# ------------------------
+# RetryBudget tests
+# ------------------------
+
+def test_retry_budget_caps_retries_at_ratio():
+    budget = RetryBudget(ratio=0.25, min_per_second=0, max_tokens=100)
+    budget.tokens = 0
+    for _ in range(20):
+        budget.record_request()
+
+    allowed = sum(budget.try_spend() for _ in range(10))
+    assert allowed == 5
+    assert budget.counters["exhausted"] == 5
+
+def test_retry_budget_tokens_are_capped():
+    budget = RetryBudget(ratio=1, min_per_second=0, max_tokens=3)
+    for _ in range(10):
+        budget.record_request()
+    assert budget.tokens == 3
+
+def test_retry_budget_stop_condition_ends_retries():
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=1)
+    attempts = []
+
+    @retry(
+        retry=retry_if_exception_type(ConnectionError),
+        stop=stop_after_attempt(5) | stop_if_retry_budget_exhausted(budget),
+        before=budget.record_attempt,
+    )
+    def flaky():
+        attempts.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(RetryError):
+        flaky()
+
+    assert len(attempts) == 2
+    assert budget.counters == {"requests": 1, "retries": 1, "exhausted": 1}
+
+def test_retry_budget_not_spent_on_final_attempt():
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=5)
+
+    @retry(
+        retry=retry_if_exception_type(ConnectionError),
+        stop=stop_after_attempt(2) | stop_if_retry_budget_exhausted(budget),
+    )
+    def flaky():
+        raise ConnectionError("down")
+
+    with pytest.raises(RetryError):
+        flaky()
+
+    assert budget.counters["retries"] == 1
+    assert budget.tokens == pytest.approx(4)
@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from k360_jwt_auth import server_timing
+from k360_jwt_auth.tracing import NdjsonSpanExporter, Tracer
+
+tracer = Tracer(0.0, NdjsonSpanExporter("unused.ndjson"))
+
+@server_timing.timed
+async def handler(fail_attempts=0, reject=False):
+    with tracer.span("parse"):
+        pass
+    for _ in range(fail_attempts + 1):
+        with tracer.span("kount.attempt"):
+            pass
+    with tracer.span("kount.http"):
+        pass
+    if reject:
+        raise HTTPException(status_code=400, detail="bad signature")
+    with tracer.span("render"):
+        return JSONResponse({"ok": True})
+
+def metric_names(header):
+    return [part.split(";")[0] for part in header.split(", ")]
+
+# ------------------------
+# Server-Timing tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_header_breaks_out_stages_and_attempts_without_sampling(monkeypatch):
+    monkeypatch.setattr(server_timing, "SERVER_TIMING_ENABLED", True)
+    response = await handler(fail_attempts=1)
+    header = response.headers["Server-Timing"]
+    assert metric_names(header) == ["parse", "upstream", "upstream", "serialize", "total"]
+    assert 'upstream;desc="attempt 2";dur=' in header
+
+@pytest.mark.asyncio
+async def test_header_is_added_to_http_exceptions(monkeypatch):
+    monkeypatch.setattr(server_timing, "SERVER_TIMING_ENABLED", True)
+    with pytest.raises(HTTPException) as exc_info:
+        await handler(reject=True)
+    assert metric_names(exc_info.value.headers["Server-Timing"]) == ["parse", "upstream", "total"]
+
+@pytest.mark.asyncio
+async def test_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(server_timing, "SERVER_TIMING_ENABLED", False)
+    monkeypatch.setattr(server_timing, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    response = await handler()
+    assert "Server-Timing" not in response.headers
+    assert server_timing.current() is None
+
+@pytest.mark.asyncio
+async def test_sampled_access_log_carries_the_breakdown(monkeypatch, caplog):
+    monkeypatch.setattr(server_timing, "SERVER_TIMING_ENABLED", False)
+    monkeypatch.setattr(server_timing, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    with caplog.at_level(logging.INFO, logger="k360_jwt_auth.access"):
+        response = await handler()
+    assert "Server-Timing" not in response.headers
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["handler"] == "handler"
+    assert line["status"] == 200
+    assert [stage["name"] for stage in line["stages"]] == ["parse", "upstream", "serialize"]
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from k360_jwt_auth.exceptions import TransportStatusError
+from k360_jwt_auth.sync_client import SyncKountClient
+
+from .stand_ins import ORDER, kount_orders_routes, long_lived_token, start_stand_in
+
+class StandIn:
+    """Kount Orders API stand-in running on its own event loop thread."""
+    def __init__(self, failures=0):
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.runner, self.base_url = asyncio.run_coroutine_threadsafe(
+            start_stand_in(kount_orders_routes(self.requests, failures)), self.loop).result()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+# ------------------------
+# SyncKountClient tests
+# ------------------------
+
+def test_risk_inquiry_and_patch_block_until_kount_responds(long_lived_token):
+    stand_in = StandIn()
+    client = SyncKountClient(stand_in.base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5)
+    try:
+        result = client.risk_inquiry(ORDER)
+        assert result["order"]["riskInquiry"]["decision"] == "APPROVE"
+        assert client.patch_order("K1", {"transactions": []}) == {"order": {"orderId": "K1"}}
+
+        method, path, payload = stand_in.requests[0]
+        assert (method, path) == ("POST", "/commerce/v2/orders?riskInquiry=true")
+        assert payload["merchantOrderId"] == "A1"
+        assert stand_in.requests[1][:2] == ("PATCH", "/commerce/v2/orders/K1")
+    finally:
+        client.close()
+        stand_in.close()
+
+def test_concurrent_callers_share_one_loop(long_lived_token):
+    stand_in = StandIn()
+    client = SyncKountClient(stand_in.base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: client.risk_inquiry(ORDER), range(32)))
+        assert len(results) == 32
+        assert len(stand_in.requests) == 32
+    finally:
+        client.close()
+        stand_in.close()
+
+def test_retryable_errors_are_retried_and_others_raised(long_lived_token):
+    stand_in = StandIn(failures=1)
+    client = SyncKountClient(stand_in.base_url + "/commerce/v2/orders?riskInquiry=true", timeout=5, max_backoff=0.01)
+    try:
+        assert client.risk_inquiry(ORDER)["order"]["orderId"] == "K1"
+        assert len(stand_in.requests) == 2
+
+        client.endpoint.url = stand_in.base_url + "/invalid"
+        with pytest.raises(TransportStatusError) as exc_info:
+            client.risk_inquiry(ORDER)
+        assert exc_info.value.status == 400
+    finally:
+        client.close()
+        stand_in.close()
+
+def test_closed_client_rejects_calls(long_lived_token):
+    stand_in = StandIn()
+    client = SyncKountClient(stand_in.base_url + "/commerce/v2/orders", timeout=5)
+    client.close()
+    client.close()
+    stand_in.close()
+    with pytest.raises(RuntimeError):
+        client.risk_inquiry(ORDER)
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+from tenacity import retry, stop_after_attempt, wait_fixed
+
+from k360_jwt_auth.tracing import NdjsonSpanExporter, Tracer, parse_traceparent
+
+def make_tracer(tmp_path, sample_rate=1.0):
+    return Tracer(sample_rate, NdjsonSpanExporter(str(tmp_path / "spans.ndjson"), flush_interval=60))
+
+def read_spans(tmp_path):
+    with open(tmp_path / "spans.ndjson", encoding="utf-8") as handle:
+        return {span["name"]: span for span in map(json.loads, handle)}
+
+# ------------------------
+# Tracer tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_child_spans_and_spawned_tasks_join_the_request_trace(tmp_path):
+    tracer = make_tracer(tmp_path)
+
+    async def follow_up():
+        with tracer.span("patch"):
+            await asyncio.sleep(0)
+
+    with tracer.span("request") as root:
+        with tracer.span("build_payload"):
+            pass
+        task = asyncio.create_task(follow_up())
+    await task
+    await tracer.exporter.flush()
+
+    spans = read_spans(tmp_path)
+    assert spans["build_payload"]["parentSpanId"] == root.span_id
+    assert spans["patch"]["parentSpanId"] == root.span_id
+    assert {span["traceId"] for span in spans.values()} == {root.trace_id}
+    assert spans["request"]["parentSpanId"] is None
+    assert spans["request"]["endTimeUnixNano"] >= spans["request"]["startTimeUnixNano"]
+
+@pytest.mark.asyncio
+async def test_retry_attempts_get_their_own_spans_and_backoff_events(tmp_path):
+    tracer = make_tracer(tmp_path)
+    attempts = []
+
+    @retry(stop=stop_after_attempt(3), wait=wait_fixed(0), before_sleep=tracer.record_retry)
+    @tracer.traced("attempt")
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError("try again")
+        return "ok"
+
+    with tracer.span("call"):
+        assert await flaky() == "ok"
+    await tracer.exporter.flush()
+
+    with open(tmp_path / "spans.ndjson", encoding="utf-8") as handle:
+        spans = [json.loads(line) for line in handle]
+    attempt_spans = [span for span in spans if span["name"] == "attempt"]
+    call = next(span for span in spans if span["name"] == "call")
+    assert [span["status"]["code"] for span in attempt_spans] == ["ERROR", "ERROR", "OK"]
+    assert [event["attributes"]["attempt"] for event in call["events"]] == [1, 2]
+
+def test_unsampled_traces_record_nothing(tmp_path):
+    tracer = make_tracer(tmp_path, sample_rate=0.0)
+    with tracer.span("request", traceparent="00-" + "a" * 32 + "-" + "b" * 16 + "-01") as span:
+        span.set_attribute("ignored", True)
+        with tracer.span("child") as child:
+            assert not child.sampled
+    assert not span.sampled
+    assert tracer.exporter.stats()["buffered"] == 0
+
+def test_trusted_traceparent_decides_sampling(tmp_path):
+    tracer = Tracer(0.01, NdjsonSpanExporter(str(tmp_path / "spans.ndjson"), flush_interval=60), trust_parent=True)
+    with tracer.span("request", traceparent="00-" + "a" * 32 + "-" + "b" * 16 + "-01") as span:
+        assert span.trace_id == "a" * 32
+        assert span.parent_span_id == "b" * 16
+    with tracer.span("request", traceparent="00-" + "a" * 32 + "-" + "b" * 16 + "-00") as span:
+        assert not span.sampled
+
+def test_untrusted_traceparent_is_capped_by_sample_rate(tmp_path, monkeypatch):
+    tracer = make_tracer(tmp_path, sample_rate=0.1)
+    traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    monkeypatch.setattr("k360_jwt_auth.tracing.random.random", lambda: 0.5)
+    with tracer.span("request", traceparent=traceparent) as span:
+        assert not span.sampled
+    monkeypatch.setattr("k360_jwt_auth.tracing.random.random", lambda: 0.05)
+    with tracer.span("request", traceparent=traceparent) as span:
+        assert span.sampled and span.trace_id == "a" * 32
+    assert tracer.stats()["traces_unsampled"] == 1
+
+def test_parse_traceparent_rejects_malformed_headers():
+    assert parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-01") == ("a" * 32, "b" * 16, True)
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent("00-" + "z" * 32 + "-" + "b" * 16 + "-01") is None
+
+def test_full_buffer_drops_spans(tmp_path):
+    tracer = Tracer(1.0, NdjsonSpanExporter(str(tmp_path / "spans.ndjson"), buffer_size=2))
+    for _ in range(3):
+        with tracer.span("request"):
+            pass
+    assert tracer.exporter.stats()["dropped"] == 1
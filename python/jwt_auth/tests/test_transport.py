@@ -0,0 +1,76 @@
+import pytest
+from aiohttp import web
+
+from k360_jwt_auth.exceptions import TransportConnectError, TransportStatusError
+from k360_jwt_auth.transport import TRANSPORTS, create_transport
+
+from .stand_ins import start_stand_in
+
+async def start_echo_stand_in():
+    """Starts a local stand-in that echoes the request body, or returns 503 for /unavailable."""
+    async def echo(request):
+        return web.Response(body=await request.read(), headers={"Retry-After": "2"})
+
+    async def unavailable(request):
+        return web.Response(status=503, reason="Service Unavailable")
+
+    return await start_stand_in([("POST", "/echo", echo), ("POST", "/unavailable", unavailable)])
+
+# ------------------------
+# Transport tests
+# ------------------------
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", TRANSPORTS)
+async def test_transport_reads_response(name):
+    if name == "httpx-h2":
+        pytest.importorskip("h2")
+    runner, base_url = await start_echo_stand_in()
+    transport = create_transport(name, max_connections=4, timeout=5)
+    try:
+        response = await transport.request("POST", base_url + "/echo", b'{"a":1}', {"Content-Type": "application/json"})
+        assert response.status == 200
+        assert response.json() == {"a": 1}
+        assert response.headers.get("retry-after") == "2"
+        assert transport.stats()["transport"] == name
+
+        response = await transport.request("POST", base_url + "/unavailable", b"")
+        with pytest.raises(TransportStatusError) as error:
+            response.raise_for_status()
+        assert error.value.status == 503
+    finally:
+        await transport.close()
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", TRANSPORTS)
+async def test_transport_connect_error(name):
+    if name == "httpx-h2":
+        pytest.importorskip("h2")
+    runner, base_url = await start_echo_stand_in()
+    await runner.cleanup()  # nothing listens on the port any more
+    transport = create_transport(name, max_connections=4, timeout=5)
+    try:
+        with pytest.raises(TransportConnectError):
+            await transport.request("POST", base_url + "/echo", b"")
+    finally:
+        await transport.close()
+
+def test_create_transport_rejects_unknown_name():
+    with pytest.raises(ValueError, match="Unknown transport"):
+        create_transport("carrier-pigeon", max_connections=1)
+
+@pytest.mark.asyncio
+async def test_stats_degrade_when_pool_internals_change():
+    runner, base_url = await start_echo_stand_in()
+    transport = create_transport("aiohttp", max_connections=4, timeout=5)
+    try:
+        await transport.request("POST", base_url + "/echo", b"")
+        assert transport.stats()["idle_connections"] == 1
+        transport._session.connector._conns = None
+        assert transport.stats() == {"transport": "aiohttp", "max_connections": 4,
+                                     "idle_connections": None, "active_connections": 0}
+    finally:
+        transport._session.connector._conns = {}
+        await transport.close()
+        await runner.cleanup()
@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+from tenacity import RetryCallState, Retrying
+
+from k360_jwt_auth.tuning import (
+    PerformanceConfig,
+    PerformanceSettings,
+    stop_after_configured_attempts,
+    wait_configured_backoff,
+)
+
+# ------------------------
+# PerformanceSettings tests
+# ------------------------
+
+def test_from_env_reads_kount_variables(monkeypatch):
+    monkeypatch.setenv("KOUNT_MAX_ATTEMPTS", "5")
+    monkeypatch.setenv("KOUNT_RETRYABLE_STATUSES", "429, 503")
+    monkeypatch.setenv("KOUNT_API_ENDPOINTS", "https://a.example/orders,https://b.example/orders")
+    settings = PerformanceSettings.from_env()
+    assert settings.max_attempts == 5
+    assert settings.retryable_statuses == frozenset({429, 503})
+    assert settings.api_endpoints == ("https://a.example/orders", "https://b.example/orders")
+
+def test_replace_converts_json_values_and_rejects_bad_ones():
+    settings = PerformanceSettings().replace({"request_timeout": 20, "retryable_statuses": [408]})
+    assert settings.request_timeout == 20.0 and settings.retryable_statuses == frozenset({408})
+    for overrides in ({"max_attempts": True}, {"max_attempts": 1.5}, {"unknown": 1},
+                      {"limit_min": 10, "limit_max": 5}, {"trace_sample_rate": 2}):
+        with pytest.raises(ValueError):
+            PerformanceSettings().replace(overrides)
+
+# ------------------------
+# PerformanceConfig tests
+# ------------------------
+
+def test_update_swaps_the_snapshot_and_notifies_listeners():
+    config = PerformanceConfig(path=None, base=PerformanceSettings())
+    applied = []
+    config.subscribe(applied.append)
+    before = config.current
+    assert config.update({"limit_max": 50, "max_backoff": 1}) == {"limit_max": 50, "max_backoff": 1.0}
+    assert before.limit_max == 200
+    assert applied == [config.current]
+    with pytest.raises(ValueError):
+        config.update({"limit_max": 0})
+    assert config.current.limit_max == 50
+
+def test_file_is_reloaded_on_change_and_bad_files_are_ignored(tmp_path):
+    path = tmp_path / "tuning.json"
+    path.write_text(json.dumps({"max_attempts": 2}))
+    config = PerformanceConfig(path=str(path), base=PerformanceSettings())
+    assert config.current.max_attempts == 3
+    config.load()
+    assert config.current.max_attempts == 2
+    assert not config.reload_if_changed()
+
+    path.write_text(json.dumps({"max_attempts": 4, "request_timeout": 5}))
+    os.utime(path, ns=(1, 1))
+    assert config.reload_if_changed()
+    assert (config.current.max_attempts, config.current.request_timeout) == (4, 5.0)
+
+    path.write_text(json.dumps({"max_attempts": 0}))
+    os.utime(path, ns=(2, 2))
+    assert not config.reload_if_changed()
+    assert config.current.max_attempts == 4
+    assert config.stats()["errors"] == 1
+
+def test_bad_file_is_not_read_until_loaded(tmp_path):
+    path = tmp_path / "tuning.json"
+    path.write_text("{not json")
+    config = PerformanceConfig(path=str(path), base=PerformanceSettings())
+    assert config.current == PerformanceSettings()
+    with pytest.raises(ValueError):
+        config.load()
+
+def test_failed_listener_restores_the_previous_settings_everywhere():
+    config = PerformanceConfig(path=None, base=PerformanceSettings())
+    applied = []
+    config.subscribe(lambda settings: applied.append(settings.limit_max))
+
+    def reject_small_limits(settings):
+        if settings.limit_max < 10:
+            raise RuntimeError("limit too small for this object")
+    config.subscribe(reject_small_limits)
+
+    with pytest.raises(ValueError, match="previous settings restored"):
+        config.update({"limit_max": 5})
+    assert config.current.limit_max == 200
+    assert applied == [5, 200]
+    assert config.stats()["errors"] == 1
+
+def test_endpoint_urls_are_validated_before_any_listener_runs():
+    config = PerformanceConfig(path=None, base=PerformanceSettings())
+    applied = []
+    config.subscribe(applied.append)
+    with pytest.raises(ValueError, match="not an http"):
+        config.update({"api_endpoints": "https://a.example/orders,a.example/orders"})
+    assert applied == []
+
+# ------------------------
+# Tenacity strategy tests
+# ------------------------
+
+def test_retry_strategies_follow_the_current_settings():
+    config = PerformanceConfig(path=None, base=PerformanceSettings(max_backoff=0.01))
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise OSError("down")
+
+    retrying = Retrying(stop=stop_after_configured_attempts(config), wait=wait_configured_backoff(config),
+                        reraise=True)
+    with pytest.raises(OSError):
+        retrying(fail)
+    assert len(calls) == 3
+
+    config.update({"max_attempts": 1})
+    calls.clear()
+    with pytest.raises(OSError):
+        retrying(fail)
+    assert len(calls) == 1
+
+    state = RetryCallState(retrying, fail, (), {})
+    state.attempt_number = 10
+    assert 0 <= wait_configured_backoff(config)(state) <= 0.01
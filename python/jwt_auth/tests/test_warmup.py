@@ -0,0 +1,125 @@
+import asyncio
+import socket
+
+import pytest
+from aiohttp import web
+
+from k360_jwt_auth.transport import create_transport
+from k360_jwt_auth.warmup import CachingResolver, ConnectionWarmer
+
+from .stand_ins import start_stand_in
+
+class FakeResolver:
+    """Stands in for aiohttp's DefaultResolver, counting lookups and failing on demand."""
+    def __init__(self):
+        self.lookups = 0
+        self.fail = False
+
+    async def resolve(self, host, port, family):
+        self.lookups += 1
+        if self.fail:
+            raise OSError("resolver down")
+        return [{"hostname": host, "host": f"10.0.0.{self.lookups}", "port": port,
+                 "family": socket.AF_INET, "proto": 0, "flags": 0}]
+
+    async def close(self):
+        pass
+
+def make_resolver(ttl):
+    resolver = CachingResolver(ttl=ttl)
+    fake = FakeResolver()
+    resolver._get_resolver = lambda: fake
+    return resolver, fake
+
+async def start_peer_stand_in():
+    """Starts a local stand-in that records the client port of every request."""
+    peers = set()
+
+    async def root(request):
+        peers.add(request.transport.get_extra_info("peername")[1])
+        return web.Response(text="ok")
+
+    runner, base_url = await start_stand_in([("GET", "/", root)])
+    return runner, base_url + "/", peers
+
+# ------------------------
+# CachingResolver tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_preresolved_host_is_served_from_cache():
+    resolver, fake = make_resolver(ttl=60)
+    assert await resolver.preresolve(["https://api.example.com/commerce/v2/orders", "https://api.example.com/"]) == 1
+    addresses = await resolver.resolve("api.example.com", 443)
+    assert addresses[0]["host"] == "10.0.0.1"
+    assert fake.lookups == 1
+    assert resolver.stats()["hits"] == 1
+    assert resolver.stats()["misses"] == 0
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_served_stale_and_refreshed():
+    resolver, fake = make_resolver(ttl=0)
+    await resolver.resolve("api.example.com", 443)
+    addresses = await resolver.resolve("api.example.com", 443)
+    assert addresses[0]["host"] == "10.0.0.1"
+    await asyncio.sleep(0)
+    assert fake.lookups == 2
+    assert (await resolver.resolve("api.example.com", 443))[0]["host"] == "10.0.0.2"
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_addresses():
+    resolver, fake = make_resolver(ttl=0)
+    await resolver.resolve("api.example.com", 443)
+    fake.fail = True
+    await resolver.resolve("api.example.com", 443)
+    await asyncio.sleep(0)
+    assert (await resolver.resolve("api.example.com", 443))[0]["host"] == "10.0.0.1"
+    assert resolver.stats()["refresh_failures"] >= 1
+
+# ------------------------
+# ConnectionWarmer tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_warmer_opens_pooled_connections_before_traffic():
+    runner, url, peers = await start_peer_stand_in()
+    transport = create_transport("aiohttp", max_connections=10, timeout=5)
+    warmer = ConnectionWarmer(transport, [url], connections=3, keepalive_interval=0)
+    try:
+        await warmer.start()
+        assert len(peers) == 3
+        assert transport.stats()["idle_connections"] == 3
+        assert warmer.stats()["ok"] == 3
+
+        await transport.request("GET", url)
+        assert len(peers) == 3
+    finally:
+        await warmer.stop()
+        await transport.close()
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_warmer_counts_unreachable_hosts_without_raising():
+    transport = create_transport("aiohttp", max_connections=2, timeout=2)
+    warmer = ConnectionWarmer(transport, ["http://127.0.0.1:1/"], connections=2, keepalive_interval=0)
+    try:
+        await warmer.start()
+        assert warmer.stats()["failed"] == 2
+    finally:
+        await transport.close()
+
+@pytest.mark.asyncio
+async def test_warmer_gives_up_on_unresponsive_host_after_its_own_timeout():
+    async def never_answer(reader, writer):
+        await asyncio.sleep(10)
+
+    server = await asyncio.start_server(never_answer, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+    transport = create_transport("aiohttp", max_connections=2, timeout=300)
+    warmer = ConnectionWarmer(transport, [url], connections=2, keepalive_interval=0, timeout=0.1)
+    try:
+        await asyncio.wait_for(warmer.start(), timeout=2)
+        assert warmer.stats()["failed"] == 2
+    finally:
+        await transport.close()
+        server.close()
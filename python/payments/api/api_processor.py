@@ -1,5 +1,6 @@
 #USAGE:
 #pip3 install fastapi uvicorn aiohttp pyjwt tenacity "fastapi[standard]""
+#pip3 install "httpx[http2]"  // only for KOUNT_TRANSPORT=httpx-h2
 #uvicorn api_processor:app --reload  // start the server
 #test endpoint: 
 '''
@@ -160,33 +161,124 @@ curl --request POST \
 }'
 '''
 import os
+import gzip
 import logging
 import json
 import random
+import time
 import asyncio
-import aiohttp
+import msgspec
+
+from contextlib import asynccontextmanager
+from typing import Any, Optional
 
 from k360_jwt_auth import token_manager
 from k360_jwt_auth import token_lifespan
-
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from k360_jwt_auth import build_payload
+from k360_jwt_auth import PayloadPool
+from k360_jwt_auth import AdaptiveConcurrencyLimiter
+from k360_jwt_auth import require_stats_token
+from k360_jwt_auth import FairScheduler, Lane, parse_tenant_settings
+from k360_jwt_auth import retry_budget
+from k360_jwt_auth import stop_if_retry_budget_exhausted
+from k360_jwt_auth import LocalRulesEngine
+from k360_jwt_auth import EndpointPool
+from k360_jwt_auth import create_transport
+from k360_jwt_auth import ConnectionWarmer, dns_cache
+from k360_jwt_auth import loop_monitor
+from k360_jwt_auth import tracer
+from k360_jwt_auth import server_timing
+from k360_jwt_auth import traffic_capture
+from k360_jwt_auth import PROFILING_TOKEN, profiling_router, request_profiler
+from k360_jwt_auth import ADMIN_TOKEN, performance_config, tuning_router
+from k360_jwt_auth import stop_after_configured_attempts, wait_configured_backoff
+from k360_jwt_auth import TransportConnectError, TransportError, TransportStatusError
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 
 from tenacity import retry
 from tenacity import retry_if_exception
-from tenacity import stop_after_attempt
-from tenacity import wait_random_exponential
 from tenacity import RetryError
 
 # Constants
 KOUNT_API_ENDPOINT = "https://api-sandbox.kount.com/commerce/v2/orders?riskInquiry=true"
 #Use this end point to create a timeout for testing
 #KOUNT_API_ENDPOINT = "https://10.255.255.1"  # Non-routable IP (will hang)
+
+# Timeouts, the retry policy, pool sizes, concurrency limits, the DNS cache TTL and log sampling
+# rates are read by k360_jwt_auth.tuning from the same KOUNT_* variables (plus KOUNT_TUNING_FILE)
+# and can be changed at runtime: the file is watched, and with KOUNT_ADMIN_TOKEN set they can be
+# changed through /internal/tuning. The constants below taken from it are the environment values;
+# the tuning file is first read in the lifespan, and apply_performance_settings() pushes it and later
+# changes into the objects built from them.
+PERFORMANCE_SETTINGS = performance_config.current
+
+# Equivalent risk inquiry endpoints (regions or proxies), comma-separated. Requests go to the
+# healthiest, lowest-latency one and fail over when an endpoint cannot be reached.
+KOUNT_API_ENDPOINTS = list(PERFORMANCE_SETTINGS.api_endpoints)
+KOUNT_ENDPOINT_PROBE_INTERVAL = float(os.getenv("KOUNT_ENDPOINT_PROBE_INTERVAL", "10"))
+KOUNT_ENDPOINT_PROBE_PATH = os.getenv("KOUNT_ENDPOINT_PROBE_PATH", "/")
+KOUNT_ENDPOINT_EJECTION_SECONDS = PERFORMANCE_SETTINGS.endpoint_ejection_seconds
+
+# Pooled transport for Kount API calls: "aiohttp" (HTTP/1.1) or "httpx-h2" (HTTP/2, needs httpx[http2])
+KOUNT_TRANSPORT = os.getenv("KOUNT_TRANSPORT", "aiohttp")
+KOUNT_TRANSPORT_MAX_CONNECTIONS = PERFORMANCE_SETTINGS.transport_max_connections
+KOUNT_REQUEST_TIMEOUT = PERFORMANCE_SETTINGS.request_timeout  # 300 by default, aiohttp's default total timeout
+KOUNT_CA_FILE = os.getenv("KOUNT_CA_FILE")  # Optional CA bundle, e.g. for a TLS-intercepting proxy
+
+# Connections opened to each Kount endpoint before startup completes, and how often they are
+# touched to stay open (aiohttp closes idle pooled connections after 15 seconds)
+KOUNT_WARM_CONNECTIONS = int(os.getenv("KOUNT_WARM_CONNECTIONS", "4"))
+KOUNT_KEEPALIVE_INTERVAL = float(os.getenv("KOUNT_KEEPALIVE_INTERVAL", "10"))
 # Define possible values for cvvStatus and avsStatus
 CVV_STATUSES = ["MATCH", "NO_MATCH", "NOT_PROVIDED"]
 AVS_STATUSES = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", \
     "N", "O", "P", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"]
 
+# Adaptive concurrency limit shared by every outbound Kount API call
+KOUNT_LIMIT_INITIAL = int(os.getenv("KOUNT_LIMIT_INITIAL", "20"))
+KOUNT_LIMIT_MIN = PERFORMANCE_SETTINGS.limit_min
+KOUNT_LIMIT_MAX = PERFORMANCE_SETTINGS.limit_max
+KOUNT_LIMIT_LATENCY_TOLERANCE = PERFORMANCE_SETTINGS.limit_latency_tolerance
+# A Retry-After on a 429/503 pauses every call for at most this many seconds, and a call waits at most
+# KOUNT_LIMITER_ACQUIRE_TIMEOUT seconds for a slot before it fails open with the local decision
+KOUNT_MAX_RETRY_AFTER = PERFORMANCE_SETTINGS.max_retry_after
+KOUNT_LIMITER_ACQUIRE_TIMEOUT = PERFORMANCE_SETTINGS.limiter_acquire_timeout
+
+# Fair queuing of Kount calls per tenant (merchant) when the limit above is reached. The tenant
+# comes from this request header; requests without it share the "default" tenant. Weights and caps
+# are "tenant=value" lists; the default cap of 0 means a tenant may use the whole limit.
+KOUNT_TENANT_HEADER = os.getenv("KOUNT_TENANT_HEADER", "X-Merchant-Id")
+KOUNT_TENANT_WEIGHTS = parse_tenant_settings(os.getenv("KOUNT_TENANT_WEIGHTS"), float)
+KOUNT_TENANT_MAX_CONCURRENCY = PERFORMANCE_SETTINGS.tenant_max_concurrency
+KOUNT_TENANT_LIMITS = parse_tenant_settings(os.getenv("KOUNT_TENANT_LIMITS"), int)
+
+# Priority lanes: pre-auth inquiries ("interactive") are admitted ahead of post-auth inquiries and
+# authorization PATCHes ("background"), which always keep this many calls in flight and otherwise
+# use at most this share of the limit
+KOUNT_BACKGROUND_RESERVED = PERFORMANCE_SETTINGS.background_reserved
+KOUNT_BACKGROUND_MAX_SHARE = PERFORMANCE_SETTINGS.background_max_share
+
+# Optional gzip request-body compression for large orders (off unless enabled)
+KOUNT_GZIP_REQUESTS = os.getenv("KOUNT_GZIP_REQUESTS", "false").lower() == "true"
+KOUNT_GZIP_MIN_BYTES = int(os.getenv("KOUNT_GZIP_MIN_BYTES", "16384"))
+
+# How /process-transaction returns Kount's response to the caller:
+#   full        - decode and re-encode the whole response (default)
+#   passthrough - return Kount's response bytes unchanged
+#   projection  - return only the decision, order IDs and reason code
+KOUNT_RESPONSE_MODES = {"full", "passthrough", "projection"}
+KOUNT_RESPONSE_MODE = os.getenv("KOUNT_RESPONSE_MODE", "full").lower()
+
+if KOUNT_RESPONSE_MODE not in KOUNT_RESPONSE_MODES:
+    raise ValueError(f"KOUNT_RESPONSE_MODE must be one of {sorted(KOUNT_RESPONSE_MODES)}.")
+
+# Local decision rules used when Kount cannot be reached (see k360_jwt_auth.local_rules);
+# without a rules file every fail-open decision is APPROVE
+KOUNT_LOCAL_RULES_FILE = os.getenv("KOUNT_LOCAL_RULES_FILE")
+KOUNT_LOCAL_RULES_RELOAD_INTERVAL = float(os.getenv("KOUNT_LOCAL_RULES_RELOAD_INTERVAL", "5"))
+
 # Credentials (use environment variables or secure vault in production)
 API_KEY = os.getenv("KOUNT_API_KEY")
 
@@ -203,271 +295,480 @@ logging.basicConfig(
     ]
 )
 
-def build_payload(incoming_data: dict, patch = False) -> dict:
-    """
-    Map incoming website data to the Kount API's required payload format.
-
-    Args:
-        incoming_data (dict): The raw data from the website.
-
-    Returns:
-        dict: A payload formatted for the Kount API.
-
-    Raises:
-        ValueError: If the required field `merchantOrderId` is missing.
-    """
-    merchant_order_id = incoming_data.get("order_id")
-    if not merchant_order_id and not patch:
-        raise ValueError("Missing required field: merchantOrderId")
-
-    payload = {
-        "merchantOrderId": merchant_order_id,
-        "channel": incoming_data.get("channel"),
-        "deviceSessionId": incoming_data.get("device_session_id"),
-        "creationDateTime": incoming_data.get("creation_datetime"),
-        "userIp": incoming_data.get("user_ip"),
-        "account": {
-            "id": incoming_data.get("account_id"),
-            "type": incoming_data.get("account_type"),
-            "creationDateTime": incoming_data.get("account_creation_datetime"),
-            "username": incoming_data.get("username"),
-            "accountIsActive": incoming_data.get("account_is_active"),
-        } if isinstance(incoming_data.get("account_id"), (str, int)) else None,
-        "items": [
-            {
-                "price": str(item.get("price", "0")),
-                "description": item.get("description"),
-                "name": item.get("name"),
-                "quantity": item.get("quantity", 1),
-                "category": item.get("category"),
-                "subCategory": item.get("sub_category"),
-                "isDigital": item.get("is_digital"),
-                "sku": item.get("sku"),
-                "upc": item.get("upc"),
-                "brand": item.get("brand"),
-                "url": item.get("url"),
-                "imageUrl": item.get("image_url"),
-                "physicalAttributes": {
-                    "color": item.get("color"),
-                    "size": item.get("size"),
-                    "weight": item.get("weight"),
-                    "height": item.get("height"),
-                    "width": item.get("width"),
-                    "depth": item.get("depth"),
-                } if isinstance(item, dict) and any(item.get(k) is not None for k in ["color", "size", "weight", "height", "width", "depth"]) else None,
-                "descriptors": item.get("descriptors"),
-                "id": item.get("item_id"),
-                "isService": item.get("is_service"),
-            }
-            for item in incoming_data.get("items", []) if isinstance(item, dict)
-        ] if "items" in incoming_data else None,
-                "fulfillment": [
-            {
-                "type": fulfillment["type"],
-                "shipping": {
-                    "amount": str(fulfillment.get("shipping", {}).get("amount", "0")),
-                    "provider": fulfillment.get("shipping", {}).get("provider"),
-                    "trackingNumber": fulfillment.get("shipping", {}).get("tracking_number"),
-                    "method": fulfillment.get("shipping", {}).get("method"),
-                },
-                "recipientPerson": {
-                    "name": {
-                        "first": fulfillment["recipient"]["first"],
-                        "family": fulfillment["recipient"]["family"],
-                    },
-                    "phoneNumber": fulfillment["recipient"].get("phone_number"),
-                    "emailAddress": fulfillment["recipient"].get("email_address"),
-                    "address": fulfillment["recipient"].get("address"),
-                } if "recipient" in fulfillment else None,
-                "merchantFulfillmentId": fulfillment.get("merchant_fulfillment_id"),
-                "digitalDownloaded": fulfillment.get("digital_downloaded"),
-            }
-            for fulfillment in incoming_data.get("fulfillment", [])
-        ] if "fulfillment" in incoming_data else None,
-        "transactions": [
-            {
-                "processor": transaction.get("processor"),
-                "processorMerchantId": transaction.get("processor_merchant_id"),
-                "payment": {
-                    "type": transaction.get("payment", {}).get("type"),
-                    "paymentToken": transaction.get("payment", {}).get("payment_token"),
-                    "bin": transaction.get("payment", {}).get("bin"),
-                    "last4": transaction.get("payment", {}).get("last4"),
-                },
-                "subtotal": str(transaction.get("subtotal", "0")),
-                "orderTotal": str(transaction.get("order_total", "0")),
-                "currency": transaction.get("currency"),
-                "tax": {
-                    "isTaxable": transaction.get("tax", {}).get("is_taxable"),
-                    "taxableCountryCode": transaction.get("tax", {}).get("taxable_country_code"),
-                    "taxAmount": str(transaction.get("tax", {}).get("tax_amount", "0")),
-                    "outOfStateTaxAmount": str(transaction.get("tax", {}).get("out_of_state_tax_amount", "0")),
-                },
-                "billedPerson": {
-                    "name": {
-                        "first": transaction.get("billingPerson", {}).get("name", {}).get("first"),
-                        "preferred": transaction.get("billingPerson", {}).get("name", {}).get("preferred"),
-                        "family": transaction.get("billingPerson", {}).get("name", {}).get("family"),
-                        "middle": transaction.get("billingPerson", {}).get("name", {}).get("middle"),
-                        "prefix": transaction.get("billingPerson", {}).get("name", {}).get("prefix"),
-                        "suffix": transaction.get("billingPerson", {}).get("name", {}).get("suffix"),
-                    } if isinstance(transaction.get("billingPerson", {}).get("name"), dict) else None,
-                    "phoneNumber": transaction.get("billingPerson", {}).get("phone"),
-                    "emailAddress": transaction.get("billingPerson", {}).get("email"),
-                    "address": transaction.get("billingPerson", {}).get("address") if isinstance(transaction.get("billingPerson", {}).get("address"), dict) else None,
-                } if isinstance(transaction.get("billingPerson"), dict) else None,
-                "transactionStatus": transaction.get("transaction_status"),
-                "authorizationStatus":{
-                    "authResult": transaction.get("authorizationStatus", {}).get("authResult"),
-                    "dateTime": transaction.get("authorizationStatus", {}).get("dateTime"),
-                    "verificationResponse": {
-                        "cvvStatus": transaction.get("authorizationStatus", {}).get("verificationResponse", {}).get("cvvStatus"),
-                        "avsStatus": transaction.get("authorizationStatus", {}).get("verificationResponse", {}).get("avsStatus"),
-                    } if isinstance(transaction.get("authorizationStatus", {}).get("verificationResponse"), dict) else None,
-                } if isinstance(transaction.get("authorizationStatus"), dict) else None,
-                "merchantTransactionId": transaction.get("merchant_transaction_id"),
-                "items": [
-                    {
-                        "id": item.get("id"),
-                        "quantity": item.get("quantity", 1),
-                    }
-                    for item in transaction.get("items", []) if isinstance(item, dict)
-                ],
-            }
-            for transaction in incoming_data.get("transactions", []) if isinstance(transaction, dict)
-        ] if "transactions" in incoming_data else None,
-        "customFields": incoming_data.get("custom_fields"),
-    }
-
-    # Remove keys where values are None
-    payload = {k: v for k, v in payload.items() if v is not None}
+local_rules = LocalRulesEngine(KOUNT_LOCAL_RULES_FILE)
 
-    return payload
+# Payloads of orders with at least KOUNT_OFFLOAD_THRESHOLD line items, fulfillments and transactions
+# are built in a pool of KOUNT_OFFLOAD_WORKERS processes so large orders do not stall the event loop
+# (0 builds every payload inline); both are performance settings. Use tools/bench_payload_offload.py
+# to calibrate the threshold for the host.
+payload_pool = PayloadPool(
+    PERFORMANCE_SETTINGS.offload_threshold,
+    PERFORMANCE_SETTINGS.offload_workers,
+    compress_min_bytes=KOUNT_GZIP_MIN_BYTES if KOUNT_GZIP_REQUESTS else None,
+)
 
-async def handle_api_failure(is_pre_auth: bool, merchant_order_id: str = "UNKNOWN"):
+async def handle_api_failure(is_pre_auth: bool, merchant_order_id: str = "UNKNOWN", incoming_data: Optional[dict] = None):
     """
-    Handle API failure scenarios by returning a default response.
+    Handle API failure scenarios by returning a locally decided response.
+
+    The decision comes from the local rules engine when the order is available,
+    and is APPROVE otherwise or when no rule matches (unless the rules file sets
+    another default). A matching rule's name is returned as the reasonCode.
     
     Args:
         is_pre_auth (bool): Whether the transaction is pre-authorization. Defaults to True.
         merchant_order_id (str): The order ID associated with the transaction. Defaults to "UNKNOWN".
+        incoming_data (Optional[dict]): The raw order from the client, if it was parsed.
 
     Returns:
-        dict: A default response indicating approval.
+        dict: A default response carrying the local decision.
     """
     print(is_pre_auth)
     if is_pre_auth:
         simulate_credit_card_authorization(merchant_order_id)
 
+    if isinstance(incoming_data, dict):
+        decision, rule_name = local_rules.evaluate(incoming_data)
+    else:
+        decision, rule_name = local_rules.default_decision, None
+
+    risk_inquiry = {"decision": decision}
+    if rule_name:
+        risk_inquiry["reasonCode"] = rule_name
     return {
         "order": {
-            "riskInquiry": {
-                "decision": "APPROVE"
-            }
+            "riskInquiry": risk_inquiry
         }
     }
 
 
+class RiskInquirySummary(msgspec.Struct, omit_defaults=True):
+    """The riskInquiry fields most callers act on."""
+    decision: Optional[str] = None
+    omniscore: Any = None
+    reasonCode: Any = None
+
+
+class OrderSummary(msgspec.Struct, omit_defaults=True):
+    """The order identifiers and risk inquiry summary."""
+    orderId: Optional[str] = None
+    merchantOrderId: Optional[str] = None
+    riskInquiry: Optional[RiskInquirySummary] = None
+
+
+class KountOrderResponse(msgspec.Struct, omit_defaults=True):
+    """
+    Projection of a Kount Orders API response.
+
+    Decoding into this struct skips every other field without building it, so the
+    decision is available without materialising the full response. The `error`,
+    `details` and `fallback` fields carry the local 400 fallback response through.
+    Every field may be missing or null.
+    """
+    order: Optional[OrderSummary] = None
+    error: Optional[str] = None
+    details: Optional[str] = None
+    fallback: Optional[bool] = None
+
+    @property
+    def decision(self) -> Optional[str]:
+        """The risk inquiry decision, or None if the response has none."""
+        if self.order is None or self.order.riskInquiry is None:
+            return None
+        return self.order.riskInquiry.decision
+
+    @property
+    def order_id(self) -> Optional[str]:
+        """The Kount order ID, or None if the response has none."""
+        return self.order.orderId if self.order is not None else None
+
+
+KOUNT_RESPONSE_DECODER = msgspec.json.Decoder(KountOrderResponse)
+
+def render_kount_response(body: bytes, mode: str = KOUNT_RESPONSE_MODE):
+    """
+    Extracts the decision from a Kount response body and builds the response for the caller.
+
+    The body is parsed once in every mode. A response whose summary fields have
+    unexpected types is still returned to the caller, with an empty summary.
+
+    Args:
+        body (bytes): The raw JSON response body.
+        mode (str): One of KOUNT_RESPONSE_MODES.
+
+    Returns:
+        tuple: (KountOrderResponse summary, fastapi Response to return to the caller).
+
+    Raises:
+        msgspec.DecodeError: If the body is not valid JSON.
+    """
+    if mode == "full":
+        content = msgspec.json.decode(body)
+        response = JSONResponse(content=content)
+        try:
+            summary = msgspec.convert(content, KountOrderResponse)
+        except msgspec.ValidationError as e:
+            logging.error("Unexpected Kount response shape: %s", e)
+            summary = KountOrderResponse()
+        return summary, response
+    try:
+        summary = KOUNT_RESPONSE_DECODER.decode(body)
+    except msgspec.ValidationError as e:
+        # Valid JSON of an unexpected shape; only a body that is not JSON at all is a failure
+        logging.error("Unexpected Kount response shape: %s", e)
+        summary = KountOrderResponse()
+    if mode == "passthrough":
+        return summary, Response(content=body, media_type="application/json")
+    return summary, Response(content=msgspec.json.encode(summary), media_type="application/json")
+
+
+kount_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=KOUNT_LIMIT_INITIAL,
+    min_limit=KOUNT_LIMIT_MIN,
+    max_limit=KOUNT_LIMIT_MAX,
+    latency_tolerance=KOUNT_LIMIT_LATENCY_TOLERANCE,
+    max_retry_after=KOUNT_MAX_RETRY_AFTER,
+    acquire_timeout=KOUNT_LIMITER_ACQUIRE_TIMEOUT,
+)
+
+kount_scheduler = FairScheduler(
+    lambda: int(kount_limiter.limit),
+    weights=KOUNT_TENANT_WEIGHTS,
+    limits=KOUNT_TENANT_LIMITS,
+    default_limit=KOUNT_TENANT_MAX_CONCURRENCY,
+    lanes=[
+        Lane("interactive"),
+        Lane("background", reserved=KOUNT_BACKGROUND_RESERVED, max_share=KOUNT_BACKGROUND_MAX_SHARE),
+    ],
+)
+
+kount_endpoints = EndpointPool(KOUNT_API_ENDPOINTS, ejection_seconds=KOUNT_ENDPOINT_EJECTION_SECONDS)
+
+kount_transport = create_transport(KOUNT_TRANSPORT, KOUNT_TRANSPORT_MAX_CONNECTIONS, KOUNT_REQUEST_TIMEOUT, KOUNT_CA_FILE)
+
+kount_warmer = ConnectionWarmer(
+    kount_transport,
+    [endpoint.origin + KOUNT_ENDPOINT_PROBE_PATH for endpoint in kount_endpoints.endpoints],
+    connections=KOUNT_WARM_CONNECTIONS,
+    keepalive_interval=KOUNT_KEEPALIVE_INTERVAL,
+)
+
+def apply_performance_settings(settings):
+    """
+    Pushes changed performance settings into the long-lived objects built from them.
+
+    Each object picks the values up for work started afterwards: calls in flight keep
+    their slot, connection pool and timeout, and payload builds already submitted finish
+    in the old pool. Retry counts, backoff and retryable statuses need no push; the
+    retry decorators read the current settings on every attempt.
+
+    The settings are validated in full before this runs. If it still fails part-way,
+    performance_config restores the previous settings and calls it again with them.
+
+    Args:
+        settings (PerformanceSettings): The settings now in effect.
+    """
+    kount_endpoints.set_urls(list(settings.api_endpoints))
+    kount_limiter.set_bounds(settings.limit_min, settings.limit_max, settings.limit_latency_tolerance)
+    kount_limiter.max_retry_after = settings.max_retry_after
+    kount_limiter.acquire_timeout = settings.limiter_acquire_timeout
+    kount_scheduler.configure(
+        default_limit=settings.tenant_max_concurrency,
+        lanes={"background": (settings.background_reserved, settings.background_max_share)},
+    )
+    kount_endpoints.ejection_seconds = settings.endpoint_ejection_seconds
+    kount_warmer.urls = [endpoint.origin + KOUNT_ENDPOINT_PROBE_PATH for endpoint in kount_endpoints.endpoints]
+    kount_transport.reconfigure(settings.transport_max_connections, settings.request_timeout)
+    payload_pool.threshold = settings.offload_threshold
+    payload_pool.resize(settings.offload_workers)
+    retry_budget.ratio = settings.retry_budget_ratio
+    dns_cache.ttl = settings.dns_cache_ttl
+    server_timing.ACCESS_LOG_SAMPLE_RATE = settings.access_log_sample_rate
+    tracer.sample_rate = settings.trace_sample_rate
+    tracer.start("api_processor")
+    traffic_capture.sample_rate = settings.capture_sample_rate
+    traffic_capture.start()
+
+performance_config.subscribe(apply_performance_settings)
+
+def record_upstream(status: Optional[int], seconds: float):
+    """Adds an upstream call to the traffic capture record of the current request, if it is being captured."""
+    record = traffic_capture.current()
+    if record is not None:
+        record.upstream(status, seconds)
+
+async def send_kount_request(method: str, body: bytes, headers: dict, kount_order_id: Optional[str] = None,
+                             tenant: str = "default", lane: str = "interactive"):
+    """
+    Sends a request to the preferred Kount endpoint, failing over when one cannot be reached.
+
+    Only connection failures fail over to the next endpoint, because the request never
+    reached Kount; a timeout or an error response is recorded against the endpoint and
+    raised so the caller's retry policy decides. While the concurrency limit is reached,
+    attempts queue per lane and tenant and are admitted by `kount_scheduler`.
+
+    Args:
+        method (str): The HTTP method.
+        body (bytes): The encoded request body.
+        headers (dict): The request headers.
+        kount_order_id (Optional[str]): The order to address, or None for the risk inquiry endpoint itself.
+        tenant (str): The merchant the call is made for.
+        lane (str): "interactive" for calls a customer is waiting on, else "background".
+
+    Returns:
+        TransportResponse: The fully read response.
+
+    Raises:
+        TransportConnectError: If no endpoint could be reached.
+        TransportError: On a timeout or dropped connection.
+    """
+    last_error = None
+    for endpoint in kount_endpoints.candidates():
+        url = endpoint.url if kount_order_id is None else endpoint.url_for(kount_order_id)
+        started = time.monotonic()
+        with tracer.span("kount.http", **{"http.request.method": method, "server.address": endpoint.origin,
+                                          "kount.lane": lane}) as span:
+            try:
+                async with kount_scheduler.slot(tenant, lane), kount_limiter.slot() as outcome:
+                    # Upstream latency starts here, so time queued for a local slot is not held against the
+                    # endpoint or recorded (and replayed) as Kount latency
+                    sent_at = time.monotonic()
+                    span.set_attribute("kount.slot_wait_ms", round((sent_at - started) * 1000, 3))
+                    response = await kount_transport.request(method, url, body, headers)
+                    outcome.record(response.status, response.headers.get("Retry-After"))
+            except TransportConnectError as e:
+                kount_endpoints.record(endpoint, time.monotonic() - sent_at, False)
+                logging.error("Kount endpoint %s unreachable, failing over: %s", endpoint.url, e)
+                span.set_attribute("error.type", "connect")
+                last_error = e
+                continue
+            except TransportError:
+                kount_endpoints.record(endpoint, time.monotonic() - sent_at, False)
+                record_upstream(None, time.monotonic() - sent_at)
+                raise
+            span.set_attribute("http.response.status_code", response.status)
+        kount_endpoints.record(endpoint, time.monotonic() - sent_at, response.status < 500)
+        record_upstream(response.status, time.monotonic() - sent_at)
+        return response
+    raise last_error
+
+def encode_request_body(payload: dict):
+    """
+    Serialises a payload as compact JSON, gzip-compressing it when enabled and large enough.
+
+    Args:
+        payload (dict): The formatted payload to send to the Kount API.
+
+    Returns:
+        tuple: (body bytes, headers dict with Content-Type and, if compressed, Content-Encoding).
+    """
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if KOUNT_GZIP_REQUESTS and len(body) >= KOUNT_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+def request_body_headers(gzipped: bool) -> dict:
+    """
+    Returns the request headers for an encoded Kount request body.
+
+    Args:
+        gzipped (bool): Whether the body is gzip-compressed.
+
+    Returns:
+        dict: Content-Type and, if compressed, Content-Encoding headers.
+    """
+    headers = {"Content-Type": "application/json"}
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return headers
+
+def request_body_text(body: bytes, gzipped: bool) -> str:
+    """
+    Returns an encoded Kount request body as text, for error logs.
+
+    Args:
+        body (bytes): The encoded request body.
+        gzipped (bool): Whether the body is gzip-compressed.
+
+    Returns:
+        str: The JSON payload.
+    """
+    return (gzip.decompress(body) if gzipped else body).decode("utf-8", "replace")
+
 def is_retryable_error(exception):
     """
     Retry on 403 (Forbidden), 408 (Timeout), 429 (Too Many Requests), or 
             500 (Internal Server Error), 502 (Bad Gateway), 503 (Service Unavailabe)
-            or 504 (Gateway Timeout) status codes.
+            or 504 (Gateway Timeout) status codes by default; the set is the
+            runtime-tunable `retryable_statuses` setting.
     
         Args:
         exception (Exception): The exception raised during the request.
 
     Returns:
-        bool: True if the exception is an aiohttp.ClientResponseError with a status
-            in 403,408,429,500, 502, 503, else False.
+        bool: True if the exception is a TransportStatusError with a status
+            in `retryable_statuses`, else False.
     """
-    return isinstance(exception, aiohttp.ClientResponseError) and \
-        exception.status in {403,408,429,500, 502, 503, 504}
+    return isinstance(exception, TransportStatusError) and \
+        exception.status in performance_config.current.retryable_statuses
 
 @retry(
     retry=retry_if_exception(is_retryable_error),
-    stop=stop_after_attempt(3),
-    wait=wait_random_exponential(multiplier=1, max=10),  # Adding jitter
+    stop=stop_after_configured_attempts(performance_config) | stop_if_retry_budget_exhausted(retry_budget),
+    wait=wait_configured_backoff(performance_config),  # Adding jitter
+    before=retry_budget.record_attempt,
+    before_sleep=tracer.record_retry,
 )
-async def make_kount_api_request(session, payload):
+@tracer.traced("kount.attempt")
+async def make_kount_api_request(body: bytes, gzipped: bool = False, tenant: str = "default", lane: str = "interactive"):
     """
     Make a POST request to the Kount API with retries on HTTP 408 errors.
 
     This function is decorated with `@retry`, which automatically retries the
-    request with exponential backoff if an HTTP 408 (Request Timeout) occurs.
+    request with exponential backoff if an HTTP 408 (Request Timeout) occurs,
+    as long as the process-wide retry budget allows it.
 
     Args:
-        session (aiohttp.ClientSession): The active aiohttp session.
-        payload (dict): The formatted payload to send to the Kount API.
+        body (bytes): The encoded payload, built once and sent unchanged on every attempt.
+        gzipped (bool): Whether the body is gzip-compressed.
+        tenant (str): The merchant the call is made for, used for fair queuing.
+        lane (str): The priority lane, "interactive" or "background".
 
     Returns:
-        dict: The JSON response from the Kount API.
+        bytes: The raw JSON response body from the Kount API.
 
     Raises:
         HTTPException: If the request fails due to a non-408 error or after all retries.
     """
-    headers = {
-        "Authorization": f"Bearer {token_manager.get_access_token()}",
-        "Content-Type": "application/json",
-    }
+    headers = request_body_headers(gzipped)
+    headers["Authorization"] = f"Bearer {token_manager.get_access_token()}"
+
     try:
-        async with session.post(KOUNT_API_ENDPOINT, json=payload, headers=headers) as response:
-            if response.status == 400:
-                error_details = await response.text()
-                logging.error("Kount API Error 400: %s, Payload: %s", error_details, json.dumps(payload))
-                return {
-                    "error": "Bad Request",
-                    "details": error_details,
-                    "fallback": True
-                }  # Return a fallback error response
-
-            response.raise_for_status()
-            return await response.json()
-    except aiohttp.ClientResponseError as e:
+        response = await send_kount_request("POST", body, headers, tenant=tenant, lane=lane)
+        if response.status == 400:
+            error_details = response.text()
+            logging.error("Kount API Error 400: %s, Payload: %s", error_details, request_body_text(body, gzipped))
+            return json.dumps({
+                "error": "Bad Request",
+                "details": error_details,
+                "fallback": True
+            }).encode("utf-8")  # Return a fallback error response
+
+        response.raise_for_status()
+        return response.body
+    except TransportStatusError as e:
         logging.error("Kount API response error: %s", e)
         raise
     except Exception as e:
         logging.error("Unexpected Kount API failure: %s", e)
         raise
-async def kount_api_request(payload: dict, is_pre_auth: bool, merchant_order_id: str):
+async def kount_api_request(body: bytes, gzipped: bool, is_pre_auth: bool, merchant_order_id: str,
+                            incoming_data: Optional[dict] = None, tenant: str = "default"):
     """
     Wrapper function to handle Kount API requests with retries and error handling.
 
-    If the API request fails after retries, it calls `handle_api_failure()`.
+    If the API request fails after retries, it calls `handle_api_failure()`. Pre-auth
+    inquiries go in the interactive lane, post-auth inquiries in the background lane.
 
     Args:
-        payload (dict): The formatted payload to send to the Kount API.
+        body (bytes): The encoded payload to send to the Kount API.
+        gzipped (bool): Whether the body is gzip-compressed.
         is_pre_auth (bool): Whether the transaction is pre-authorization.
         merchant_order_id (str): The merchant order ID.
+        incoming_data (Optional[dict]): The raw order, used for the local decision on failure.
+        tenant (str): The merchant the call is made for, used for fair queuing.
 
     Returns:
-        dict: The response from the Kount API.
+        bytes: The raw JSON response from the Kount API, or the encoded fallback response.
     """
-    async with aiohttp.ClientSession() as session:
-        try:
-            return await make_kount_api_request(session, payload)
-        except Exception as e:
-            logging.error("Kount API call failed: %s, Payload: %s", e, json.dumps(payload))
-            return await handle_api_failure(is_pre_auth, merchant_order_id)
+    try:
+        with tracer.span("kount.request"):
+            return await make_kount_api_request(body, gzipped, tenant, "interactive" if is_pre_auth else "background")
+    except Exception as e:
+        logging.error("Kount API call failed: %s, Payload: %s", e, request_body_text(body, gzipped))
+        with tracer.span("fallback"):
+            return json.dumps(await handle_api_failure(is_pre_auth, merchant_order_id, incoming_data)).encode("utf-8")
         
+_token_lifespan = token_lifespan(warmer=kount_warmer)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Loads the tuning file, runs the token lifespan (which also warms Kount connections), reloads the local rules file and the
+    tuning file on change when they are configured and, with more than one Kount endpoint, probes their health and latency. Closes the
+    pooled Kount transport on shutdown. Also runs the event-loop monitor, the trace
+    exporter and the traffic capture writer when enabled, and the payload pool's worker processes.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    if performance_config.path:
+        # Read here rather than at import, so a bad file fails startup with its own error
+        performance_config.load()
+    async with _token_lifespan(app):
+        await loop_monitor.start()
+        tracer.start("api_processor")
+        traffic_capture.start()
+        await payload_pool.start()
+        tasks = []
+        if KOUNT_LOCAL_RULES_FILE:
+            tasks.append(asyncio.create_task(local_rules.watch(KOUNT_LOCAL_RULES_RELOAD_INTERVAL)))
+        if performance_config.path:
+            tasks.append(asyncio.create_task(performance_config.watch()))
+        if len(kount_endpoints.endpoints) > 1 and KOUNT_ENDPOINT_PROBE_INTERVAL > 0:
+            tasks.append(asyncio.create_task(
+                kount_endpoints.probe_forever(KOUNT_ENDPOINT_PROBE_INTERVAL, KOUNT_ENDPOINT_PROBE_PATH)))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            await kount_transport.close()
+            await loop_monitor.stop()
+            await tracer.stop()
+            await traffic_capture.stop()
+            await payload_pool.stop()
+
 # Create the FastAPI app with lifespan handler
 #app = FastAPI(lifespan=token_lifespan(use_public_key=False)) // False is default
-app = FastAPI(lifespan=token_lifespan())
+app = FastAPI(lifespan=lifespan)
+if PROFILING_TOKEN:
+    app.include_router(profiling_router)
+if ADMIN_TOKEN:
+    app.include_router(tuning_router)
 
 @app.post("/process-transaction")
+@request_profiler.profiled
+@server_timing.timed
+@traffic_capture.captured
+@tracer.traced("POST /process-transaction")
 async def process_transaction(request: Request):
     """
     Process transaction requests from the client and call the Kount API.
 
+    The response is shaped by KOUNT_RESPONSE_MODE (full, passthrough or projection).
+    With KOUNT_SERVER_TIMING enabled it carries a Server-Timing header breaking out
+    parse, build_payload, each upstream attempt, fallback and serialize times.
+    With KOUNT_CAPTURE_SAMPLE_RATE set, a sample of redacted requests and their upstream
+    latencies is written for replay (see tools/replay_capture.py).
+    Payloads of orders at or above KOUNT_OFFLOAD_THRESHOLD are built in the payload pool.
     If any error occurs, return the default fallback response from handle_api_failure().
     """
     is_pre_auth = True  # Always initialized at the beginning
     merchant_order_id = "UNKNOWN"
+    incoming_data = None
 
     try:
-        incoming_data = await request.json()
-        payload = build_payload(incoming_data)  # May raise ValueError
+        with tracer.span("parse"):
+            raw_body = await request.body()
+            incoming_data = json.loads(raw_body)
+        with tracer.span("build_payload"):
+            # Large orders are built in the payload pool from the raw body; may raise ValueError
+            payload_body, gzipped = await payload_pool.encode(incoming_data, raw_body)
         merchant_order_id = incoming_data.get("order_id", "UNKNOWN")
+        tenant = request.headers.get(KOUNT_TENANT_HEADER) or "default"
 
         # Ensure transactions exist and extract safely
         transactions = incoming_data.get("transactions", [])
@@ -478,9 +779,15 @@ async def process_transaction(request: Request):
             )
 
         # Pass is_pre_auth explicitly to kount_api_request
-        response = await kount_api_request(payload, is_pre_auth, merchant_order_id)
-        decision = response.get("order", {}).get("riskInquiry", {}).get("decision", "UNKNOWN")
-        kount_order_id = response.get("order", {}).get("orderId", "UNKNOWN")
+        body = await kount_api_request(payload_body, gzipped, is_pre_auth, merchant_order_id, incoming_data, tenant)
+        with tracer.span("render"):
+            summary, response = render_kount_response(body)
+        decision = summary.decision or "UNKNOWN"
+        kount_order_id = summary.order_id or "UNKNOWN"
+        span = tracer.current()
+        if span is not None:
+            span.set_attribute("kount.decision", decision)
+            span.set_attribute("kount.order_id", kount_order_id)
 
         if (
             is_pre_auth
@@ -489,13 +796,42 @@ async def process_transaction(request: Request):
             and decision in {"APPROVE", "REVIEW"}
         ):
             # Schedule the coroutine to run concurrently, without waiting
-            asyncio.create_task(safe_patch_credit_card_authorization(kount_order_id, merchant_order_id))
+            asyncio.create_task(safe_patch_credit_card_authorization(kount_order_id, merchant_order_id, tenant))
 
-        return JSONResponse(content=response)
+        return response
 
     except Exception as e:
         logging.error("Error occurred: %s", e)
-        return JSONResponse(content=await handle_api_failure(is_pre_auth, merchant_order_id))
+        with tracer.span("fallback", **{"error.type": type(e).__name__}):
+            return JSONResponse(content=await handle_api_failure(is_pre_auth, merchant_order_id, incoming_data))
+
+@app.get("/internal/stats", dependencies=[Depends(require_stats_token)])
+async def internal_stats():
+    """
+    Returns in-process metrics for outbound Kount API calls; requires KOUNT_STATS_TOKEN in the X-Stats-Token header.
+
+    Includes the current adaptive concurrency limit, in-flight calls, slot wait latency,
+    per-lane and per-tenant queue wait and admissions, the shared retry budget, local rule decisions,
+    per-endpoint health and latency, and the DNS cache and connection warm-up counters. With KOUNT_LOOP_MONITOR enabled it also
+    includes event-loop lag and recent blocking calls, with tracing enabled the sampling
+    and span export counters, with capture enabled the traffic capture counters, the inline and offloaded payload build counts and latencies,
+    and the performance settings in effect with their last change.
+    """
+    return {
+        "kount_limiter": kount_limiter.stats(),
+        "kount_scheduler": kount_scheduler.stats(),
+        "retry_budget": retry_budget.stats(),
+        "local_rules": local_rules.stats(),
+        "kount_endpoints": kount_endpoints.stats(),
+        "kount_transport": kount_transport.stats(),
+        "dns_cache": dns_cache.stats(),
+        "kount_warmer": kount_warmer.stats(),
+        "event_loop": loop_monitor.stats(),
+        "tracing": tracer.stats(),
+        "traffic_capture": traffic_capture.stats(),
+        "payload_pool": payload_pool.stats(),
+        "tuning": performance_config.stats(),
+    }
         
 def simulate_credit_card_authorization(merchant_order_id: str) -> dict:
     """
@@ -531,40 +867,41 @@ def simulate_credit_card_authorization(merchant_order_id: str) -> dict:
 
 @retry(
     retry=retry_if_exception(is_retryable_error),  # Retry on 408 and 500 errors
-    stop=stop_after_attempt(3),  # Stop after 3 attempts
-    wait=wait_random_exponential(multiplier=1, max=10),  # Exponential backoff with jitter
+    stop=stop_after_configured_attempts(performance_config) | stop_if_retry_budget_exhausted(retry_budget),  # Stop after max_attempts or when the budget is spent
+    wait=wait_configured_backoff(performance_config),  # Exponential backoff with jitter, capped at max_backoff
+    before=retry_budget.record_attempt,
+    before_sleep=tracer.record_retry,
 )
-async def patch_credit_card_authorization(kount_order_id: str, merchant_order_id: str):
+@tracer.traced("kount.patch.attempt")
+async def patch_credit_card_authorization(kount_order_id: str, merchant_order_id: str, tenant: str = "default"):
     """
     Posts the simulated credit card authorization payload to the Kount API.
 
     Args:
         kount_order_id (str): The order ID to associate with the authorization.
         merchant_order_id (str): The merchant order ID.
+        tenant (str): The merchant the call is made for, used for fair queuing.
 
     Returns:
         dict: The response from the Kount API.
     """
-    url = f"https://api-sandbox.kount.com/commerce/v2/orders/{kount_order_id}"
     simulated_auth_data = simulate_credit_card_authorization(merchant_order_id)
     authorization_payload = build_payload(simulated_auth_data, True)
     authorization_payload["transactions"][0]["authorizationStatus"]["authResult"] = "APPROVED"
     
-    headers = {
-        "Authorization": f"Bearer {token_manager.get_access_token()}",
-        "Content-Type": "application/json",
-    }
+    body, headers = encode_request_body(authorization_payload)
+    headers["Authorization"] = f"Bearer {token_manager.get_access_token()}"
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.patch(url, json=authorization_payload, headers=headers) as response:
-                response.raise_for_status()  # Raises aiohttp.ClientResponseError if status is 4xx or 5xx
-                return await response.json()
-        except aiohttp.ClientResponseError as e:
-            logging.error("Failed to patch authorization: %s", e)
-            raise  # Let Tenacity handle retries
-
-async def safe_patch_credit_card_authorization(kount_order_id: str, merchant_order_id: str):
+    try:
+        response = await send_kount_request("PATCH", body, headers, kount_order_id, tenant, "background")
+        response.raise_for_status()  # Raises TransportStatusError if status is 4xx or 5xx
+        return response.json()
+    except TransportStatusError as e:
+        logging.error("Failed to patch authorization: %s", e)
+        raise  # Let Tenacity handle retries
+
+@tracer.traced("kount.patch")
+async def safe_patch_credit_card_authorization(kount_order_id: str, merchant_order_id: str, tenant: str = "default"):
     """
     Executes the PATCH request to update credit card authorization in the Kount API with retry logic.
 
@@ -574,6 +911,7 @@ async def safe_patch_credit_card_authorization(kount_order_id: str, merchant_ord
     Args:
         kount_order_id (str): The unique order ID in the Kount system.
         merchant_order_id (str): The merchant's order ID associated with the transaction.
+        tenant (str): The merchant the call is made for, used for fair queuing.
 
     Returns:
         dict: The successful API response if the request eventually succeeds.
@@ -582,11 +920,11 @@ async def safe_patch_credit_card_authorization(kount_order_id: str, merchant_ord
         HTTPException: If all retries fail, raises an error with the final failure details.
     """
     try:
-        return await patch_credit_card_authorization(kount_order_id, merchant_order_id)
+        return await patch_credit_card_authorization(kount_order_id, merchant_order_id, tenant)
     except RetryError as re:
         last_exception = re.last_attempt.exception()  # Get the last raised exception
-        if isinstance(last_exception, aiohttp.ClientResponseError):
-            logging.error("Final failure after retries. Status: %s, URL: %s", last_exception.status, last_exception.request_info.url)
+        if isinstance(last_exception, TransportStatusError):
+            logging.error("Final failure after retries. Status: %s, URL: %s", last_exception.status, last_exception.url)
             raise HTTPException(status_code=last_exception.status, detail=f"Final failure after retries: {last_exception.message}")
         else:
             logging.error("Unexpected failure after retries: %s", re)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The apps are plain modules next to their own requirements, not an installed package
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "webhook"), os.path.join(HERE, "..", "api")]
+
+# Importing k360_jwt_auth requires an API key; no request is made with it
+os.environ.setdefault("KOUNT_API_KEY", "test-key")
@@ -0,0 +1,62 @@
+import json
+import time
+
+import msgspec
+import pytest
+
+import api_processor
+
+# ------------------------
+# Fail-open tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_long_retry_after_pause_fails_open_at_once(monkeypatch):
+    monkeypatch.setattr(api_processor.kount_limiter, "blocked_until", time.monotonic() + 3600)
+    started = time.monotonic()
+    body = await api_processor.kount_api_request(b"{}", False, False, "A1", {"order_id": "A1"})
+    assert time.monotonic() - started < 1
+    assert json.loads(body)["order"]["riskInquiry"]["decision"] == "APPROVE"
+
+@pytest.mark.asyncio
+async def test_malformed_order_still_gets_the_fallback_decision(monkeypatch, tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"default_decision": "REVIEW",
+                                 "rules": [{"name": "big", "type": "amount_above", "amount": 1, "decision": "DECLINE"}]}))
+    monkeypatch.setattr(api_processor, "local_rules", api_processor.LocalRulesEngine(str(rules)))
+    response = await api_processor.handle_api_failure(False, "A1", {"order_id": "A1", "transactions": 5})
+    assert response == {"order": {"riskInquiry": {"decision": "REVIEW"}}}
+
+# ------------------------
+# render_kount_response tests
+# ------------------------
+
+KOUNT_RESPONSE = {
+    "version": "v2",
+    "order": {"orderId": "K1", "merchantOrderId": "A1", "items": [{"id": "i1"}],
+              "riskInquiry": {"decision": "REVIEW", "omniscore": 42.5, "reasonCode": None}},
+}
+
+@pytest.mark.parametrize("mode", sorted(api_processor.KOUNT_RESPONSE_MODES))
+def test_render_extracts_the_decision_in_every_mode(mode):
+    body = json.dumps(KOUNT_RESPONSE).encode("utf-8")
+    summary, response = api_processor.render_kount_response(body, mode)
+    assert (summary.decision, summary.order_id) == ("REVIEW", "K1")
+    rendered = json.loads(response.body)
+    if mode == "projection":
+        assert rendered == {"order": {"orderId": "K1", "merchantOrderId": "A1",
+                                      "riskInquiry": {"decision": "REVIEW", "omniscore": 42.5}}}
+    else:
+        assert rendered == KOUNT_RESPONSE
+
+@pytest.mark.parametrize("mode", sorted(api_processor.KOUNT_RESPONSE_MODES))
+@pytest.mark.parametrize("content", [{"order": None}, {"order": {"riskInquiry": None}},
+                                     {"order": {"orderId": 7}}, []])
+def test_render_tolerates_unexpected_shapes(mode, content):
+    summary, response = api_processor.render_kount_response(json.dumps(content).encode("utf-8"), mode)
+    assert (summary.decision, response.status_code) == (None, 200)
+
+def test_render_rejects_bodies_that_are_not_json():
+    for mode in api_processor.KOUNT_RESPONSE_MODES:
+        with pytest.raises(msgspec.DecodeError):
+            api_processor.render_kount_response(b"<html>", mode)
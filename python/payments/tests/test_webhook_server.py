@@ -0,0 +1,223 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import k360_jwt_auth.metrics
+import webhook_server
+from webhook_server import (
+    OrderStatusChangeEvent,
+    WebhookEvent,
+    WebhookRouter,
+    PartitionedWebhookDispatcher,
+    WebhookJournal,
+    WebhookWorkerPool,
+    decode_event,
+    iter_journal,
+    replay_journal,
+    run_handler,
+    simulate_cancel_order,
+)
+
+EVENT = OrderStatusChangeEvent(id="e1", eventType="Order.StatusChange", kountOrderId="K1",
+                               eventDate="2022-05-24T23:18:00Z", fieldName="status", newValue="DECLINE")
+
+
+def read_dead_letters(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+# ------------------------
+# Decoding and routing tests
+# ------------------------
+
+def test_decode_event_types_routed_events_and_skips_unrouted_ones():
+    body = json.dumps({"id": "e1", "eventType": "Order.StatusChange", "kountOrderId": "K1", "fieldName": "status",
+                       "newValue": "DECLINE", "oldValue": "REVIEW", "merchantOrderId": None}).encode("utf-8")
+    routing, event, handler = decode_event(body)
+    assert isinstance(event, OrderStatusChangeEvent) and handler is simulate_cancel_order
+    assert (event.oldValue, event.merchantOrderId) == ("REVIEW", None)
+
+    routing, event, handler = decode_event(b'{"eventType": "Order.Other", "kountOrderId": null, "eventDate": null}')
+    assert (routing.eventType, routing.kountOrderId, event, handler) == ("Order.Other", None, None, None)
+
+def test_router_prefers_the_most_specific_route():
+    router = WebhookRouter()
+    for key in [("Order.StatusChange", None, None), ("Order.StatusChange", "status", None),
+                ("Order.StatusChange", "status", "APPROVE")]:
+        router.route(*key)(lambda event, key=key: key)
+    router.compile()
+    for field_name, new_value, expected in [("status", "APPROVE", ("status", "APPROVE")),
+                                            ("status", "DECLINE", ("status", None)),
+                                            ("status", {"not": "a string"}, ("status", None)),
+                                            (None, None, (None, None))]:
+        event = WebhookEvent(eventType="Order.StatusChange", fieldName=field_name, newValue=new_value)
+        assert router.resolve(event).handler(event)[1:] == expected
+    assert router.resolve(WebhookEvent(eventType="Other")) is None
+
+@pytest.mark.asyncio
+async def test_run_handler_awaits_coroutine_handlers_and_threads_blocking_ones():
+    handled = []
+
+    async def async_handler(event):
+        handled.append(("async", event.id))
+
+    def blocking_handler(event):
+        handled.append(("blocking", event.id))
+
+    await run_handler(EVENT, async_handler)
+    await run_handler(EVENT, blocking_handler)
+    assert handled == [("async", "e1"), ("blocking", "e1")]
+
+# ------------------------
+# WebhookWorkerPool tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_failed_handler_is_retried_then_processed(tmp_path):
+    calls = []
+
+    async def handler(event):
+        calls.append(event.id)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    pool = WebhookWorkerPool(workers=1, queue_size=10, max_attempts=2, dead_letter_file=str(tmp_path / "dead.ndjson"))
+    await pool.start()
+    assert pool.submit(EVENT, handler)
+    await pool.stop()
+    assert calls == ["e1", "e1"]
+    assert (pool.counters["processed"], pool.counters["retried"], pool.counters["dead_lettered"]) == (1, 1, 0)
+
+@pytest.mark.asyncio
+async def test_event_failing_every_attempt_is_dead_lettered(tmp_path):
+    def handler(event):
+        raise RuntimeError("down")
+
+    dead_letters = tmp_path / "dead.ndjson"
+    pool = WebhookWorkerPool(workers=1, queue_size=10, max_attempts=1, dead_letter_file=str(dead_letters))
+    await pool.start()
+    pool.submit(EVENT, handler)
+    await pool.stop()
+    [record] = read_dead_letters(dead_letters)
+    assert record["attempts"] == 1 and "down" in record["error"]
+    assert record["event"]["kountOrderId"] == "K1"
+
+@pytest.mark.asyncio
+async def test_shutdown_dead_letters_in_flight_and_queued_events(tmp_path):
+    started = asyncio.Event()
+
+    async def handler(event):
+        started.set()
+        await asyncio.sleep(60)
+
+    dead_letters = tmp_path / "dead.ndjson"
+    pool = WebhookWorkerPool(workers=1, queue_size=1, max_attempts=1, dead_letter_file=str(dead_letters))
+    await pool.start()
+    pool.submit(EVENT, handler)
+    await started.wait()
+    assert pool.submit(OrderStatusChangeEvent(id="e2", kountOrderId="K2"), handler)
+    assert not pool.submit(OrderStatusChangeEvent(id="e3"), handler)
+    await pool.stop(drain_timeout=0.01)
+    records = read_dead_letters(dead_letters)
+    assert [(record["event"]["id"], record["error"]) for record in records] == [
+        ("e1", "Shutdown while processing"), ("e2", "Shutdown before processing")]
+    assert pool.counters["rejected"] == 1
+
+# ------------------------
+# PartitionedWebhookDispatcher tests
+# ------------------------
+
+@pytest.mark.asyncio
+async def test_partition_drops_older_and_redelivered_events(tmp_path):
+    handled = []
+    dispatcher = PartitionedWebhookDispatcher(partitions=2, queue_size=10, max_attempts=1,
+                                              dead_letter_file=str(tmp_path / "dead.ndjson"))
+    await dispatcher.start()
+    for event_id, event_date in [("e1", "2022-05-24T23:18:00Z"), ("e2", "2022-05-24T23:18:00"),
+                                 ("e1", "2022-05-24T23:18:00Z"), ("e3", "2022-05-24T23:17:00+00:00"),
+                                 ("e4", "2022-05-24T23:19:00")]:
+        dispatcher.submit(OrderStatusChangeEvent(id=event_id, kountOrderId="K1", eventDate=event_date),
+                          lambda event: handled.append(event.id))
+    await dispatcher.stop()
+    assert handled == ["e1", "e2", "e4"]
+    assert (dispatcher.counters["duplicates"], dispatcher.counters["out_of_order"]) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_partition_keeps_draining_after_an_unexpected_error(tmp_path, monkeypatch):
+    handled = []
+    dead_letters = tmp_path / "dead.ndjson"
+    dispatcher = PartitionedWebhookDispatcher(partitions=1, queue_size=10, max_attempts=1,
+                                              dead_letter_file=str(dead_letters))
+    check_order = dispatcher._check_order
+
+    def failing_check(event, index):
+        if event.id == "bad":
+            raise TypeError("boom")
+        return check_order(event, index)
+
+    monkeypatch.setattr(dispatcher, "_check_order", failing_check)
+    await dispatcher.start()
+    for event_id in ("bad", "good"):
+        dispatcher.submit(OrderStatusChangeEvent(id=event_id, kountOrderId="K1"), lambda event: handled.append(event.id))
+    await dispatcher.stop()
+    assert handled == ["good"]
+    assert [record["event"]["id"] for record in read_dead_letters(dead_letters)] == ["bad"]
+
+# ------------------------
+# Journal tests
+# ------------------------
+
+def webhook_body(event_id: str, event_type: str = "Order.StatusChange") -> bytes:
+    return json.dumps({"id": event_id, "eventType": event_type, "kountOrderId": "K1",
+                       "fieldName": "status", "newValue": "APPROVE"}).encode("utf-8")
+
+@pytest.mark.asyncio
+async def test_journaled_events_are_replayed_in_order_across_segments(tmp_path, capsys, monkeypatch):
+    replayed = []
+    replay_router = WebhookRouter()
+
+    @replay_router.route("Order.StatusChange")
+    async def record(event):
+        replayed.append(event.id)
+
+    replay_router.compile()
+    monkeypatch.setattr(webhook_server, "router", replay_router)
+    journal = WebhookJournal(str(tmp_path), segment_bytes=200)
+    await journal.start()
+    for event_id in ("e1", "e2", "e3"):
+        journal.append(webhook_body(event_id), "Order.StatusChange")
+    journal.append(webhook_body("n1", "Notification.Other"), "Notification.Other")
+    await journal.stop()
+
+    assert journal.counters["records"] == 4 and journal.counters["segments"] > 1
+    records = list(iter_journal(str(tmp_path), event_types={"Order.StatusChange"}))
+    assert [json.loads(bytes(body))["id"] for _, _, body in records] == ["e1", "e2", "e3"]
+    assert list(iter_journal(str(tmp_path), since=records[-1][0] + 1)) == []
+
+    # The CLI runs its own event loop
+    await asyncio.to_thread(replay_journal, ["--journal-dir", str(tmp_path)])
+    assert capsys.readouterr().out.startswith("Replayed 3 events (1 unrouted, 0 failed)")
+    assert replayed == ["e1", "e2", "e3"]
+
+@pytest.mark.asyncio
+async def test_full_journal_buffer_drops_and_counts_events(tmp_path):
+    journal = WebhookJournal(str(tmp_path), segment_bytes=1 << 20, max_pending=2)
+    await journal.start()
+    for event_id in ("e1", "e2", "e3"):
+        journal.append(webhook_body(event_id), "Order.StatusChange")
+    await journal.stop()
+    assert (journal.counters["records"], journal.counters["dropped"]) == (2, 1)
+    assert len(list(iter_journal(str(tmp_path)))) == 2
+
+# ------------------------
+# Stats endpoint tests
+# ------------------------
+
+def test_stats_endpoint_requires_the_stats_token(monkeypatch):
+    client = TestClient(webhook_server.app)
+    assert client.get("/internal/stats").status_code == 404
+    monkeypatch.setattr(k360_jwt_auth.metrics, "STATS_TOKEN", "secret")
+    assert client.get("/internal/stats", headers={"X-Stats-Token": "wrong"}).status_code == 403
+    response = client.get("/internal/stats", headers={"X-Stats-Token": "secret"})
+    assert response.status_code == 200 and response.json()["mode"] == webhook_server.WEBHOOK_MODE
@@ -3,12 +3,18 @@ FastAPI server for handling Kount360 webhook events.
 
 Instructions:
 1. Install dependencies:
-   pip install fastapi uvicorn cryptography
+   pip install fastapi uvicorn cryptography msgspec
 
 2. Run the FastAPI server:
    uvicorn webhook_server:app --host 0.0.0.0 --port 5000
    uvicorn webhook_server:app --reload  # for auto-reload during development
 
+   Set KOUNT_WEBHOOK_MODE=async to acknowledge verified events immediately and
+   process them on a bounded in-process queue, or KOUNT_WEBHOOK_MODE=partitioned to
+   also keep each kountOrderId's events in order (see the KOUNT_WEBHOOK_* settings below).
+   Set KOUNT_WEBHOOK_JOURNAL_DIR to journal every verified event; replay with:
+   python webhook_server.py --journal-dir DIR [--since ISO] [--until ISO] [--event-type TYPE]
+
 3. Send a POST request with headers:
    - X-Event-Timestamp (ISO8601 format)
    - X-Event-Signature (Base64-encoded signature)
@@ -36,23 +42,66 @@ Instructions:
         -d '{...}'
 """
 
+import argparse
+import asyncio
 import json
+import inspect
 import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple, Optional
 
+import msgspec
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import Depends, FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
+from tenacity import AsyncRetrying
+from tenacity import stop_after_attempt
+from tenacity import wait_random_exponential
 
 from k360_jwt_auth import pub_key_utils
 from k360_jwt_auth import token_lifespan
+from k360_jwt_auth import LatencyRecorder, require_stats_token
+from k360_jwt_auth import loop_monitor
+from k360_jwt_auth import tracer
+from k360_jwt_auth import server_timing
+from k360_jwt_auth import PROFILING_TOKEN, profiling_router, request_profiler
+from k360_jwt_auth import retry_budget
 from k360_jwt_auth import InvalidSignatureError
 from k360_jwt_auth import TimestampTooOldError
 from k360_jwt_auth import TimestampTooNewError
 from k360_jwt_auth import MissingPublicKeyError
 from k360_jwt_auth import PublicKeyExpiredError
 
-app = FastAPI(lifespan=token_lifespan(use_public_key=True))
+# Processing mode:
+#   inline      - run business handling before returning 200 (default)
+#   async       - enqueue the verified event, return 200 at once and let a worker pool process it
+#   partitioned - like async, but events are hashed by kountOrderId onto serial queues so each
+#                 order's events are applied in order
+WEBHOOK_MODE = os.getenv("KOUNT_WEBHOOK_MODE", "inline").lower()
+WEBHOOK_WORKERS = int(os.getenv("KOUNT_WEBHOOK_WORKERS", "4"))
+WEBHOOK_PARTITIONS = int(os.getenv("KOUNT_WEBHOOK_PARTITIONS", "8"))
+WEBHOOK_ORDER_CACHE_SIZE = int(os.getenv("KOUNT_WEBHOOK_ORDER_CACHE_SIZE", "10000"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("KOUNT_WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("KOUNT_WEBHOOK_MAX_ATTEMPTS", "3"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("KOUNT_WEBHOOK_DRAIN_TIMEOUT", "10"))
+WEBHOOK_DEAD_LETTER_FILE = os.getenv("KOUNT_WEBHOOK_DEAD_LETTER_FILE", "webhook_dead_letter.ndjson")
+
+# Append-only journal of verified events; disabled unless a directory is configured
+WEBHOOK_JOURNAL_DIR = os.getenv("KOUNT_WEBHOOK_JOURNAL_DIR")
+WEBHOOK_JOURNAL_SEGMENT_BYTES = int(os.getenv("KOUNT_WEBHOOK_JOURNAL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+WEBHOOK_JOURNAL_FSYNC = os.getenv("KOUNT_WEBHOOK_JOURNAL_FSYNC", "false").lower() == "true"
+# Records buffered for the journal writer; further events are not journaled while it is full
+WEBHOOK_JOURNAL_MAX_PENDING = int(os.getenv("KOUNT_WEBHOOK_JOURNAL_MAX_PENDING", "10000"))
+
+if WEBHOOK_MODE not in {"inline", "async", "partitioned"}:
+    raise ValueError(f"Unsupported KOUNT_WEBHOOK_MODE: {WEBHOOK_MODE}")
 
 
 # Configure logging to write to a file named kount.log
@@ -65,21 +114,701 @@ logging.basicConfig(
     ]
 )
 
-def simulate_cancel_order():
+# ---------------------------
+# Typed Events and Routing
+# ---------------------------
+
+class WebhookEvent(msgspec.Struct):
+    """
+    Routing fields present on every Kount360 webhook.
+
+    Decoding a body into this struct skips every other field, so events
+    without a registered handler are never decoded any further. Every field
+    may be missing or null.
+    """
+    id: Optional[str] = None
+    eventType: Optional[str] = None
+    kountOrderId: Optional[str] = None
+    eventDate: Optional[str] = None
+    fieldName: Optional[str] = None
+    newValue: Any = None
+
+
+class OrderStatusChangeEvent(WebhookEvent):
+    """A fully decoded `Order.StatusChange` webhook event."""
+    apiVersion: Optional[str] = None
+    clientId: Optional[str] = None
+    merchantOrderId: Optional[str] = None
+    orderCreationDate: Optional[str] = None
+    oldValue: Any = None
+    channel: Optional[str] = None
+
+
+class WebhookRoute(NamedTuple):
+    """A resolved dispatch table entry: the handler and the decoder for its event struct."""
+    handler: Callable
+    decoder: msgspec.json.Decoder
+
+
+class WebhookRouter:
+    """
+    Registry of webhook handlers keyed on (eventType, fieldName, newValue).
+
+    `fieldName` and `newValue` may be registered as None to match any value. `compile`
+    resolves the registrations into a dispatch table with one precompiled decoder per
+    event struct, so a lookup at request time is at most three dict gets.
+
+    Attributes:
+        counters (dict): Routed and unrouted event counts.
+    """
+
+    def __init__(self):
+        self._registrations = {}
+        self._table = {}
+        self.counters = {"routed": 0, "unrouted": 0}
+
+    def route(self, event_type: str, field_name: Optional[str] = None, new_value: Any = None,
+              event_struct: type = WebhookEvent):
+        """
+        Decorator registering a handler for a routing key.
+
+        Args:
+            event_type (str): The eventType to match.
+            field_name (Optional[str]): The fieldName to match, or None for any.
+            new_value (Any): The newValue to match, or None for any.
+            event_struct (type): The msgspec struct the body is decoded into for this handler.
+
+        Returns:
+            Callable: The decorator.
+        """
+        def decorator(handler):
+            self._registrations[(event_type, field_name, new_value)] = (handler, event_struct)
+            return handler
+        return decorator
+
+    def compile(self):
+        """Builds the dispatch table, sharing one decoder per event struct."""
+        decoders = {}
+        table = {}
+        for key, (handler, event_struct) in self._registrations.items():
+            if event_struct not in decoders:
+                decoders[event_struct] = msgspec.json.Decoder(event_struct)
+            table[key] = WebhookRoute(handler, decoders[event_struct])
+        self._table = table
+
+    def resolve(self, event: WebhookEvent) -> Optional[WebhookRoute]:
+        """
+        Finds the most specific route for an event's routing fields.
+
+        Args:
+            event (WebhookEvent): The decoded routing fields.
+
+        Returns:
+            Optional[WebhookRoute]: The route, or None if no handler is registered.
+        """
+        table = self._table
+        new_value = event.newValue if isinstance(event.newValue, str) else None
+        return (
+            table.get((event.eventType, event.fieldName, new_value))
+            or table.get((event.eventType, event.fieldName, None))
+            or table.get((event.eventType, None, None))
+        )
+
+    def stats(self) -> dict:
+        """
+        Returns routing counters and the number of registered routes.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the router metrics.
+        """
+        return {"routes": len(self._table), **self.counters}
+
+
+router = WebhookRouter()
+
+ROUTING_DECODER = msgspec.json.Decoder(WebhookEvent)
+
+
+def decode_event(body: bytes):
+    """
+    Decodes a webhook body into its typed event struct.
+
+    The routing fields are decoded first; the full struct is only decoded
+    when a handler is registered for them.
+
+    Args:
+        body (bytes): The raw webhook body.
+
+    Returns:
+        tuple: (routing fields, typed event, handler); the event and handler are None if the event is unrouted.
+
+    Raises:
+        msgspec.DecodeError: If the body is not a valid webhook event.
+    """
+    routing = ROUTING_DECODER.decode(body)
+    route = router.resolve(routing)
+    if route is None:
+        router.counters["unrouted"] += 1
+        return routing, None, None
+    router.counters["routed"] += 1
+    return routing, route.decoder.decode(body), route.handler
+
+
+@router.route("Order.StatusChange", "status", "DECLINE", OrderStatusChangeEvent)
+def simulate_cancel_order(event: OrderStatusChangeEvent):
     """Simulates the cancellation of an order by logging a message."""
-    logging.info("Simulated order cancellation")
+    logging.info("Simulated order cancellation for %s", event.kountOrderId)
 
-def simulate_process_order():
+@router.route("Order.StatusChange", "status", "APPROVE", OrderStatusChangeEvent)
+def simulate_process_order(event: OrderStatusChangeEvent):
     """Simulates processing an order by logging a message."""
-    logging.info("Simulated order processing")
+    logging.info("Simulated order processing for %s", event.kountOrderId)
+
+router.compile()
+
+
+async def run_handler(event: WebhookEvent, handler: Callable):
+    """
+    Runs a routed handler the same way in every mode: coroutine handlers are awaited,
+    blocking ones run in a thread so they do not stall the event loop that acknowledges webhooks.
+
+    Args:
+        event (WebhookEvent): The decoded event.
+        handler (Callable): The handler `decode_event` resolved for it.
+    """
+    if asyncio.iscoroutinefunction(handler):
+        await handler(event)
+        return
+    result = await asyncio.to_thread(handler, event)
+    if inspect.isawaitable(result):
+        await result
+
+
+class WebhookWorkerPool:
+    """
+    Bounded in-process queue of verified webhook events drained by a pool of workers.
+
+    Each event is queued with the handler `decode_event` resolved for it. Failed
+    handlers are retried with exponential backoff and jitter. Events that still
+    fail, or that are left in the queue or still being handled at shutdown, are appended
+    to a dead-letter file as NDJSON so they can be inspected and replayed.
+
+    Attributes:
+        queues (list[asyncio.Queue]): Pending (event, handler, enqueued_at) tuples; one queue shared by all workers.
+        queue_latency (LatencyRecorder): Time from enqueue to completion.
+        handler_latency (LatencyRecorder): Time spent in the handler, including retries.
+        counters (dict): Enqueued, rejected, processed, retried and dead-lettered events.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_attempts: int, dead_letter_file: str):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.dead_letter_file = dead_letter_file
+        self.queues = [asyncio.Queue(maxsize=queue_size)]
+        self.queue_latency = LatencyRecorder()
+        self.handler_latency = LatencyRecorder()
+        self.counters = {"enqueued": 0, "rejected": 0, "processed": 0, "retried": 0, "dead_lettered": 0}
+        self._tasks = []
+
+    async def start(self):
+        """Starts the worker tasks."""
+        self._tasks = [asyncio.create_task(self._worker(0)) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT):
+        """
+        Waits for the queue to drain, then cancels the workers.
+
+        Events still queued after `drain_timeout` seconds, and events a worker was
+        handling when it was cancelled, are dead-lettered. A blocking handler running
+        in a thread cannot be interrupted and may still finish, so replaying the dead
+        letters can apply such an event twice.
+
+        Args:
+            drain_timeout (float): Seconds to wait for pending events to finish.
+        """
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.queues)), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logging.error("Webhook queue not drained at shutdown, %s events pending", self.queue_depth())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self.queues:
+            while not queue.empty():
+                event, _, _ = queue.get_nowait()
+                await self._dead_letter(event, "Shutdown before processing", 0)
+
+    def submit(self, event: WebhookEvent, handler: Callable) -> bool:
+        """
+        Enqueues a verified event without waiting.
+
+        Args:
+            event (WebhookEvent): The typed webhook event.
+            handler (Callable): The route's handler, sync or async; exceptions from it are retried.
+
+        Returns:
+            bool: False if the queue is full and the event was not accepted.
+        """
+        try:
+            self._queue_for(event).put_nowait((event, handler, time.monotonic()))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return False
+        self.counters["enqueued"] += 1
+        return True
+
+    def queue_depth(self) -> int:
+        """Returns the number of events waiting across all queues."""
+        return sum(queue.qsize() for queue in self.queues)
+
+    def _queue_for(self, event: WebhookEvent) -> asyncio.Queue:
+        return self.queues[0]
+
+    async def _worker(self, index: int):
+        queue = self.queues[index]
+        while True:
+            event, handler, enqueued_at = await queue.get()
+            try:
+                await self._process(event, handler, enqueued_at, index)
+            except asyncio.CancelledError:
+                # Cancelled at shutdown mid-event: keep it for replay rather than losing it
+                await self._dead_letter(event, "Shutdown while processing", 0)
+                raise
+            except Exception as exc:
+                # One bad event must not end the worker; in partitioned mode it is its partition's only one
+                logging.error("Webhook worker failed on event %s: %s", event.id, exc)
+                await self._dead_letter(event, repr(exc), 0)
+            finally:
+                queue.task_done()
+
+    async def _process(self, event: WebhookEvent, handler: Callable, enqueued_at: float, index: int):
+        started = time.monotonic()
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_attempts),
+                wait=wait_random_exponential(multiplier=0.5, max=10),
+                before_sleep=self._count_retry,
+                reraise=True,
+            ):
+                with attempt:
+                    await run_handler(event, handler)
+            self.counters["processed"] += 1
+        except Exception as exc:
+            logging.error("Webhook handler failed after %s attempts: %s", self.max_attempts, exc)
+            await self._dead_letter(event, repr(exc), self.max_attempts)
+        finally:
+            finished = time.monotonic()
+            self.handler_latency.record(finished - started)
+            self.queue_latency.record(finished - enqueued_at)
+
+    def _count_retry(self, retry_state):
+        self.counters["retried"] += 1
+
+    async def _dead_letter(self, event: WebhookEvent, error: str, attempts: int):
+        record = {
+            "failedAt": datetime.now(timezone.utc).isoformat(),
+            "attempts": attempts,
+            "error": error,
+            "event": msgspec.to_builtins(event),
+        }
+        try:
+            await asyncio.to_thread(self._append_dead_letter, json.dumps(record) + "\n")
+            self.counters["dead_lettered"] += 1
+        except OSError as exc:
+            logging.error("Failed to write dead-letter record: %s, Event: %s", exc, event)
+
+    def _append_dead_letter(self, line: str):
+        with open(self.dead_letter_file, "a", encoding="utf-8") as handle:
+            handle.write(line)
+
+    def stats(self) -> dict:
+        """
+        Returns queue depth, counters and latency percentiles.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the pool metrics.
+        """
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth(),
+            "queue_capacity": sum(queue.maxsize for queue in self.queues),
+            **self.counters,
+            "queue_latency": self.queue_latency.snapshot(),
+            "handler_latency": self.handler_latency.snapshot(),
+        }
+
+
+class PartitionedWebhookDispatcher(WebhookWorkerPool):
+    """
+    Worker pool that hashes `kountOrderId` onto one of N serial queues.
+
+    Each partition has exactly one worker, so events for the same order are handled
+    strictly in arrival order (retries block the partition) while throughput scales
+    with the number of partitions. Within a partition, an event whose `eventDate` is
+    older than the last one accepted for the same order is dropped as out of order, and
+    a redelivery (same `id` and `eventDate` as an event already accepted) is dropped as a
+    duplicate. Dates without a UTC offset are taken as UTC.
+
+    Attributes:
+        order_cache_size (int): Orders per partition whose last `eventDate` is remembered (LRU).
+    """
+
+    def __init__(self, partitions: int, queue_size: int, max_attempts: int,
+                 dead_letter_file: str, order_cache_size: int = WEBHOOK_ORDER_CACHE_SIZE):
+        super().__init__(partitions, queue_size, max_attempts, dead_letter_file)
+        self.order_cache_size = order_cache_size
+        self.queues = [asyncio.Queue(maxsize=max(1, queue_size // partitions)) for _ in range(partitions)]
+        self._last_event_dates = [OrderedDict() for _ in range(partitions)]
+        self.counters["out_of_order"] = 0
+        self.counters["duplicates"] = 0
+
+    async def start(self):
+        """Starts one serial worker per partition."""
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(len(self.queues))]
+
+    def partition_for(self, kount_order_id) -> int:
+        """
+        Maps an order to its partition with a hash that is stable across restarts.
+
+        Args:
+            kount_order_id (str): The Kount order ID of the event.
+
+        Returns:
+            int: The partition index.
+        """
+        return zlib.crc32(str(kount_order_id or "").encode("utf-8")) % len(self.queues)
+
+    def _queue_for(self, event: WebhookEvent) -> asyncio.Queue:
+        return self.queues[self.partition_for(event.kountOrderId)]
+
+    async def _process(self, event: WebhookEvent, handler: Callable, enqueued_at: float, index: int):
+        verdict = self._check_order(event, index)
+        if verdict is not None:
+            self.counters[verdict] += 1
+            logging.error(
+                "Dropping event %s for order %s (%s), eventDate: %s",
+                event.id, event.kountOrderId, verdict, event.eventDate,
+            )
+            return
+        await super()._process(event, handler, enqueued_at, index)
+
+    def _check_order(self, event: WebhookEvent, index: int) -> Optional[str]:
+        """Returns "out_of_order" or "duplicates" for events to drop, None for events to handle."""
+        kount_order_id = event.kountOrderId
+        event_date_str = event.eventDate
+        if not kount_order_id or not event_date_str:
+            return None
+        try:
+            event_date = datetime.fromisoformat(event_date_str.replace("Z", "+00:00"))
+        except ValueError:
+            logging.error("Invalid eventDate %s, skipping ordering check", event_date_str)
+            return None
+        if event_date.tzinfo is None:
+            event_date = event_date.replace(tzinfo=timezone.utc)
+
+        last_dates = self._last_event_dates[index]
+        last = last_dates.get(kount_order_id)
+        if last is not None:
+            last_date, last_ids = last
+            if event_date < last_date:
+                return "out_of_order"
+            if event_date == last_date:
+                if event.id and event.id in last_ids:
+                    return "duplicates"
+                last_ids.add(event.id)
+                last_dates.move_to_end(kount_order_id)
+                return None
+
+        last_dates[kount_order_id] = (event_date, {event.id})
+        last_dates.move_to_end(kount_order_id)
+        if len(last_dates) > self.order_cache_size:
+            last_dates.popitem(last=False)
+        return None
+
+    def stats(self) -> dict:
+        """
+        Returns the pool metrics plus per-partition queue depths.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the dispatcher metrics.
+        """
+        return {
+            **super().stats(),
+            "partition_depths": [queue.qsize() for queue in self.queues],
+        }
+
+
+if WEBHOOK_MODE == "partitioned":
+    worker_pool = PartitionedWebhookDispatcher(
+        partitions=WEBHOOK_PARTITIONS,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+        max_attempts=WEBHOOK_MAX_ATTEMPTS,
+        dead_letter_file=WEBHOOK_DEAD_LETTER_FILE,
+    )
+else:
+    worker_pool = WebhookWorkerPool(
+        workers=WEBHOOK_WORKERS,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+        max_attempts=WEBHOOK_MAX_ATTEMPTS,
+        dead_letter_file=WEBHOOK_DEAD_LETTER_FILE,
+    )
+
+# ---------------------------
+# Event Journal
+# ---------------------------
+
+JOURNAL_RECORD_HEADER = struct.Struct("<IdH")
+"""
+Journal record header: body length, received-at UNIX time and event type length.
+The event type bytes and then the raw webhook body follow the header.
+"""
+
+JOURNAL_SEGMENT_SUFFIX = ".journal"
+
+
+def encode_journal_record(body: bytes, event_type: str, received_at: float) -> bytes:
+    """
+    Encodes a verified webhook body as a single journal record.
+
+    Args:
+        body (bytes): The raw webhook body, exactly as signed by Kount.
+        event_type (str): The event's eventType, stored for filtering without decoding the body.
+        received_at (float): UNIX time the event was received.
+
+    Returns:
+        bytes: The encoded record.
+    """
+    event_type_bytes = (event_type or "").encode("utf-8")
+    return JOURNAL_RECORD_HEADER.pack(len(body), received_at, len(event_type_bytes)) + event_type_bytes + body
+
+
+class WebhookJournal:
+    """
+    Append-only, segmented journal of verified webhook events.
+
+    `append` only encodes the record and buffers it; a background task writes the
+    buffered records in batches from a worker thread, so the request path never
+    touches the disk. A new segment is started on every startup and whenever the
+    current one would grow past `segment_bytes`. At most `max_pending` records are
+    buffered; events arriving while the buffer is full are counted as dropped.
+
+    Attributes:
+        directory (str): Directory holding the numbered segment files.
+        segment_bytes (int): Size at which the current segment is rotated.
+        max_pending (int): Records buffered before new events are dropped.
+        counters (dict): Records, bytes, batches and segments written, and records dropped.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, fsync: bool = False,
+                 max_pending: int = WEBHOOK_JOURNAL_MAX_PENDING):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self.counters = {"records": 0, "bytes": 0, "batches": 0, "segments": 0, "dropped": 0}
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+        self._file = None
+        self._segment_size = 0
+        self._segment_seq = 0
+
+    async def start(self):
+        """Opens a fresh segment and starts the background writer."""
+        await asyncio.to_thread(self._open_next_segment)
+        self._stopping = False
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """Lets the writer flush the buffered records and exit, then closes the current segment."""
+        if self._task is None:
+            return
+        # Not cancelled: a batch write in progress runs on in its thread and must finish before the file closes
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await asyncio.to_thread(self._file.close)
+
+    def append(self, body: bytes, event_type: str):
+        """
+        Buffers a verified event for the next batch write.
+
+        Args:
+            body (bytes): The raw webhook body.
+            event_type (str): The event's eventType.
+        """
+        if len(self._pending) >= self.max_pending:
+            self.counters["dropped"] += 1
+            logging.error("Journal buffer full, event of type %s not journaled", event_type)
+            return
+        self._pending.append(encode_journal_record(body, event_type, time.time()))
+        self._wakeup.set()
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except OSError as exc:
+                    logging.error("Failed to write %s journal records: %s", len(batch), exc)
+            if self._stopping and not self._pending:
+                return
+
+    def _open_next_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._file is None:
+            existing = [
+                int(name[:-len(JOURNAL_SEGMENT_SUFFIX)])
+                for name in os.listdir(self.directory)
+                if name.endswith(JOURNAL_SEGMENT_SUFFIX) and name[:-len(JOURNAL_SEGMENT_SUFFIX)].isdigit()
+            ]
+            self._segment_seq = max(existing, default=0)
+        else:
+            self._file.close()
+        self._segment_seq += 1
+        path = os.path.join(self.directory, f"{self._segment_seq:010d}{JOURNAL_SEGMENT_SUFFIX}")
+        self._file = open(path, "ab")
+        self._segment_size = 0
+        self.counters["segments"] += 1
+
+    def _write_batch(self, batch: list):
+        chunk = []
+        chunk_size = 0
+        for record in batch:
+            if self._segment_size + chunk_size + len(record) > self.segment_bytes and self._segment_size + chunk_size > 0:
+                self._flush_chunk(chunk, chunk_size)
+                self._open_next_segment()
+                chunk, chunk_size = [], 0
+            chunk.append(record)
+            chunk_size += len(record)
+        self._flush_chunk(chunk, chunk_size)
+        self.counters["records"] += len(batch)
+        self.counters["batches"] += 1
+
+    def _flush_chunk(self, chunk: list, chunk_size: int):
+        if not chunk:
+            return
+        self._file.write(b"".join(chunk))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._segment_size += chunk_size
+        self.counters["bytes"] += chunk_size
+
+    def stats(self) -> dict:
+        """
+        Returns journal counters and the number of records waiting to be written.
+
+        Returns:
+            dict: A JSON-serialisable snapshot of the journal metrics.
+        """
+        return {
+            "directory": self.directory,
+            "current_segment": self._segment_seq,
+            "pending": len(self._pending),
+            **self.counters,
+        }
+
+
+def iter_journal(directory: str, since: float = None, until: float = None, event_types: set = None):
+    """
+    Streams journal records from memory-mapped segments, oldest first.
+
+    Filtering is done on the record header and stored event type, so skipped
+    events are never decoded. A truncated record at the end of a segment
+    (e.g. after a crash mid-write) ends that segment.
+
+    Args:
+        directory (str): The journal directory.
+        since (float): Only yield events received at or after this UNIX time.
+        until (float): Only yield events received before this UNIX time.
+        event_types (set): Only yield events whose eventType is in this set.
+
+    Yields:
+        tuple: (received_at, event_type, body) for each matching record.
+    """
+    wanted_types = {event_type.encode("utf-8") for event_type in event_types} if event_types else None
+    segments = sorted(name for name in os.listdir(directory) if name.endswith(JOURNAL_SEGMENT_SUFFIX))
+    for name in segments:
+        with open(os.path.join(directory, name), "rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                continue
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                offset = 0
+                end = len(mapped)
+                while offset + JOURNAL_RECORD_HEADER.size <= end:
+                    body_len, received_at, type_len = JOURNAL_RECORD_HEADER.unpack_from(mapped, offset)
+                    type_start = offset + JOURNAL_RECORD_HEADER.size
+                    body_start = type_start + type_len
+                    offset = body_start + body_len
+                    if offset > end:
+                        logging.error("Truncated journal record in %s", name)
+                        break
+                    if since is not None and received_at < since:
+                        continue
+                    if until is not None and received_at >= until:
+                        continue
+                    event_type = mapped[type_start:body_start]
+                    if wanted_types is not None and event_type not in wanted_types:
+                        continue
+                    yield received_at, event_type.decode("utf-8"), mapped[body_start:offset]
+
+
+journal = WebhookJournal(WEBHOOK_JOURNAL_DIR, WEBHOOK_JOURNAL_SEGMENT_BYTES, WEBHOOK_JOURNAL_FSYNC) if WEBHOOK_JOURNAL_DIR else None
+
+_token_lifespan = token_lifespan(use_public_key=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs the token and public key lifespan, the event journal when configured,
+    the event-loop monitor and trace exporter when enabled and, in async and partitioned modes, the
+    webhook worker pool.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    async with _token_lifespan(app):
+        await loop_monitor.start()
+        tracer.start("webhook_server")
+        if journal:
+            await journal.start()
+        if WEBHOOK_MODE != "inline":
+            await worker_pool.start()
+        try:
+            yield
+        finally:
+            await worker_pool.stop()
+            if journal:
+                await journal.stop()
+            await loop_monitor.stop()
+            await tracer.stop()
+
+app = FastAPI(lifespan=lifespan)
+if PROFILING_TOKEN:
+    app.include_router(profiling_router)
 
 @app.post("/kount360WebhookReceiver")
+@request_profiler.profiled
+@server_timing.timed
+@tracer.traced("POST /kount360WebhookReceiver")
 async def kount360_webhook_receiver(request: Request):
     """
     Handles incoming Kount360 webhook events:
     - Extracts headers and body.
     - Verifies the signature and timestamp using pub_key_utils.
     - Processes the webhook according to business logic.
+
+    With KOUNT_SERVER_TIMING enabled the response, including error responses, carries
+    a Server-Timing header with verify and decode times.
     """
 
     # Extract headers
@@ -102,7 +831,8 @@ async def kount360_webhook_receiver(request: Request):
     #custom_now = datetime.strptime("2025-04-04T20:46:04Z", "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc) # For testing purposes
     try:
         #await pub_key_utils.verify_signature(signature_b64, timestamp_header, body, now=custom_now)
-        await pub_key_utils.verify_signature(signature_b64, timestamp_header, body)
+        with tracer.span("verify_signature"):
+            await pub_key_utils.verify_signature(signature_b64, timestamp_header, body)
 
     except MissingPublicKeyError as exc:
         logging.error("MissingPublicKeyError")
@@ -122,17 +852,95 @@ async def kount360_webhook_receiver(request: Request):
 
     # Process message
     try:
-        payload = json.loads(body)
-        new_value = payload.get("newValue")
-        if new_value == "DECLINE":
-            simulate_cancel_order()
-        elif new_value == "APPROVE":
-            simulate_process_order()
-        else:
-            logging.error("Unexpected newValue: %s", new_value)
-    except json.JSONDecodeError as exc:
-        logging.error("Invalid JSON payload: %s", payload)
+        with tracer.span("decode"):
+            routing, event, handler = decode_event(body)
+    except msgspec.DecodeError as exc:
+        logging.error("Invalid JSON payload: %s", body)
         raise HTTPException(status_code=400, detail="Invalid JSON payload") from exc
 
+    if journal:
+        journal.append(body, routing.eventType)
+
+    if event is None:
+        logging.info("No handler for %s %s=%s", routing.eventType, routing.fieldName, routing.newValue)
+    elif WEBHOOK_MODE != "inline":
+        # Acknowledge right away; a 503 on a full queue makes Kount redeliver later
+        if not worker_pool.submit(event, handler):
+            logging.error("Webhook queue full, rejecting event %s", event.id)
+            raise HTTPException(status_code=503, detail="Webhook queue full")
+    else:
+        await run_handler(event, handler)
+
     # Return 200 OK explicitly
-    return JSONResponse(content={"status": "ok"}, status_code=200)
\ No newline at end of file
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+@app.get("/internal/stats", dependencies=[Depends(require_stats_token)])
+async def internal_stats():
+    """
+    Returns in-process webhook processing metrics; requires KOUNT_STATS_TOKEN in the X-Stats-Token header.
+
+    In async and partitioned modes this includes queue depth, counters and latency percentiles.
+    With KOUNT_LOOP_MONITOR enabled it also includes event-loop lag and recent blocking calls,
+    and with tracing enabled the sampling and span export counters.
+    """
+    return {
+        "mode": WEBHOOK_MODE,
+        "router": router.stats(),
+        "webhook_queue": worker_pool.stats(),
+        "journal": journal.stats() if journal else None,
+        "retry_budget": retry_budget.stats(),
+        "event_loop": loop_monitor.stats(),
+        "tracing": tracer.stats(),
+    }
+
+
+def _parse_cli_time(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def replay_journal(argv=None):
+    """
+    Command-line entry point that replays journaled events through their handlers.
+
+    Events are streamed from memory-mapped segments and handled back to back,
+    optionally limited to a received-at time range and to given event types.
+
+    Usage:
+        python webhook_server.py --journal-dir journal --since 2025-04-04T00:00:00Z \\
+            --until 2025-04-05T00:00:00Z --event-type Order.StatusChange
+    """
+    parser = argparse.ArgumentParser(description="Replay journaled Kount360 webhook events through the handlers.")
+    parser.add_argument("--journal-dir", default=WEBHOOK_JOURNAL_DIR, required=WEBHOOK_JOURNAL_DIR is None,
+                        help="Journal directory (defaults to KOUNT_WEBHOOK_JOURNAL_DIR).")
+    parser.add_argument("--since", type=_parse_cli_time, help="Only replay events received at or after this ISO8601 time.")
+    parser.add_argument("--until", type=_parse_cli_time, help="Only replay events received before this ISO8601 time.")
+    parser.add_argument("--event-type", action="append", dest="event_types", help="Only replay this eventType (repeatable).")
+    parser.add_argument("--dry-run", action="store_true", help="Decode and count matching events without handling them.")
+    args = parser.parse_args(argv)
+    asyncio.run(_replay(args))
+
+
+async def _replay(args):
+    replayed = 0
+    skipped = 0
+    failed = 0
+    started = time.monotonic()
+    for _, _, body in iter_journal(args.journal_dir, args.since, args.until, set(args.event_types or ())):
+        try:
+            _, event, handler = decode_event(body)
+            if event is None:
+                skipped += 1
+                continue
+            if not args.dry_run:
+                await run_handler(event, handler)
+            replayed += 1
+        except Exception as exc:
+            failed += 1
+            logging.error("Replay failed for event: %s, Error: %s", body[:200], exc)
+    elapsed = time.monotonic() - started
+    rate = replayed / elapsed if elapsed > 0 else 0.0
+    print(f"Replayed {replayed} events ({skipped} unrouted, {failed} failed) in {elapsed:.3f}s, {rate:.0f} events/s")
+
+
+if __name__ == "__main__":
+    replay_journal()
@@ -0,0 +1,73 @@
+"""
+Measures how long the local rules engine takes to decide an order.
+
+Compiles a rules file (by default payments/api/local_rules.example.json, optionally
+padded with a large BIN block list) and evaluates the typical /process-transaction
+order and a large order against it, printing the compile time and the per-decision
+latency percentiles. The fail-open path should stay well under a millisecond.
+
+Usage:
+    KOUNT_API_KEY=... python bench_local_rules.py [--rules FILE] [--blocked-bins 10000]
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request is made)
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from k360_jwt_auth.local_rules import LocalRulesEngine
+from k360_jwt_auth.metrics import LatencyRecorder
+
+from bench_payload_size import TYPICAL_ORDER, large_order
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "..", "payments", "api", "local_rules.example.json")
+
+
+def measure(name: str, engine: LocalRulesEngine, order: dict, rounds: int):
+    """Prints decision latency percentiles for one order."""
+    recorder = LatencyRecorder(window=rounds)
+    for _ in range(rounds):
+        started = time.perf_counter()
+        decision, rule_name = engine.evaluate(order)
+        recorder.record(time.perf_counter() - started)
+    snapshot = recorder.snapshot()
+    print(f"{name}: {decision} ({rule_name or 'default'})")
+    print(f"  p50 {snapshot['p50_ms'] * 1000:.1f} us, p99 {snapshot['p99_ms'] * 1000:.1f} us, "
+          f"max {snapshot['max_ms'] * 1000:.1f} us")
+
+
+def main():
+    """Parses the command line and prints the report."""
+    parser = argparse.ArgumentParser(description="Benchmark the local rules engine.")
+    parser.add_argument("--rules", default=DEFAULT_RULES_FILE)
+    parser.add_argument("--blocked-bins", type=int, default=10000, help="Extra BINs added to the block list.")
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(args.rules, "r", encoding="utf-8") as handle:
+        config = json.load(handle)
+    if args.blocked_bins:
+        config["rules"].insert(0, {
+            "name": "bench-blocked-bins", "type": "bin_in", "decision": "DECLINE",
+            "bins": [f"{600000 + i}" for i in range(args.blocked_bins)],
+        })
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+        json.dump(config, handle)
+    try:
+        started = time.perf_counter()
+        engine = LocalRulesEngine(handle.name)
+        print(f"Compiled {len(engine.rules)} rules in {(time.perf_counter() - started) * 1000:.2f} ms")
+    finally:
+        os.unlink(handle.name)
+
+    measure("Typical order", engine, TYPICAL_ORDER, args.rounds)
+    measure("Large order (500 items, 20 transactions)", engine, large_order(500, 20), args.rounds // 10)
+
+
+if __name__ == "__main__":
+    main()
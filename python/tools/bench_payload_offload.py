@@ -0,0 +1,110 @@
+"""
+Calibrates KOUNT_OFFLOAD_THRESHOLD: inline vs process-pool payload builds by order size.
+
+For orders of increasing size (line items, plus the typical order's
+fulfillments and transactions) prints, per build:
+- inline: build + encode on the event loop, which is also how long the loop stalls,
+- offloaded: the round trip through `PayloadPool` (body bytes to a worker, encoded body back),
+- stall: the longest event-loop lag observed while the offloaded builds ran,
+and suggests the smallest size at which offloading is faster than building
+inline or the inline stall exceeds `--stall-budget`.
+
+Run it on the host (or instance type) the API is deployed to; the crossover
+depends on CPU speed and process start method.
+
+Usage:
+    KOUNT_API_KEY=... python bench_payload_offload.py [--sizes 10,50,100,250,500,1000,2500,5000] [--workers 2]
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request is made)
+
+Dependencies:
+- k360_jwt_auth only.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from bench_payload_size import large_order
+
+from k360_jwt_auth.payload_pool import PayloadPool, order_size
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """Returns the longest event-loop lag, in seconds, seen until `stop` is set."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def measure(pool: PayloadPool, inline: PayloadPool, items: int, rounds: int) -> dict:
+    """Times inline and offloaded builds of one order size."""
+    order = large_order(items, 2)
+    raw_body = json.dumps(order).encode("utf-8")
+
+    inline_times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await inline.encode(order, raw_body)
+        inline_times.append(time.perf_counter() - started)
+
+    offload_times = []
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await pool.encode(order, raw_body)
+        offload_times.append(time.perf_counter() - started)
+    stop.set()
+
+    return {
+        "size": order_size(order),
+        "body_kb": len(raw_body) / 1024,
+        "inline_ms": statistics.median(inline_times) * 1000,
+        "offload_ms": statistics.median(offload_times) * 1000,
+        "stall_ms": await lag * 1000,
+    }
+
+
+async def run(args):
+    """Prints the table and the suggested threshold."""
+    pool = PayloadPool(threshold=1, workers=args.workers)
+    inline = PayloadPool(threshold=0)
+    await pool.start()
+    try:
+        print(f"{'size':>6} {'body KB':>9} {'inline ms':>10} {'offload ms':>11} {'stall ms':>9}")
+        suggested = None
+        for items in args.sizes:
+            result = await measure(pool, inline, items, args.rounds)
+            print(f"{result['size']:>6} {result['body_kb']:>9.1f} {result['inline_ms']:>10.2f} "
+                  f"{result['offload_ms']:>11.2f} {result['stall_ms']:>9.2f}")
+            if suggested is None and (result["offload_ms"] <= result["inline_ms"]
+                                      or result["inline_ms"] >= args.stall_budget):
+                suggested = result["size"]
+    finally:
+        await pool.stop()
+    if suggested is None:
+        print("Inline builds stayed cheaper at every size; leave offload off (KOUNT_OFFLOAD_THRESHOLD=0).")
+    else:
+        print(f"Suggested KOUNT_OFFLOAD_THRESHOLD={suggested}")
+
+
+def main():
+    """Parses the command line and runs the calibration."""
+    parser = argparse.ArgumentParser(description="Compare inline and process-pool payload builds by order size.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[10, 50, 100, 250, 500, 1000, 2500, 5000], help="Comma-separated line item counts.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--stall-budget", type=float, default=5.0,
+                        help="Inline build time, in milliseconds, above which offloading is suggested anyway.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Reports bytes on the wire for Kount order payloads built by `build_payload`.
+
+For a typical order (the /process-transaction example) and a large order
+(many items and transactions), prints the size of:
+- the JSON aiohttp sends for `json=payload` (json.dumps with default separators),
+- the compact JSON sent by api_processor (no whitespace),
+- the gzip-compressed compact JSON (KOUNT_GZIP_REQUESTS),
+along with the time taken to build and encode each payload.
+
+Usage:
+    KOUNT_API_KEY=... python bench_payload_size.py [--items 500] [--transactions 20]
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request is made)
+"""
+
+import argparse
+import copy
+import gzip
+import json
+import time
+
+from k360_jwt_auth.payload import build_payload
+
+TYPICAL_ORDER = {
+    "order_id": "2025021201",
+    "channel": "WEB",
+    "device_session_id": "6B29FC40-CA47-1067-B31D-00DD010662DA",
+    "creation_datetime": "2025-02-12T15:45:30.123Z",
+    "user_ip": "192.168.1.1",
+    "account_id": "user-001",
+    "account_type": "VIP",
+    "account_creation_datetime": "2024-01-10T10:15:30.000Z",
+    "username": "testuser",
+    "account_is_active": True,
+    "items": [
+        {
+            "price": "1000", "description": "High-end gaming mouse", "name": "GamerMouseX",
+            "quantity": 2, "category": "Electronics", "sub_category": "Peripherals",
+            "is_digital": False, "sku": "GMX-2024", "upc": "123456789012", "brand": "Logitech",
+            "url": "https://example.com/gamermousex", "image_url": "https://example.com/images/gamermousex.jpg",
+            "color": "Black", "size": "Medium", "weight": "200g", "height": "5cm", "width": "10cm",
+            "depth": "3cm", "descriptors": ["ergonomic", "RGB", "wireless"], "item_id": "itm-001",
+            "is_service": False,
+        },
+        {
+            "price": "5000", "description": "Annual subscription for software", "name": "ProSuite License",
+            "quantity": 1, "category": "Software", "sub_category": "Subscriptions", "is_digital": True,
+            "sku": "PRO-SUITE-1YR", "upc": None, "brand": "Adobe", "url": "https://example.com/prosuite",
+            "image_url": "https://example.com/images/prosuite.jpg", "item_id": "itm-002", "is_service": False,
+        },
+    ],
+    "fulfillment": [
+        {
+            "type": "SHIPPED",
+            "shipping": {"amount": "150", "provider": "UPS", "tracking_number": "1Z9999999999999999", "method": "EXPRESS"},
+            "recipient": {
+                "first": "John", "family": "Doe", "phone_number": "+15551234567",
+                "email_address": "john.doe@example.com",
+                "address": {
+                    "line1": "1234 Elm Street", "line2": "Apt 56", "city": "Los Angeles",
+                    "region": "CA", "postal_code": "90001", "country_code": "US",
+                },
+            },
+            "merchant_fulfillment_id": "FULF-001",
+            "digital_downloaded": False,
+        },
+        {
+            "type": "DIGITAL",
+            "accessUrl": "https://downloads.example.com/prosuite",
+            "merchant_fulfillment_id": "FULF-002",
+            "digital_downloaded": True,
+        },
+    ],
+    "transactions": [
+        {
+            "processor": "PayPal", "processor_merchant_id": "MERCH123",
+            "payment": {"type": "PYPL", "payment_token": "TOKEN123456", "bin": "411111", "last4": "1111"},
+            "subtotal": "6000", "order_total": "6150", "currency": "USD",
+            "tax": {"is_taxable": True, "taxable_country_code": "US", "tax_amount": "100", "out_of_state_tax_amount": "50"},
+            "billingPerson": {
+                "name": {"first": "William", "preferred": "Bill", "family": "Andrade"},
+                "phone": "+15555555555", "email": "john.doe@example.com",
+                "address": {
+                    "line1": "123 Main St", "line2": "Apt 4B", "city": "New York",
+                    "region": "NY", "postal_code": "10001", "country_code": "US",
+                },
+            },
+            "merchant_transaction_id": "TXN-789",
+        },
+        {
+            "processor": "Stripe", "processor_merchant_id": "STRIPE-987",
+            "payment": {"type": "CREDIT_CARD", "payment_token": "TOKEN654321", "bin": "550000", "last4": "2222"},
+            "subtotal": "5000", "order_total": "5100", "currency": "USD",
+            "tax": {"is_taxable": True, "taxable_country_code": "US", "tax_amount": "100"},
+            "merchant_transaction_id": "TXN-456",
+        },
+    ],
+    "custom_fields": {"specialInstruction": "Leave at the front door", "giftWrap": True},
+}
+
+
+def large_order(items: int, transactions: int) -> dict:
+    """
+    Builds a large B2B-style order by repeating the typical order's items and transactions.
+
+    Args:
+        items (int): Number of line items.
+        transactions (int): Number of transactions.
+
+    Returns:
+        dict: The order.
+    """
+    order = copy.deepcopy(TYPICAL_ORDER)
+    order["items"] = [
+        {**TYPICAL_ORDER["items"][i % 2], "item_id": f"itm-{i:05d}", "sku": f"SKU-{i:05d}"}
+        for i in range(items)
+    ]
+    order["transactions"] = [
+        {**TYPICAL_ORDER["transactions"][i % 2], "merchant_transaction_id": f"TXN-{i:05d}"}
+        for i in range(transactions)
+    ]
+    return order
+
+
+def measure(name: str, order: dict, rounds: int):
+    """Prints wire sizes and build/encode timings for one order."""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        payload = build_payload(order)
+    build_us = (time.perf_counter() - started) / rounds * 1e6
+
+    default_json = json.dumps(payload).encode("utf-8")
+    started = time.perf_counter()
+    for _ in range(rounds):
+        compact_json = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    encode_us = (time.perf_counter() - started) / rounds * 1e6
+    started = time.perf_counter()
+    for _ in range(rounds):
+        gzipped = gzip.compress(compact_json, compresslevel=6)
+    gzip_us = (time.perf_counter() - started) / rounds * 1e6
+
+    print(f"{name}:")
+    print(f"  json=payload (default separators): {len(default_json):>9,} bytes")
+    print(f"  compact JSON:                       {len(compact_json):>9,} bytes")
+    print(f"  gzip(compact JSON):                 {len(gzipped):>9,} bytes")
+    print(f"  build {build_us:,.1f} us, encode {encode_us:,.1f} us, gzip {gzip_us:,.1f} us")
+
+
+def main():
+    """Parses the command line and prints the report."""
+    parser = argparse.ArgumentParser(description="Report Kount payload sizes on the wire.")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--transactions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    measure("Typical order (2 items, 2 transactions)", TYPICAL_ORDER, args.rounds * 20)
+    measure(f"Large order ({args.items} items, {args.transactions} transactions)",
+            large_order(args.items, args.transactions), args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares the KOUNT_RESPONSE_MODE options of /process-transaction.
+
+Renders a representative Kount Orders API response the way `process_transaction`
+does in each mode (full, passthrough, projection) and prints, per request:
+- the bytes returned to the caller,
+- the CPU time spent extracting the decision and building the response.
+
+Usage:
+    KOUNT_API_KEY=... python bench_response_modes.py [--rounds 20000]
+
+    (api_processor is imported from ../payments/api, which requires KOUNT_API_KEY
+    to be set; no request is made)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "payments", "api"))
+
+from api_processor import KOUNT_RESPONSE_MODES, render_kount_response  # noqa: E402
+
+SAMPLE_RESPONSE = {
+    "version": "v2",
+    "order": {
+        "orderId": "K9R6ZKXYW5GP8F4T",
+        "merchantOrderId": "2025021201",
+        "channel": "WEB",
+        "deviceSessionId": "6B29FC40-CA47-1067-B31D-00DD010662DA",
+        "creationDateTime": "2025-02-12T15:45:30.123Z",
+        "riskInquiry": {
+            "decision": "APPROVE",
+            "omniscore": 72.4,
+            "reasonCode": "NO_RULES_TRIGGERED",
+            "persona": {
+                "uniqueCards": 1, "uniqueDevices": 2, "uniqueEmails": 1,
+                "riskiestCountry": "US", "totalBankApprovedOrders": 14, "totalBankDeclinedOrders": 0,
+                "maxVelocity": 3, "riskiestRegion": "CA",
+            },
+            "device": {
+                "id": "8a7b6c5d4e3f2a1b", "collectionDateTime": "2025-02-12T15:45:29.001Z",
+                "browser": "Chrome 121", "deviceAttributes": {"os": "macOS 14.3", "language": "en-US",
+                                                              "timezoneOffset": -480, "mobileSdkType": None},
+                "location": {"areaCode": "213", "city": "Los Angeles", "country": "US",
+                             "latitude": 34.05, "longitude": -118.24, "postalCode": "90001", "region": "CA"},
+                "tor": False, "proxy": False, "vpn": False,
+            },
+            "segmentExecuted": {
+                "segment": {"id": "seg-001", "name": "Default", "priority": 1},
+                "policies": [
+                    {"id": f"pol-{i:03d}", "name": f"Policy {i}", "type": "STANDARD",
+                     "outcome": {"type": "NONE", "value": None}, "critical": False}
+                    for i in range(12)
+                ],
+                "tags": ["low-risk", "returning-customer"],
+            },
+            "policySetExecuted": {"policySet": {"id": "ps-001", "name": "Production", "version": 42}},
+        },
+        "account": {"id": "user-001", "type": "VIP", "accountIsActive": True},
+        "transactions": [
+            {"processor": "PayPal", "payment": {"type": "PYPL", "bin": "411111", "last4": "1111"},
+             "subtotal": "6000", "orderTotal": "6150", "currency": "USD",
+             "merchantTransactionId": "TXN-789"},
+            {"processor": "Stripe", "payment": {"type": "CREDIT_CARD", "bin": "550000", "last4": "2222"},
+             "subtotal": "5000", "orderTotal": "5100", "currency": "USD",
+             "merchantTransactionId": "TXN-456"},
+        ],
+    },
+}
+
+
+def measure(mode: str, body: bytes, rounds: int):
+    """Prints response bytes and per-request CPU time for one mode."""
+    summary, response = render_kount_response(body, mode)
+    started = time.process_time()
+    for _ in range(rounds):
+        summary, response = render_kount_response(body, mode)
+        summary.decision
+    cpu_us = (time.process_time() - started) / rounds * 1e6
+    print(f"  {mode:<12} {len(response.body):>7,} bytes  {cpu_us:>7.1f} us CPU/request")
+
+
+def main():
+    """Parses the command line and prints the report."""
+    parser = argparse.ArgumentParser(description="Compare /process-transaction response modes.")
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    body = json.dumps(SAMPLE_RESPONSE).encode("utf-8")
+    print(f"Kount response: {len(body):,} bytes")
+    for mode in ("full", "passthrough", "projection"):
+        assert mode in KOUNT_RESPONSE_MODES
+        measure(mode, body, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Measures the per-call overhead of SyncKountClient against the native async path.
+
+Starts a local stand-in for the Kount Orders API in a child process, then sends
+the same risk inquiry:
+- natively: build_payload + encode + pooled transport request, awaited in a loop;
+- through SyncKountClient from one thread, and from several threads at once;
+- through `asyncio.run` per call, the pattern the sync client replaces.
+Reports mean latency per call and throughput for each.
+
+Usage:
+    KOUNT_API_KEY=... python bench_sync_client.py [--calls 2000] [--threads 8]
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request leaves the host)
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt as pyjwt
+from aiohttp import web
+
+from k360_jwt_auth.jwt_utils import token_manager
+from k360_jwt_auth.payload import build_payload
+from k360_jwt_auth.sync_client import SyncKountClient
+from k360_jwt_auth.transport import create_transport
+
+from bench_payload_size import TYPICAL_ORDER
+
+RESPONSE = {"order": {"orderId": "KBENCH", "riskInquiry": {"decision": "APPROVE"}}}
+
+
+def run_stand_in(port: int):
+    """Runs the aiohttp stand-in until the process is terminated."""
+    async def create(request):
+        await request.read()
+        return web.json_response(RESPONSE)
+
+    app = web.Application()
+    app.router.add_post("/commerce/v2/orders", create)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+async def native(url: str, calls: int) -> float:
+    """Sends `calls` risk inquiries on the caller's own loop and returns the elapsed seconds."""
+    transport = create_transport("aiohttp", 100, 30)
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token_manager.get_access_token()}"}
+    started = time.perf_counter()
+    for _ in range(calls):
+        body = json.dumps(build_payload(TYPICAL_ORDER), separators=(",", ":")).encode("utf-8")
+        response = await transport.request("POST", url, body, headers)
+        response.raise_for_status()
+        response.json()
+    elapsed = time.perf_counter() - started
+    await transport.close()
+    return elapsed
+
+
+def report(name: str, calls: int, elapsed: float):
+    print(f"{name:<28} {elapsed / calls * 1e6:8.0f} us/call {calls / elapsed:9,.0f} calls/s")
+
+
+def main():
+    """Parses the command line, starts the stand-in and runs each variant."""
+    parser = argparse.ArgumentParser(description="Benchmark SyncKountClient against the native async path.")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8281)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=run_stand_in, args=(args.port,), daemon=True)
+    server.start()
+    time.sleep(1.0)
+    url = f"http://127.0.0.1:{args.port}/commerce/v2/orders?riskInquiry=true"
+    # A token that does not expire during the run, so no auth server is needed
+    token_manager.set_access_token(pyjwt.encode({"exp": int(time.time()) + 3600}, "bench-signing-key-of-32-bytes-ok!",
+                                                algorithm="HS256"))
+    try:
+        report("native async", args.calls, asyncio.run(native(url, args.calls)))
+
+        with SyncKountClient(url, timeout=30) as client:
+            client.risk_inquiry(TYPICAL_ORDER)
+            started = time.perf_counter()
+            for _ in range(args.calls):
+                client.risk_inquiry(TYPICAL_ORDER)
+            report("SyncKountClient, 1 thread", args.calls, time.perf_counter() - started)
+
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                started = time.perf_counter()
+                list(pool.map(lambda _: client.risk_inquiry(TYPICAL_ORDER), range(args.calls)))
+                report(f"SyncKountClient, {args.threads} threads", args.calls, time.perf_counter() - started)
+
+        per_call = max(1, args.calls // 10)
+        started = time.perf_counter()
+        for _ in range(per_call):
+            asyncio.run(native(url, 1))
+        report("asyncio.run per call", per_call, time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
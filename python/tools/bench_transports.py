@@ -0,0 +1,188 @@
+"""
+Compares the aiohttp (HTTP/1.1) and httpx-h2 (HTTP/2) Kount transports.
+
+Starts a local TLS stand-in for the Kount Orders API (hypercorn, which speaks
+both HTTP/1.1 and HTTP/2 and picks one via ALPN) in a child process, then sends
+the same number of order POSTs through each transport at a fixed concurrency
+and reports throughput, latency percentiles and how many TCP/TLS connections the
+stand-in saw.
+
+Usage:
+    KOUNT_API_KEY=... python bench_transports.py [--requests 5000] [--concurrency 200] [--latency-ms 20]
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request leaves the host)
+
+Dependencies:
+- hypercorn and httpx[http2] (benchmark only): pip install hypercorn 'httpx[http2]'
+"""
+
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from k360_jwt_auth.transport import create_transport
+
+from bench_payload_size import TYPICAL_ORDER
+from k360_jwt_auth.payload import build_payload
+
+
+def write_self_signed_cert(directory: str):
+    """
+    Writes a self-signed certificate for 127.0.0.1 and its key.
+
+    Args:
+        directory (str): Where to write cert.pem and key.pem.
+
+    Returns:
+        tuple: (cert path, key path). The cert doubles as the CA file for the clients.
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as handle:
+        handle.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as handle:
+        handle.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+# ---------------------------
+# Kount Stand-in
+# ---------------------------
+
+def run_stand_in(port: int, cert_path: str, key_path: str, latency: float):
+    """Runs the hypercorn stand-in until the process is terminated."""
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    connections = set()
+    versions = {}
+    response_body = json.dumps({"order": {"orderId": "KBENCH", "riskInquiry": {"decision": "APPROVE"}}}).encode()
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["path"] == "/stats":
+            body = json.dumps({"connections": len(connections), "versions": versions}).encode()
+            connections.clear()
+            versions.clear()
+        else:
+            connections.add(tuple(scope["client"]))
+            versions[scope["http_version"]] = versions.get(scope["http_version"], 0) + 1
+            while (await receive()).get("more_body"):
+                pass
+            await asyncio.sleep(latency)
+            body = response_body
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile = cert_path
+    config.keyfile = key_path
+    config.keep_alive_timeout = 60
+    config.keep_alive_max_requests = 10_000_000  # hypercorn sends GOAWAY after 1,000 requests by default
+    config.h2_max_concurrent_streams = 1000
+    config.accesslog = None
+    asyncio.run(serve(app, config))
+
+
+# ---------------------------
+# Driver
+# ---------------------------
+
+async def drive(name: str, url: str, ca_file: str, requests: int, concurrency: int, max_connections: int):
+    """Sends `requests` POSTs through one transport and prints the results."""
+    transport = create_transport(name, max_connections, timeout=30, ca_file=ca_file)
+    body = json.dumps(build_payload(TYPICAL_ORDER), separators=(",", ":")).encode()
+    headers = {"Content-Type": "application/json", "Authorization": "Bearer bench"}
+    in_flight = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def send_one():
+        nonlocal errors
+        async with in_flight:
+            started = time.perf_counter()
+            try:
+                response = await transport.request("POST", url, body, headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send_one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    open_connections = transport.stats()
+    stand_in = (await transport.request("GET", url.split("/commerce/")[0] + "/stats")).json()
+    await transport.close()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) >= 2 else [0.0] * 99
+    print(f"{name}:")
+    print(f"  {len(latencies)} ok, {errors} errors in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"  latency ms: p50={cuts[49] * 1000:.1f} p90={cuts[89] * 1000:.1f} p99={cuts[98] * 1000:.1f}")
+    print(f"  connections seen by stand-in: {stand_in['connections']} {stand_in['versions']}")
+    print(f"  transport: {open_connections}")
+
+
+def main():
+    """Parses the command line, starts the stand-in and drives both transports."""
+    parser = argparse.ArgumentParser(description="Compare HTTP/1.1 and HTTP/2 Kount transports.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency injected by the stand-in.")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--h1-connections", type=int, default=200, help="aiohttp connection limit.")
+    parser.add_argument("--h2-connections", type=int, default=4, help="httpx-h2 connection limit.")
+    parser.add_argument("--transports", nargs="+", default=["aiohttp", "httpx-h2"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = write_self_signed_cert(directory)
+        server = multiprocessing.Process(target=run_stand_in, daemon=True,
+                                         args=(args.port, cert_path, key_path, args.latency_ms / 1000))
+        server.start()
+        time.sleep(1.5)
+        url = f"https://127.0.0.1:{args.port}/commerce/v2/orders"
+        try:
+            print(f"{args.requests} requests, concurrency {args.concurrency}, "
+                  f"{args.latency_ms:g} ms stand-in latency")
+            for name in args.transports:
+                max_connections = args.h2_connections if name == "httpx-h2" else args.h1_connections
+                asyncio.run(drive(name, url, cert_path, args.requests, args.concurrency, max_connections))
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
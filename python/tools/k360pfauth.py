@@ -1,208 +1,274 @@
 """
-Asynchronous Python module for managing JWT authentication and integrating
-with the Kount API, using a singleton class for token management.
+Bulk order replay/backfill CLI for the Kount API.
 
 Features:
-- Fetching and refreshing JWTs from an authentication server.
-- Proactive token refresh with a timer to ensure tokens don't expire during use.
-- Reactive token refresh when a 401 Unauthorized error occurs during API calls.
-- Integration with the Kount API for risk analysis.
+- Submits through K360Client, which owns the pooled connections, the JWT
+  lifecycle (fetch plus proactive refresh) and the retry policy.
+- Streams an NDJSON or CSV order export through `build_payload` and submits
+  the orders with bounded concurrency at a target rate.
+- Records one NDJSON result line per order and checkpoints progress so an
+  interrupted run can be resumed; memory use is independent of file size.
 
-Dependencies:
-- aiohttp: For asynchronous HTTP requests.
-- jwt: For decoding JWT tokens.
+Usage:
+    python k360pfauth.py orders.ndjson --results results.ndjson --rate 20 --concurrency 8
+    python k360pfauth.py orders.csv --results results.ndjson --resume
+
+    CSV exports use the same field names as /process-transaction bodies; nested
+    fields (items, fulfillment, transactions, custom_fields) hold JSON text.
+
+    Credentials and URLs come from the k360_jwt_auth environment variables
+    (KOUNT_API_KEY, KOUNT_AUTH_SERVER_URL, KOUNT_API_ENDPOINT). --dry-run only
+    builds payloads and does not need KOUNT_API_KEY.
 
-Constants:
-- REFRESH_TIME_BUFFER: Buffer time before token expiration to trigger refresh.
-- AUTH_SERVER_URL: URL for the authentication server.
-- KOUNT_API_ENDPOINT: URL for the Kount API endpoint.
+Dependencies:
+- k360_jwt_auth: For `K360Client` and `build_payload`.
 """
 
+import argparse
 import asyncio
-from datetime import datetime
+import csv
+from datetime import datetime, timezone
+import json
 import os
+import sys
 import time
-import jwt
-import aiohttp
-
-# Constants
-REFRESH_TIME_BUFFER = 2 * 60  # Refresh 2 minutes before expiry
-AUTH_SERVER_URL = "https://login-uat.equifax.com/as/token"
-KOUNT_API_ENDPOINT = "https://api-sandbox.kount.com/commerce/v2/orders?riskInquiry=true"
 
-# Credentials
-API_KEY = os.getenv("API_KEY")
+if "--dry-run" in sys.argv[1:]:
+    # Importing k360_jwt_auth requires an API key; a dry run never uses it
+    os.environ.setdefault("KOUNT_API_KEY", "dry-run")
 
+from k360_jwt_auth.client import K360Client
+from k360_jwt_auth.exceptions import TransportError, TransportStatusError
+from k360_jwt_auth.payload import build_payload
 
-class TokenManager:
-    """Singleton class to manage access tokens."""
+# Nested /process-transaction fields that CSV exports carry as JSON text
+CSV_JSON_FIELDS = {"items", "fulfillment", "transactions", "custom_fields"}
+CSV_BOOL_FIELDS = {"account_is_active"}
 
-    _instance = None
 
-    def __new__(cls, *args, **kwargs):
-        """Ensure only one instance of TokenManager exists."""
-        if not cls._instance:
-            cls._instance = super(TokenManager, cls).__new__(cls, *args, **kwargs)
-        return cls._instance
+def iter_orders(path: str, input_format: str, skip: int = 0):
+    """
+    Streams orders from an NDJSON or CSV export, one record at a time.
 
-    def __init__(self):
-        """Initialize the access token."""
-        # Initialize access_token if it hasn't been already.
-        if not hasattr(self, "access_token"):
-            self.access_token = None
+    Args:
+        path (str): The export file.
+        input_format (str): "ndjson" or "csv".
+        skip (int): Number of leading records to skip (already processed).
 
-    def get_access_token(self):
-        """Retrieve the current access token."""
-        return self.access_token
+    Yields:
+        tuple: (record index, order dict, or the parse error as an Exception).
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if input_format == "csv":
+            records = csv.DictReader(handle)
+        else:
+            records = (line for line in handle if line.strip())
+        for index, record in enumerate(records):
+            if index < skip:
+                continue
+            try:
+                yield index, parse_csv_row(record) if input_format == "csv" else json.loads(record)
+            except (ValueError, TypeError) as e:
+                yield index, e
 
-    def set_access_token(self, token):
-        """Set a new access token."""
-        self.access_token = token
 
+def parse_csv_row(row: dict) -> dict:
+    """
+    Converts a CSV export row into an order dict like a /process-transaction body.
 
-# Create a single instance of TokenManager
-token_manager = TokenManager()
+    Empty cells are dropped, nested fields are decoded from JSON text and
+    boolean fields accept true/false.
 
+    Args:
+        row (dict): The row from csv.DictReader.
 
-async def fetch_or_refresh_token():
+    Returns:
+        dict: The order.
     """
-    Fetch the initial JWT or refresh the existing JWT from the authentication server.
+    order = {}
+    for key, value in row.items():
+        if key is None or value is None or value == "":
+            continue
+        if key in CSV_JSON_FIELDS:
+            order[key] = json.loads(value)
+        elif key in CSV_BOOL_FIELDS:
+            order[key] = value.strip().lower() == "true"
+        else:
+            order[key] = value
+    return order
 
-    Uses client credentials grant type to request the token.
-    """
-    async with aiohttp.ClientSession() as session:
-        try:
-            params = {
-                "grant_type": "client_credentials",
-                "scope": "k1_integration_api"
-            }
-            headers = {
-                "Authorization": f"Basic {API_KEY}",
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-            async with session.post(AUTH_SERVER_URL,
-                                    params=params,
-                                    headers=headers,
-                                    timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-                token_manager.set_access_token(data["access_token"])
-                print("Token obtained:", token_manager.get_access_token())
-        except Exception as e:
-            print("Failed to obtain token:", e)
-            raise e
-
-
-async def start_token_refresh_timer():
-    """
-    Start a background timer to proactively refresh the JWT before it expires.
 
-    The timer calculates the token's expiration time and refreshes it with a buffer
-    to ensure continuous availability.
+class Checkpoint:
     """
-    while True:
-        current_token = token_manager.get_access_token()
-        try:
-            decoded = jwt.decode(current_token, options={"verify_signature": False})
-            exp_time = decoded['exp'] - REFRESH_TIME_BUFFER
-            
-            # Convert to human-readable time
-            readable_time = datetime.fromtimestamp(exp_time).strftime('%Y-%m-%d %H:%M:%S')
-            print(f"Token expires at: {readable_time} UTC")
-            
-            time_until_refresh = exp_time - int(time.time())
-        except jwt.DecodeError:
-            print("Failed to decode JWT; refreshing immediately.")
-            time_until_refresh = 0
-        if time_until_refresh > 0:
-            print(f"Current time: {int(time.time())}, Expiration time: {exp_time}, Time until refresh: {time_until_refresh}")
-            await asyncio.sleep(time_until_refresh)
-        await fetch_or_refresh_token()
-
-
-async def kount_api_request(session):
+    Tracks the contiguous prefix of completed records and persists it to disk.
+
+    Results can finish out of order, so only the index below which every record is
+    done is saved; on resume, the few records past it that had already finished
+    are submitted again.
+
+    Attributes:
+        next_index (int): Every record before this index has a result.
     """
-    Perform a POST request to the Kount API with a JSON payload.
 
-    Logs details about the error if a 400 status code is returned.
+    def __init__(self, path: str, next_index: int = 0):
+        self.path = path
+        self.next_index = next_index
+        self._done = set()
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        """Loads the checkpoint at `path`, or starts from the beginning if it does not exist."""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, encoding="utf-8") as handle:
+            return cls(path, json.load(handle)["next_index"])
+
+    def mark_done(self, index: int):
+        """Marks a record as done and advances the contiguous watermark."""
+        self._done.add(index)
+        while self.next_index in self._done:
+            self._done.remove(self.next_index)
+            self.next_index += 1
+
+    def save(self):
+        """Atomically writes the watermark to disk."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"next_index": self.next_index, "updated": datetime.now(timezone.utc).isoformat()}, handle)
+        os.replace(tmp_path, self.path)
+
+
+async def submit_order(client: K360Client, payload: dict) -> dict:
     """
-    headers = {
-        'Authorization': f'Bearer {token_manager.get_access_token()}',
-        'Content-Type': 'application/json'
-    }
-    payload = """
-    {
-        "merchantOrderId": "d121ea2210434ffc8a90daff9cc97e76",
-        "channel": "SPHERE",
-        "deviceSessionId": "12345",
-        "creationDateTime": "2019-08-24T14:15:22Z",
-        "userIp": "192.168.0.1",
-        "account": {
-            "id": "d121ea2210434ffc8a90daff9cc97e76",
-            "type": "PRO_ACCOUNT",
-            "creationDateTime": "2019-08-24T14:15:22Z",
-            "username": "johndoe1983",
-            "accountIsActive": true
-        },
-        "items": [
-            {
-                "price": "100",
-                "description": "Samsung 46\\\" LCD HDTV",
-                "name": "LN46B610",
-                "quantity": "1",
-                "category": "TV",
-                "subCategory": "OLED TV",
-                "isDigital": true,
-                "sku": "TSH-000-S",
-                "upc": "03600029145",
-                "brand": "LG",
-                "url": "https://www.example.com/store/tsh-000-s",
-                "imageUrl": "https://www.example.com/store/tsh-000-s/thumbnail.png"
-            }
-        ]
-    }
+    Submits one order to the Kount API and summarises the outcome.
+
+    Args:
+        client (K360Client): The shared, started client.
+        payload (dict): The payload from `build_payload`.
+
+    Returns:
+        dict: HTTP status, decision, Kount order ID and, for failed orders, an error.
     """
     try:
-        async with session.post(KOUNT_API_ENDPOINT, data=payload, headers=headers) as response:
-            if response.status == 400:
-                error_details = await response.text()
-                print("Kount API Error Response:", error_details)
-                raise Exception(f"Kount API Error: {error_details}")
-            response.raise_for_status()
-            return await response.text()
-    except Exception as e:
-        print("HTTP error during Kount API call:", e)
-        raise
-
-async def main():
+        response = await client.send("POST", client.endpoint.url, client.encode_payload(payload))
+    except TransportStatusError as e:
+        return {"status": e.status, "error": e.message}
+    except TransportError as e:
+        return {"status": None, "error": f"{type(e).__name__}: {e}"}
+    try:
+        order = response.json().get("order") or {}
+        decision = (order.get("riskInquiry") or {}).get("decision")
+        kount_order_id = order.get("orderId")
+    except (ValueError, AttributeError) as e:
+        return {"status": response.status, "error": f"Invalid response body: {e}"}
+    return {"status": response.status, "decision": decision, "kountOrderId": kount_order_id}
+
+
+async def backfill(args):
     """
-    Main asynchronous function to manage the application workflow.
+    Streams the export through `build_payload` and submits each order.
 
-    - Fetch the initial JWT.
-    - Start the token refresh timer.
-    - Perform the Kount API request.
+    Records are read lazily and at most `concurrency` submissions are in flight,
+    paced to `rate` orders per second, so memory stays constant for any file size.
     """
-    start_time = time.time()
-    await fetch_or_refresh_token()
-    asyncio.create_task(start_token_refresh_timer())
+    input_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "ndjson")
+    checkpoint_path = args.checkpoint or f"{args.results}.checkpoint"
+    checkpoint = Checkpoint.load(checkpoint_path) if args.resume else Checkpoint(checkpoint_path)
+    if checkpoint.next_index:
+        print(f"Resuming at record {checkpoint.next_index}")
+
+    client = K360Client(max_connections=args.concurrency, max_attempts=args.max_attempts)
+    if not args.dry_run:
+        await client.start()
+
+    in_flight = asyncio.Semaphore(args.concurrency)
+    pending = set()
+    counts = {"submitted": 0, "invalid": 0, "failed": 0}
+    start_time = time.monotonic()
+    last_save = start_time
+
+    with open(args.results, "a" if args.resume else "w", encoding="utf-8") as results:
 
-    async with aiohttp.ClientSession() as session:
-        for i in range(10):  # Call the API 50 times for testing
-            print(f"Making Kount API call #{i + 1}")
+        def record(index, result):
+            nonlocal last_save
+            results.write(json.dumps({"index": index, **result}) + "\n")
+            checkpoint.mark_done(index)
+            now = time.monotonic()
+            if now - last_save >= args.checkpoint_interval:
+                results.flush()
+                checkpoint.save()
+                last_save = now
+
+        async def process(index, payload):
+            started = time.monotonic()
             try:
-                response = await kount_api_request(session)
-                print("Kount API Response:", response)
-            except aiohttp.ClientError as e:
-                print("HTTP error during Kount API call:", e)
-            except jwt.DecodeError as e:
-                print("JWT decode error during Kount API call:", e)
+                result = await submit_order(client, payload)
             except Exception as e:
-                print("Unexpected error during Kount API call:", e)
-                
-            await asyncio.sleep(4 * 60)  # 1-second delay between API calls for testing
+                # Every record must get a result, or the checkpoint watermark stops advancing
+                result = {"status": None, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                in_flight.release()
+            if "error" in result:
+                counts["failed"] += 1
+            result["merchantOrderId"] = payload.get("merchantOrderId")
+            result["latencyMs"] = round((time.monotonic() - started) * 1000, 1)
+            record(index, result)
+
+        try:
+            sent = 0
+            for index, order in iter_orders(args.input, input_format, checkpoint.next_index):
+                try:
+                    if isinstance(order, Exception):
+                        raise order
+                    payload = build_payload(order)
+                except (ValueError, TypeError, KeyError, AttributeError) as e:
+                    counts["invalid"] += 1
+                    record(index, {"status": None, "error": f"Invalid order: {e}"})
+                    continue
+
+                if args.dry_run:
+                    record(index, {"status": None, "merchantOrderId": payload.get("merchantOrderId"), "dryRun": True})
+                    continue
+
+                delay = start_time + sent / args.rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await in_flight.acquire()
+                task = asyncio.create_task(process(index, payload))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                sent += 1
+                counts["submitted"] += 1
+
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            await client.close()
+            results.flush()
+            checkpoint.save()
+
+    elapsed = time.monotonic() - start_time
+    print(
+        f"Submitted {counts['submitted']} orders ({counts['failed']} failed, {counts['invalid']} invalid) "
+        f"in {elapsed:.1f}s; checkpoint at record {checkpoint.next_index}"
+    )
+
+
+def main():
+    """Parses the command line and runs the backfill."""
+    parser = argparse.ArgumentParser(description="Replay or backfill orders through the Kount API.")
+    parser.add_argument("input", help="NDJSON or CSV order export.")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Input format (default: from the file extension).")
+    parser.add_argument("--results", default="backfill_results.ndjson", help="NDJSON file receiving one result per order.")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <results>.checkpoint).")
+    parser.add_argument("--checkpoint-interval", type=float, default=1.0, help="Seconds between checkpoint writes.")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint and append to the results.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum orders in flight.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per order on retryable errors.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Target orders per second.")
+    parser.add_argument("--dry-run", action="store_true", help="Build payloads without calling the Kount API.")
+    asyncio.run(backfill(parser.parse_args()))
 
-    end_time = time.time()
-    print(f"Total execution time: {end_time - start_time} seconds")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
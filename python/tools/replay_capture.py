@@ -0,0 +1,319 @@
+"""
+Deterministic replay of captured traffic for comparing builds on real order shapes.
+
+A capture file comes from running api_processor with KOUNT_CAPTURE_SAMPLE_RATE
+set (see k360_jwt_auth.capture): redacted /process-transaction bodies, their
+arrival times and the upstream Kount attempts observed for each. This tool
+plays both sides of a local run:
+
+- `serve` runs a Kount stand-in (auth server, Orders API and the endpoint probe
+  path) that answers each order, by merchantOrderId, with the recorded
+  attempts in order: the same status after the same latency. Orders missing
+  from the capture get a latency drawn from the recorded distribution with a
+  seed derived from the order ID, so every run sees the same upstream.
+- `replay` sends the captured requests to the instance under test at their
+  original spacing (or `--speed` times faster; 0 sends as fast as
+  `--concurrency` allows), then reports throughput, latency percentiles and
+  statuses. `--results` saves the summary and `--compare` prints the change
+  against a saved summary from another build.
+
+Usage:
+    KOUNT_API_KEY=replay python replay_capture.py serve --capture kount_capture.ndjson.gz --port 8300
+
+    # In another shell, start the build under test against the stand-in:
+    export KOUNT_API_KEY=replay
+    export KOUNT_AUTH_SERVER_URL=http://127.0.0.1:8300/as/token
+    export KOUNT_API_ENDPOINTS="http://127.0.0.1:8300/commerce/v2/orders?riskInquiry=true"
+    uvicorn api_processor:app --port 8000
+
+    KOUNT_API_KEY=replay python replay_capture.py replay --capture kount_capture.ndjson.gz \\
+        --stand-in http://127.0.0.1:8300 --speed 4 --results build_b.json --compare build_a.json
+
+    (importing k360_jwt_auth requires KOUNT_API_KEY to be set; no request leaves the host)
+
+Dependencies:
+- aiohttp, PyJWT (already required by k360_jwt_auth).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import statistics
+import time
+
+import aiohttp
+import jwt
+from aiohttp import web
+
+from k360_jwt_auth.capture import read_capture
+
+# Constants
+STAND_IN_TOKEN_SECRET = "k360-replay-stand-in-token-secret"
+DEFAULT_TARGET_URL = "http://127.0.0.1:8000"
+
+
+def load_capture(path: str) -> list:
+    """
+    Loads a capture file, ordered by arrival time.
+
+    Records are written when requests finish, so they are sorted back into the
+    order they arrived in.
+
+    Args:
+        path (str): The gzip NDJSON capture file.
+
+    Returns:
+        list: The captured requests.
+    """
+    return sorted(read_capture(path), key=lambda record: record["ts"])
+
+
+# ---------------------------
+# Kount Stand-in
+# ---------------------------
+
+class RecordedUpstream:
+    """
+    Recorded upstream attempts by merchant order ID, replayed in order.
+
+    Attributes:
+        attempts (dict): [status, milliseconds] lists keyed by merchant order ID.
+        latencies (list): Every recorded latency, in milliseconds, for orders not in the capture.
+    """
+
+    def __init__(self, records: list, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.attempts = {}
+        self.latencies = []
+        for record in records:
+            order_id = record["body"].get("order_id") if isinstance(record["body"], dict) else None
+            if order_id is None:
+                continue
+            self.attempts.setdefault(str(order_id), []).extend(record["upstream"])
+            self.latencies.extend(ms for _, ms in record["upstream"])
+        self.reset()
+
+    def reset(self):
+        """Starts every order's attempts from the beginning again."""
+        self._cursors = {}
+
+    def next_attempt(self, order_id: str) -> tuple:
+        """
+        Returns the status and latency for the next call for an order.
+
+        Args:
+            order_id (str): The merchantOrderId of the Kount payload.
+
+        Returns:
+            tuple: (status or None for a failed call, seconds).
+        """
+        recorded = self.attempts.get(order_id)
+        if recorded:
+            cursor = self._cursors.get(order_id, 0)
+            self._cursors[order_id] = cursor + 1
+            status, ms = recorded[cursor % len(recorded)]
+        else:
+            seed = int.from_bytes(hashlib.sha256(order_id.encode("utf-8")).digest()[:8], "big")
+            status, ms = 200, random.Random(seed).choice(self.latencies or [10.0])
+        return status, ms / 1000 * self.latency_scale
+
+
+def build_stand_in_app(upstream: RecordedUpstream) -> web.Application:
+    """
+    Builds the stand-in for the Kount auth server and Orders API.
+
+    Args:
+        upstream (RecordedUpstream): The recorded attempts to reproduce.
+
+    Returns:
+        web.Application: The aiohttp application.
+    """
+    async def token(request):
+        # Only `exp` is read by the API; the token is never verified
+        expires = int(time.time()) + 20 * 60
+        access_token = jwt.encode({"exp": expires, "sub": "replay"}, STAND_IN_TOKEN_SECRET, algorithm="HS256")
+        return web.json_response({"access_token": access_token, "token_type": "Bearer", "expires_in": 20 * 60})
+
+    async def create(request):
+        payload = json.loads(await request.read())
+        order_id = str(payload.get("merchantOrderId"))
+        status, seconds = upstream.next_attempt(order_id)
+        await asyncio.sleep(seconds)
+        if status is None:
+            return web.Response(status=504, reason="Gateway Timeout (recorded failure)")
+        if status >= 400:
+            return web.json_response({"error": "recorded status"}, status=status)
+        kount_order_id = "R" + hashlib.sha256(order_id.encode("utf-8")).hexdigest()[:12].upper()
+        return web.json_response({"order": {
+            "orderId": kount_order_id,
+            "merchantOrderId": order_id,
+            "riskInquiry": {"decision": "APPROVE", "omniscore": 80.0},
+        }}, status=status)
+
+    async def patch(request):
+        await request.read()
+        return web.json_response({"order": {"orderId": request.match_info["order_id"]}})
+
+    async def probe(request):
+        return web.Response(status=200)
+
+    async def reset(request):
+        upstream.reset()
+        return web.json_response({"reset": True})
+
+    app = web.Application(client_max_size=100 * 1024 * 1024)
+    app.router.add_post("/as/token", token)
+    app.router.add_post("/commerce/v2/orders", create)
+    app.router.add_patch("/commerce/v2/orders/{order_id}", patch)
+    app.router.add_post("/_replay/reset", reset)
+    app.router.add_get("/", probe)
+    return app
+
+
+def serve(args):
+    """Runs the Kount stand-in until interrupted."""
+    upstream = RecordedUpstream(load_capture(args.capture), args.latency_scale)
+    base_url = f"http://{args.host}:{args.port}"
+    print(f"Reproducing {sum(map(len, upstream.attempts.values()))} recorded attempts for {len(upstream.attempts)} orders")
+    print("Start the API under test with:")
+    print("  export KOUNT_API_KEY=replay")
+    print(f"  export KOUNT_AUTH_SERVER_URL={base_url}/as/token")
+    print(f'  export KOUNT_API_ENDPOINTS="{base_url}/commerce/v2/orders?riskInquiry=true"')
+    web.run_app(build_stand_in_app(upstream), host=args.host, port=args.port, print=None)
+
+
+# ---------------------------
+# Replay Driver
+# ---------------------------
+
+def summarise(latencies: list, statuses: dict, elapsed: float) -> dict:
+    """
+    Summarises a replay run.
+
+    Args:
+        latencies (list): Seconds per request that received a response.
+        statuses (dict): Response count by status (or error name).
+        elapsed (float): Seconds from the first send to the last response.
+
+    Returns:
+        dict: Requests, throughput, latency percentiles in milliseconds and statuses.
+    """
+    summary = {
+        "requests": sum(statuses.values()),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary.update({
+            "p50_ms": round(cuts[49] * 1000, 3),
+            "p90_ms": round(cuts[89] * 1000, 3),
+            "p99_ms": round(cuts[98] * 1000, 3),
+            "max_ms": round(max(latencies) * 1000, 3),
+        })
+    return summary
+
+
+def print_comparison(summary: dict, baseline: dict):
+    """Prints each metric next to the baseline's, with the relative change."""
+    print("Metric            baseline      this run     change")
+    for metric in ("throughput_rps", "p50_ms", "p90_ms", "p99_ms", "max_ms"):
+        before, after = baseline.get(metric), summary.get(metric)
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"{metric:<16} {before:>10.2f} {after:>13.2f} {change:>10}")
+
+
+async def replay(args):
+    """
+    Sends the captured requests at their recorded spacing divided by `speed`.
+
+    Sends are scheduled open-loop, so a slow build shows up as latency rather than
+    as a lower offered rate, up to `concurrency` in flight.
+    """
+    records = load_capture(args.capture)
+    if not records:
+        print("The capture is empty")
+        return
+    in_flight = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = {}
+
+    async def send_one(session, record):
+        body = json.dumps(record["body"], separators=(",", ":")).encode("utf-8")
+        headers = {**record.get("headers", {}), "Content-Type": "application/json"}
+        started = time.perf_counter()
+        try:
+            async with session.request(record["method"], args.target + record["path"], data=body,
+                                       headers=headers) as response:
+                await response.read()
+                status = response.status
+            latencies.append(time.perf_counter() - started)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        finally:
+            in_flight.release()
+        statuses[status] = statuses.get(status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if args.stand_in:
+            async with session.post(args.stand_in + "/_replay/reset") as response:
+                response.raise_for_status()
+        first_ts = records[0]["ts"]
+        tasks = []
+        started = time.perf_counter()
+        for record in records:
+            if args.speed > 0:
+                delay = started + (record["ts"] - first_ts) / args.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(send_one(session, record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    summary = summarise(latencies, statuses, elapsed)
+    print(json.dumps(summary, indent=2))
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            print_comparison(summary, json.load(handle))
+
+
+def main():
+    """Parses the command line and runs the selected subcommand."""
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a local API and Kount stand-in.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run a Kount stand-in reproducing the recorded upstream.")
+    serve_parser.add_argument("--capture", required=True, help="Capture file (gzip NDJSON).")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8300)
+    serve_parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latencies.")
+
+    replay_parser = subparsers.add_parser("replay", help="Send the captured requests to the API under test.")
+    replay_parser.add_argument("--capture", required=True, help="Capture file (gzip NDJSON).")
+    replay_parser.add_argument("--target", default=DEFAULT_TARGET_URL, help="Base URL of the API under test.")
+    replay_parser.add_argument("--stand-in", help="Base URL of the stand-in, reset before the run.")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Replay this many times faster than recorded; 0 sends as fast as possible.")
+    replay_parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight.")
+    replay_parser.add_argument("--results", help="Write the run summary to this JSON file.")
+    replay_parser.add_argument("--compare", help="Summary JSON of a baseline run to compare against.")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
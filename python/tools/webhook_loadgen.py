@@ -0,0 +1,270 @@
+"""
+Signed-webhook load generator for the Kount360 webhook receiver (webhook_server.py).
+
+The receiver only accepts events signed with the key served by the Kount ENS
+`public-key` endpoint, so this tool plays both sides:
+
+- `serve` creates (or reuses) a local RSA keypair and runs a stand-in for the Kount
+  auth server and the ENS `public-key` endpoint that serves the public half.
+- `drive` signs generated `Order.StatusChange` events with the private half
+  (RSA-PSS/SHA-256 over timestamp + body, as `verify_signature` expects) and sends
+  them to the receiver at a fixed rate, then reports accepted events per second and
+  latency percentiles.
+
+Usage:
+    python webhook_loadgen.py serve --key-file loadgen_key.pem --port 8100
+
+    # In another shell, start the receiver against the stand-in:
+    export KOUNT_API_KEY=loadgen KOUNT_CLIENT_ID=loadgen
+    export KOUNT_AUTH_SERVER_URL=http://127.0.0.1:8100/as/token
+    export KOUNT_PUBLIC_KEY_URL_TEMPLATE=http://127.0.0.1:8100/api/developer/ens/client/{}/public-key
+    uvicorn webhook_server:app --port 8000
+
+    python webhook_loadgen.py drive --key-file loadgen_key.pem --rate 500 --duration 30
+
+Dependencies:
+- aiohttp, cryptography, PyJWT (already required by k360_jwt_auth).
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+import jwt
+from aiohttp import web
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# Constants
+STAND_IN_TOKEN_SECRET = "k360-loadgen-stand-in-token-secret"
+DEFAULT_KEY_FILE = "loadgen_key.pem"
+DEFAULT_RECEIVER_URL = "http://127.0.0.1:8000/kount360WebhookReceiver"
+STATUS_TRANSITIONS = [("REVIEW", "APPROVE"), ("REVIEW", "DECLINE"), ("APPROVE", "DECLINE"), ("REVIEW", "ESCALATE")]
+PSS_PADDING = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=hashes.SHA256().digest_size)
+
+
+def load_or_create_key(key_file: str) -> rsa.RSAPrivateKey:
+    """
+    Loads the RSA private key from `key_file`, creating a 2048-bit key if it does not exist.
+
+    Args:
+        key_file (str): Path to the PEM-encoded private key.
+
+    Returns:
+        rsa.RSAPrivateKey: The private key.
+    """
+    if os.path.exists(key_file):
+        with open(key_file, "rb") as handle:
+            return serialization.load_pem_private_key(handle.read(), password=None)
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(key_file, "wb") as handle:
+        handle.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+    print(f"Created RSA keypair in {key_file}")
+    return private_key
+
+
+def public_key_b64(private_key: rsa.RSAPrivateKey) -> str:
+    """Returns the base64-encoded DER public key, the format the ENS endpoint serves."""
+    der = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return base64.b64encode(der).decode()
+
+
+# ---------------------------
+# Kount Stand-in
+# ---------------------------
+
+def build_stand_in_app(private_key: rsa.RSAPrivateKey) -> web.Application:
+    """
+    Builds the stand-in for the Kount auth server and the ENS public-key endpoint.
+
+    Args:
+        private_key (rsa.RSAPrivateKey): The key whose public half is served.
+
+    Returns:
+        web.Application: The aiohttp application.
+    """
+    encoded_key = public_key_b64(private_key)
+
+    async def token(request):
+        # Only `exp` is read by the receiver; the token is never verified
+        expires = int(time.time()) + 20 * 60
+        access_token = jwt.encode({"exp": expires, "sub": "loadgen"}, STAND_IN_TOKEN_SECRET, algorithm="HS256")
+        return web.json_response({"access_token": access_token, "token_type": "Bearer", "expires_in": 20 * 60})
+
+    async def public_key(request):
+        valid_until = datetime.now(timezone.utc) + timedelta(days=1)
+        return web.json_response({
+            "publicKey": encoded_key,
+            "validUntil": valid_until.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+
+    app = web.Application()
+    app.router.add_post("/as/token", token)
+    app.router.add_get("/api/developer/ens/client/{client_id}/public-key", public_key)
+    return app
+
+
+def serve(args):
+    """Runs the Kount stand-in until interrupted."""
+    private_key = load_or_create_key(args.key_file)
+    base_url = f"http://{args.host}:{args.port}"
+    print("Start the receiver with:")
+    print("  export KOUNT_API_KEY=loadgen KOUNT_CLIENT_ID=loadgen")
+    print(f"  export KOUNT_AUTH_SERVER_URL={base_url}/as/token")
+    print(f"  export KOUNT_PUBLIC_KEY_URL_TEMPLATE={base_url}/api/developer/ens/client/{{}}/public-key")
+    web.run_app(build_stand_in_app(private_key), host=args.host, port=args.port, print=None)
+
+
+# ---------------------------
+# Load Driver
+# ---------------------------
+
+def build_event(order_ids: list) -> bytes:
+    """
+    Builds a random `Order.StatusChange` event body.
+
+    Args:
+        order_ids (list): Pool of kountOrderIds to pick from, so orders receive several events.
+
+    Returns:
+        bytes: The JSON-encoded event.
+    """
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    old_value, new_value = random.choice(STATUS_TRANSITIONS)
+    event = {
+        "id": str(uuid.uuid4()),
+        "eventType": "Order.StatusChange",
+        "apiVersion": "v1",
+        "clientId": "loadgen",
+        "kountOrderId": random.choice(order_ids),
+        "merchantOrderId": uuid.uuid4().hex,
+        "orderCreationDate": now,
+        "eventDate": now,
+        "fieldName": "status",
+        "oldValue": old_value,
+        "newValue": new_value,
+    }
+    return json.dumps(event, separators=(",", ":")).encode("utf-8")
+
+
+def sign_event(private_key: rsa.RSAPrivateKey, body: bytes) -> dict:
+    """
+    Signs an event the way Kount does and returns the webhook headers.
+
+    Args:
+        private_key (rsa.RSAPrivateKey): The signing key.
+        body (bytes): The exact bytes that will be sent.
+
+    Returns:
+        dict: Content-Type, X-Event-Timestamp and X-Event-Signature headers.
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    signature = private_key.sign(timestamp.encode("utf-8") + body, PSS_PADDING, hashes.SHA256())
+    return {
+        "Content-Type": "application/json",
+        "X-Event-Timestamp": timestamp,
+        "X-Event-Signature": base64.b64encode(signature).decode(),
+    }
+
+
+async def drive_load(args):
+    """
+    Sends signed events at a fixed rate and prints throughput and latency.
+
+    Sends are scheduled open-loop at `rate` per second, so a slow receiver shows up
+    as latency rather than as a lower offered rate, up to `concurrency` in flight.
+    """
+    private_key = load_or_create_key(args.key_file)
+    order_ids = [uuid.uuid4().hex[:16].upper() for _ in range(args.orders)]
+    total = int(args.rate * args.duration)
+    in_flight = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = {}
+
+    async def send_one(session):
+        body = build_event(order_ids)
+        headers = sign_event(private_key, body)
+        started = time.perf_counter()
+        try:
+            async with session.post(args.url, data=body, headers=headers) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        finally:
+            in_flight.release()
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await in_flight.acquire()
+            tasks.append(asyncio.create_task(send_one(session)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    accepted = statuses.get(200, 0)
+    print(f"Sent {total} events in {elapsed:.2f}s (target {args.rate}/s)")
+    print(f"Accepted: {accepted} ({accepted / elapsed:.1f} events/s)")
+    print(f"Responses: {dict(sorted(statuses.items(), key=str))}")
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(
+            "Latency ms: "
+            f"p50={cuts[49] * 1000:.2f} p90={cuts[89] * 1000:.2f} "
+            f"p99={cuts[98] * 1000:.2f} max={max(latencies) * 1000:.2f}"
+        )
+
+
+def main():
+    """Parses the command line and runs the selected subcommand."""
+    parser = argparse.ArgumentParser(description="Signed-webhook load generator for webhook_server.py.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve the public key from a local Kount stand-in.")
+    serve_parser.add_argument("--key-file", default=DEFAULT_KEY_FILE)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8100)
+
+    drive_parser = subparsers.add_parser("drive", help="Send signed events to the receiver.")
+    drive_parser.add_argument("--key-file", default=DEFAULT_KEY_FILE)
+    drive_parser.add_argument("--url", default=DEFAULT_RECEIVER_URL)
+    drive_parser.add_argument("--rate", type=float, default=100, help="Events per second.")
+    drive_parser.add_argument("--duration", type=float, default=10, help="Seconds to send for.")
+    drive_parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight.")
+    drive_parser.add_argument("--orders", type=int, default=1000, help="Distinct kountOrderIds to spread events over.")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        asyncio.run(drive_load(args))
+
+
+if __name__ == "__main__":
+    main()